@@ -0,0 +1,109 @@
+"""CPU time per dashboard broadcast: full state vs the encoded delta feed.
+
+Builds a synthetic cluster of plain node dicts and a python-socketio Server
+with ``--clients`` connected dashboards whose transport just counts bytes,
+so what is measured is the server's own work per tick: building the
+payload, encoding it and handing a packet to every client. Before each
+tick ``--changes`` nodes have their capacity changed and one pod moved.
+
+``full/client`` emits the whole state to each client separately (how the
+connect handlers and list_nodes used to encode it), ``full/broadcast``
+emits it once to everybody (the old broadcast_state), ``delta`` is
+StateFeed.tick plus one emit of the encoded delta, and ``snapshot`` is the
+state a reconnecting client gets, spliced from cached node fragments.
+
+    python -m benchmarks.broadcast --nodes 10000 --clients 100 --changes 100
+"""
+import argparse
+import random
+import time
+
+import socketio
+
+from state_feed import PacketJSON, StateFeed
+
+
+def make_cluster(count, pods_per_node):
+    nodes = {}
+    for i in range(count):
+        nid = f"node_{i}"
+        nodes[nid] = {
+            "node_id": nid, "node_type": "balanced", "network_group": f"group_{i % 8}",
+            "cpu_total": 16, "cpu_available": 16 - pods_per_node, "memory_total": 32, "memory_available": 32 - pods_per_node,
+            "status": "active", "simulate_heartbeat": True, "container_id": None, "last_heartbeat": 0.0,
+            "pods": [{"pod_id": f"pod_{i}_{j}", "cpu": 1, "memory": 1, "network_group": f"group_{i % 8}",
+                      "cpu_usage": 0, "priority": 0, "status": "scheduled"} for j in range(pods_per_node)],
+        }
+    return nodes
+
+
+def mutate(nodes, ids, changes, rng):
+    for nid in rng.sample(ids, changes):
+        src, dst = nodes[nid], nodes[rng.choice(ids)]
+        src["cpu_available"] = rng.randint(0, src["cpu_total"])
+        if src["pods"] and src is not dst:
+            dst["pods"].append(src["pods"].pop())
+
+
+def connect_clients(count):
+    sio = socketio.Server(json=PacketJSON)
+    sent = [0]
+
+    def sink(eio_sid, pkt):
+        sent[0] += len(pkt.data)
+
+    sio._send_eio_packet = sink
+    sids = [sio.manager.connect(f"eio_{i}", "/") for i in range(count)]
+    return sio, sids, sent
+
+
+def full_state(nodes, logs, history):
+    return {"nodes": list(nodes.values()), "logs": logs, "pending": [], "pending_count": 0,
+            "history": [{"timestamp": ts, "utilization": u} for ts, u in history]}
+
+
+def run(mode, args):
+    rng = random.Random(1)
+    nodes = make_cluster(args.nodes, args.pods_per_node)
+    ids = list(nodes)
+    logs = [f"[2024-01-01 00:00:00] event {i}" for i in range(50)]
+    history = [(float(i), 50.0) for i in range(50)]
+    sio, sids, sent = connect_clients(args.clients)
+    feed = StateFeed()
+    feed.tick(nodes, logs, history)
+    cpu = 0.0
+    for tick in range(args.ticks):
+        mutate(nodes, ids, args.changes, rng)
+        logs.append(f"[2024-01-01 00:00:00] tick {tick}")
+        start = time.process_time()
+        if mode == "full/client":
+            state = full_state(nodes, logs[-50:], history)
+            for sid in sids:
+                sio.emit("state_update", state, to=sid)
+        elif mode == "full/broadcast":
+            sio.emit("state_update", full_state(nodes, logs[-50:], history))
+        elif mode == "delta":
+            delta = feed.tick(nodes, logs[-50:], history)
+            if delta is not None:
+                sio.emit("state_delta", delta)
+        else:
+            feed.tick(nodes, logs[-50:], history)
+            sio.emit("state_update", feed.snapshot(), to=sids[0])
+        cpu += time.process_time() - start
+    return cpu / args.ticks, sent[0] / args.ticks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark full-state broadcasts against the encoded delta feed")
+    parser.add_argument("--nodes", type=int, default=10000, help="Nodes in the synthetic cluster (default: 10000)")
+    parser.add_argument("--pods_per_node", type=int, default=4, help="Pods placed on every node (default: 4)")
+    parser.add_argument("--clients", type=int, default=100, help="Connected dashboards (default: 100)")
+    parser.add_argument("--changes", type=int, default=100, help="Nodes changed between ticks (default: 100)")
+    parser.add_argument("--ticks", type=int, default=3, help="Broadcast ticks timed per mode (default: 3)")
+    args = parser.parse_args()
+
+    print(f"{args.nodes} nodes, {args.clients} clients, {args.changes} nodes changed per tick")
+    print(f"{'mode':>15} {'CPU ms/tick':>12} {'bytes sent/tick':>16}")
+    for mode in ("full/client", "full/broadcast", "delta", "snapshot"):
+        cpu, sent = run(mode, args)
+        print(f"{mode:>15} {cpu * 1000:>12.1f} {sent:>16.0f}")
@@ -0,0 +1,299 @@
+"""Connection ceiling of the server in each ASYNC_MODE: heartbeating agents plus dashboards.
+
+Starts the server once per mode (STATE_STORE=memory, on ``--port``),
+registers nodes, connects ``--dashboards`` Socket.IO clients on the
+websocket transport (a pod is launched every second, so they get deltas
+pushed), then ramps up agents through ``--steps``. Each agent
+holds one keep-alive HTTP connection and posts a heartbeat every
+``--interval`` seconds, the way a node agent with a session would. A step
+holds for ``--rounds`` intervals and passes when every agent connected, at
+least 99% of its heartbeats got a 200 within the interval and every
+dashboard is still connected; the mode's ceiling is the last step that
+passed, and its ramp stops at the first that did not.
+
+Agents and dashboards run on one asyncio loop in this process, so on a
+small machine they compete with the server for CPU; compare modes on the
+same machine rather than reading the numbers as absolute. What limits a
+cooperative mode is usually the heartbeat rate (agents / interval), not
+the connections held: rerun a failed step with a longer ``--interval`` to
+tell the two apart.
+
+    python -m benchmarks.connections --modes threading,eventlet,gevent --steps 1000,2500,5000,10000
+    python -m benchmarks.connections --script server_new.py --api_prefix /api
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+try:
+    import websockets
+except ImportError:
+    sys.exit("benchmarks.connections needs the websockets package: pip install websockets")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def cpu_seconds(pgid):
+    # utime + stime of a process group from /proc (Linux only); in threading
+    # mode the server runs in a child of the reloader
+    ticks = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid:
+            ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+class Stats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ok = self.failed = 0
+        self.latencies = []
+
+
+def http_request(path, body, port):
+    data = json.dumps(body).encode()
+    return (f"POST {path} HTTP/1.1\r\nHost: localhost:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n").encode() + data
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if ": " in line)
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    keep_alive = headers.get("connection") != "close" and not lines[0].startswith("HTTP/1.0")
+    return status, body, keep_alive
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened after an error or a close."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def post(self, path, body, timeout):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection("127.0.0.1", self.port), timeout)
+        try:
+            self.writer.write(http_request(path, body, self.port))
+            status, data, keep_alive = await asyncio.wait_for(read_response(self.reader), timeout)
+        except BaseException:
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def register_nodes(port, prefix, count, parallel=32):
+    node_ids = []
+
+    async def worker(n):
+        conn = Connection(port)
+        for _ in range(n):
+            status, data = await conn.post(f"{prefix}/add_node", {"cpu": 8, "memory": 16}, 30)
+            if status != 200:
+                raise RuntimeError(f"add_node returned {status}")
+            node_ids.append(json.loads(data)["node_id"])
+        conn.close()
+
+    await asyncio.gather(*(worker(count // parallel + (i < count % parallel)) for i in range(parallel)))
+    return node_ids
+
+
+async def agent(port, path, node_id, interval, stats, connected, stop, connect_timeout):
+    # The first heartbeat may wait out SYN retries while the accept backlog is full
+    conn = Connection(port)
+    try:
+        await conn.post(path, {"node_id": node_id}, connect_timeout)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        connected.set_result(False)
+        return
+    connected.set_result(True)
+    await asyncio.sleep(random.uniform(0, interval))
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            status, _ = await conn.post(path, {"node_id": node_id}, interval)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            status = None
+        elapsed = time.perf_counter() - start
+        if status == 200:
+            stats.ok += 1
+            stats.latencies.append(elapsed * 1000)
+        else:
+            stats.failed += 1
+        await asyncio.sleep(max(0.0, interval - elapsed))
+
+
+async def operator(port, prefix, stop):
+    # A pod launch a second, so the dashboards have deltas pushed to them
+    conn = Connection(port)
+    while not stop.is_set():
+        try:
+            await conn.post(f"{prefix}/launch_pod", {"cpu_required": 1, "memory_required": 1}, 10)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        await asyncio.sleep(1)
+
+
+async def dashboard(port, state):
+    # Engine.IO v4 over a websocket: open packet, Socket.IO connect, then
+    # answer pings and count events until the server drops the connection
+    url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+    try:
+        async with websockets.connect(url, max_size=None, open_timeout=30, ping_interval=None) as ws:
+            await ws.recv()
+            await ws.send("40")
+            state["connected"] += 1
+            try:
+                async for message in ws:
+                    if message == "2":
+                        await ws.send("3")
+                    elif message.startswith("42"):
+                        state["events"] += 1
+            finally:
+                state["connected"] -= 1
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+        state["errors"] += 1
+
+
+async def wait_ready(port, prefix, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            conn = Connection(port)
+            status, _ = await conn.post(f"{prefix}/heartbeat", {"node_id": None}, 2)
+            conn.close()
+            return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            await asyncio.sleep(0.5)
+    raise RuntimeError("server did not start")
+
+
+async def ramp(mode, args):
+    # A server left over on the port would answer instead of the one started here
+    with socket.socket() as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", args.port))
+        except OSError:
+            raise RuntimeError(f"port {args.port} is in use")
+    env = dict(os.environ, ASYNC_MODE=mode, STATE_STORE="memory", PORT=str(args.port))
+    proc = subprocess.Popen([sys.executable, args.script], env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    tasks, rows = [], []
+    stop = asyncio.Event()
+    try:
+        await wait_ready(args.port, args.api_prefix, proc)
+        node_ids = await register_nodes(args.port, args.api_prefix, max(args.steps))
+        boards = {"connected": 0, "events": 0, "errors": 0}
+        tasks += [asyncio.ensure_future(dashboard(args.port, boards)) for _ in range(args.dashboards)]
+        tasks.append(asyncio.ensure_future(operator(args.port, args.api_prefix, stop)))
+        stats = Stats()
+        path = f"{args.api_prefix}/heartbeat"
+        running = 0
+        for step in args.steps:
+            connect_errors = 0
+            # Open the new agents' connections a batch at a time, as a fleet
+            # coming up would, rather than all in the same instant
+            started = time.perf_counter()
+            while running < step:
+                batch = []
+                for node_id in node_ids[running:min(step, running + args.connect_batch)]:
+                    connected = asyncio.get_running_loop().create_future()
+                    tasks.append(asyncio.ensure_future(agent(args.port, path, node_id, args.interval, stats, connected, stop, args.connect_timeout)))
+                    batch.append(connected)
+                running += len(batch)
+                connect_errors += (await asyncio.gather(*batch)).count(False)
+            ramp_s = time.perf_counter() - started
+            stats.reset()
+            boards["events"] = 0
+            hold = args.rounds * args.interval
+            server_cpu, client_cpu = cpu_seconds(proc.pid), time.process_time()
+            await asyncio.sleep(hold)
+            server_cpu = 100 * (cpu_seconds(proc.pid) - server_cpu) / hold
+            client_cpu = 100 * (time.process_time() - client_cpu) / hold
+            total = stats.ok + stats.failed
+            ok_pct = 100.0 * stats.ok / total if total else 0.0
+            p50 = percentile(stats.latencies, 50) if stats.latencies else float("nan")
+            p99 = percentile(stats.latencies, 99) if stats.latencies else float("nan")
+            passed = (connect_errors == 0 and ok_pct >= 99.0 and proc.poll() is None
+                      and boards["connected"] == args.dashboards)
+            rows.append((step, passed))
+            print(f"{mode:>9} {step:>7} {ramp_s:>7.1f} {connect_errors:>8} {total:>7} {ok_pct:>6.1f} "
+                  f"{p50:>8.1f} {p99:>8.1f} {server_cpu:>7.0f} {client_cpu:>7.0f} "
+                  f"{boards['connected']:>4}/{args.dashboards:<4} {boards['events']:>7} "
+                  f"{'ok' if passed else 'FAIL':>5}", flush=True)
+            if not passed:
+                break
+    finally:
+        # Server first, so every client call fails fast. The loops also check
+        # ``stop``, as wait_for can swallow a cancel that races its result
+        stop.set()
+        if proc.poll() is None:
+            os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=args.interval + 10)
+    passed = [step for step, ok in rows if ok]
+    return passed[-1] if passed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp heartbeating agents against the server in each async mode")
+    parser.add_argument("--script", default="server_3_modified.py", help="Server script to start (default: server_3_modified.py)")
+    parser.add_argument("--api_prefix", default="", help="Route prefix (use /api for server_new.py)")
+    parser.add_argument("--modes", default="threading,eventlet,gevent", help="ASYNC_MODE values to compare")
+    parser.add_argument("--steps", default="1000,2500,5000,10000", help="Concurrent agents per step")
+    parser.add_argument("--dashboards", type=int, default=20, help="Socket.IO dashboards connected throughout (default: 20)")
+    parser.add_argument("--interval", type=float, default=7, help="Seconds between an agent's heartbeats (default: 7)")
+    parser.add_argument("--rounds", type=int, default=2, help="Heartbeat intervals measured per step (default: 2)")
+    parser.add_argument("--connect_batch", type=int, default=250, help="Agents connecting at once while ramping (default: 250)")
+    parser.add_argument("--connect_timeout", type=float, default=30, help="Seconds an agent has to connect and get its first heartbeat answered (default: 30)")
+    parser.add_argument("--port", type=int, default=5077, help="Port the server is started on (default: 5077)")
+    args = parser.parse_args()
+    args.steps = sorted(int(s) for s in args.steps.split(","))
+
+    # Both ends need a descriptor per connection; the server inherits the raised limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    print(f"{args.script}: heartbeat every {args.interval}s, {args.dashboards} dashboards, fd limit {hard}")
+    print(f"{'mode':>9} {'agents':>7} {'ramp s':>7} {'conn err':>8} {'beats':>7} {'ok %':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'srv cpu%':>7} {'cli cpu%':>7} {'dashboards':>9} {'events':>7} {'step':>5}")
+    ceilings = {mode: asyncio.run(ramp(mode, args)) for mode in args.modes.split(",")}
+    print("ceiling: " + ", ".join(f"{mode} {ceiling} agents" for mode, ceiling in ceilings.items()))
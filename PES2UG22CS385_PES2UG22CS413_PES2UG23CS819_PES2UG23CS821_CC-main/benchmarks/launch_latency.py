@@ -0,0 +1,140 @@
+"""Launch latency of /launch_pod under concurrent clients.
+
+Fires ``--requests`` launches from ``--clients`` parallel threads against a
+running server (optionally with heartbeats and /list_nodes polling in the
+background) and reports latency percentiles. Run it against two server
+builds to compare them:
+
+    python server_3_modified.py &
+    python -m benchmarks.launch_latency --clients 64 --requests 2000
+
+``--check`` instead sends malformed /launch_pods requests and checks each
+is turned away with a 400 (server_3_modified.py only).
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def add_nodes(base, count, cpu, memory):
+    node_ids = []
+    for _ in range(count):
+        response = requests.post(f"{base}/add_node", json={"cpu": cpu, "memory": memory})
+        response.raise_for_status()
+        node_ids.append(response.json()["node_id"])
+    return node_ids
+
+
+def background_load(base, node_ids, stop, latencies):
+    """Heartbeats and dashboard-style polling competing for nodes_lock."""
+    session = requests.Session()
+    while not stop.is_set():
+        for nid in node_ids:
+            start = time.perf_counter()
+            session.post(f"{base}/heartbeat", json={"node_id": nid})
+            latencies.append((time.perf_counter() - start) * 1000)
+        session.get(f"{base}/list_nodes")
+
+
+def check_bulk_launch(base, max_pods=1000):
+    """Malformed /launch_pods bodies are rejected with a 400 before any pod is built."""
+    pod = {"cpu_required": 1, "memory_required": 1}
+    bad = {
+        "huge count": {**pod, "count": 10 ** 9},
+        "count above the limit": {**pod, "count": max_pods + 1},
+        "zero count": {**pod, "count": 0},
+        "negative count": {**pod, "count": -5},
+        "string count": {**pod, "count": "abc"},
+        "float count": {**pod, "count": 2.5},
+        "boolean count": {**pod, "count": True},
+        "pods not a list": {"pods": {"cpu_required": 1}},
+        "empty pods": {"pods": []},
+        "too many pods": {"pods": [pod] * (max_pods + 1)},
+        "non-object entry": {"pods": [pod, "abc"]},
+        "null entry": {"pods": [None]},
+        "number entry": {"pods": [pod, 3]},
+        "missing cpu_required": {"pods": [{"memory_required": 1}]},
+        "string priority": {"pods": [{**pod, "priority": "high"}]},
+        "numeric algorithm": {**pod, "count": 2, "scheduling_algorithm": 5},
+        "unknown algorithm": {**pod, "count": 2, "scheduling_algorithm": "fastest_fit"},
+        "string cpu_required": {"pods": [{**pod, "cpu_required": "1"}]},
+        "negative cpu_required": {**pod, "count": 2, "cpu_required": -1},
+        "zero memory_required": {"pods": [{**pod, "memory_required": 0}]},
+    }
+    failed = []
+    for name, body in bad.items():
+        status = requests.post(f"{base}/launch_pods", json=body).status_code
+        if status != 400:
+            failed.append(f"{name}: {status}")
+    add_nodes(base, 1, 4, 8)
+    status = requests.post(f"{base}/launch_pods", json={**pod, "count": 2, "scheduling_algorithm": "Best_Fit"}).status_code
+    if status != 200:
+        failed.append(f"valid replica launch: {status}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure /launch_pod latency with parallel clients")
+    parser.add_argument("--server", default="http://localhost:5000", help="API server base URL")
+    parser.add_argument("--api_prefix", default="", help="Route prefix (use /api for server_new.py)")
+    parser.add_argument("--clients", type=int, default=64, help="Parallel clients (default: 64)")
+    parser.add_argument("--requests", type=int, default=2000, help="Total launches (default: 2000)")
+    parser.add_argument("--nodes", type=int, default=50, help="Nodes to add before the run (default: 50)")
+    parser.add_argument("--algorithm", default="best_fit", help="scheduling_algorithm to request")
+    parser.add_argument("--no_background", action="store_true", help="Skip heartbeat/list_nodes traffic")
+    parser.add_argument("--check", action="store_true", help="Only check that malformed /launch_pods requests get a 400")
+    args = parser.parse_args()
+
+    base = args.server + args.api_prefix
+    if args.check:
+        failed = check_bulk_launch(base)
+        if failed:
+            sys.exit("❌ /launch_pods checks failed: " + "; ".join(failed))
+        print("✅ /launch_pods rejects malformed requests")
+        sys.exit()
+    # Size nodes so every launch fits and we time placement, not rejections
+    cpu = max(1, args.requests // args.nodes + 1)
+    node_ids = add_nodes(base, args.nodes, cpu, 2 * cpu)
+
+    stop = threading.Event()
+    heartbeat_latencies = []
+    if not args.no_background:
+        noise = threading.Thread(target=background_load, args=(base, node_ids, stop, heartbeat_latencies), daemon=True)
+        noise.start()
+
+    local = threading.local()
+
+    def launch(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.post(f"{base}/launch_pod", json={
+            "cpu_required": 1, "memory_required": 1, "scheduling_algorithm": args.algorithm
+        })
+        return time.perf_counter() - start, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(launch, range(args.requests)))
+    wall = time.perf_counter() - started
+    stop.set()
+
+    latencies = [lat * 1000 for lat, status in results if status == 200]
+    failures = len(results) - len(latencies)
+    print(f"clients={args.clients} launches={len(results)} failed={failures} throughput={len(results) / wall:.0f}/s")
+    if latencies:
+        print(f"latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+              f"p99={percentile(latencies, 99):.1f} max={max(latencies):.1f}")
+    if heartbeat_latencies:
+        print(f"heartbeat ms: p50={percentile(heartbeat_latencies, 50):.1f} "
+              f"p99={percentile(heartbeat_latencies, 99):.1f} max={max(heartbeat_latencies):.1f}")
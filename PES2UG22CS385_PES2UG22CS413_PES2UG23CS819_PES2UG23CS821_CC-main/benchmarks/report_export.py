@@ -0,0 +1,85 @@
+"""Lock hold time and peak memory of /download_report: buffered CSV vs streamed export.
+
+Builds a synthetic cluster of plain node dicts, then exports it two ways.
+``buffered`` is the old endpoint (the whole CSV written into a StringIO
+under the lock, then copied into a BytesIO); the other rows stream through
+reports.export from a snapshot, in each format. Output chunks are consumed
+and dropped, as a socket would, so peak memory is what the server holds.
+
+    python -m benchmarks.report_export --nodes 100000 --pods_per_node 4
+"""
+import argparse
+import csv
+import io
+import threading
+import time
+import tracemalloc
+
+from reports import REPORT_FORMATS, export, snapshot
+
+
+def make_cluster(count, pods_per_node):
+    nodes = {}
+    for i in range(count):
+        nid = f"node_{i}"
+        nodes[nid] = {
+            "node_id": nid, "status": "active", "node_type": "balanced", "network_group": f"group_{i % 8}",
+            "cpu_total": 16, "cpu_available": 16 - pods_per_node, "memory_total": 32, "memory_available": 32 - pods_per_node,
+            "pods": [{"pod_id": f"pod_{i}_{j}", "cpu": 1, "memory": 1, "network_group": f"group_{i % 8}", "priority": 0}
+                     for j in range(pods_per_node)],
+        }
+    return nodes
+
+
+def buffered(nodes, lock):
+    start = time.perf_counter()
+    out = io.StringIO(); w = csv.writer(out)
+    w.writerow(["Node", "CPU tot/avail", "Mem tot/avail", "Status", "Type", "Group", "Pods"])
+    with lock:
+        for n in nodes.values():
+            pods = ";".join(p["pod_id"] for p in n["pods"]) or "None"
+            w.writerow([n["node_id"], f"{n['cpu_total']}/{n['cpu_available']}",
+                        f"{n['memory_total']}/{n['memory_available']}",
+                        n["status"], n["node_type"], n["network_group"], pods])
+        held = time.perf_counter() - start
+    body = io.BytesIO(out.getvalue().encode())
+    return held, len(body.getvalue())
+
+
+def streamed(nodes, lock, fmt, rows):
+    start = time.perf_counter()
+    with lock:
+        snap = snapshot(nodes, [])
+    held = time.perf_counter() - start
+    size = 0
+    for piece in export(snap, fmt, rows):
+        size += len(piece.encode())
+    return held, size
+
+
+def measure(fn, *args):
+    # Timed once as is, then again under tracemalloc (which slows it) for the peak
+    start = time.perf_counter()
+    held, size = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return held, elapsed, peak, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the buffered CSV report against the streamed export")
+    parser.add_argument("--nodes", type=int, default=100000, help="Nodes in the synthetic cluster (default: 100000)")
+    parser.add_argument("--pods_per_node", type=int, default=4, help="Pods placed on every node (default: 4)")
+    args = parser.parse_args()
+
+    nodes = make_cluster(args.nodes, args.pods_per_node)
+    lock = threading.RLock()
+    runs = [("buffered csv", buffered, (nodes, lock))]
+    runs += [(f"{fmt} {rows}", streamed, (nodes, lock, fmt, rows)) for rows in ("nodes", "pods") for fmt in REPORT_FORMATS]
+    print(f"{'export':>16} {'lock held ms':>13} {'total ms':>9} {'peak MiB':>9} {'bytes':>12}")
+    for name, fn, fn_args in runs:
+        held, elapsed, peak, size = measure(fn, *fn_args)
+        print(f"{name:>16} {held * 1000:>13.1f} {elapsed * 1000:>9.1f} {peak / 2**20:>9.1f} {size:>12}")
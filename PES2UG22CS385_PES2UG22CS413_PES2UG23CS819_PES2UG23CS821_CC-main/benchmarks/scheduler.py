@@ -0,0 +1,225 @@
+"""Offline benchmark of schedule_pod / reschedule_pods_from_failed_node.
+
+Builds a synthetic in-memory cluster, then replays the same seeded stream of
+pod arrivals (and node failures) through the server's own scheduling code
+once per algorithm. Persistence goes to the in-memory state store, so no
+SQLite file, Docker daemon or Socket.IO client is involved; the numbers are
+for the scheduler alone. Results are printed as a table and written as JSON so runs from two
+commits can be diffed:
+
+    python -m benchmarks.scheduler --nodes 1000 --pods 20000 --workload bimodal --output before.json
+"""
+import argparse
+import copy
+import gc
+import json
+import platform
+import random
+import subprocess
+import time
+
+import server_3_modified as server
+from state_store import MemoryStore
+
+NODE_SHAPES = {
+    "balanced": (8, 16),
+    "high_cpu": (16, 16),
+    "high_mem": (8, 32),
+}
+
+
+# ----------------------------------
+# Synthetic workloads
+# ----------------------------------
+def uniform_pod(rng):
+    return rng.randint(1, 4), rng.randint(1, 8)
+
+
+def bimodal_pod(rng):
+    # mostly sidecar-sized pods with a minority of large batch jobs
+    if rng.random() < 0.8:
+        return 1, rng.randint(1, 2)
+    return rng.randint(4, 8), rng.randint(8, 16)
+
+
+def heavy_tail_pod(rng):
+    # Pareto sizes clipped to the largest node shape
+    cpu = min(16, int(rng.paretovariate(1.5)))
+    return cpu, min(32, max(1, int(cpu * rng.uniform(1, 3))))
+
+
+WORKLOADS = {
+    "uniform": uniform_pod,
+    "bimodal": bimodal_pod,
+    "heavy_tail": heavy_tail_pod,
+}
+
+
+def make_cluster(count, groups, seed):
+    rng = random.Random(seed)
+    nodes = {}
+    for i in range(count):
+        ntype = rng.choice(list(NODE_SHAPES))
+        cpu, mem = NODE_SHAPES[ntype]
+        nid = f"node_{i}"
+        nodes[nid] = {
+            "node_id": nid,
+            "cpu_total": cpu, "cpu_available": cpu,
+            "memory_total": mem, "memory_available": mem,
+            "node_type": ntype,
+            "network_group": f"group_{rng.randrange(groups)}",
+            "pods": [], "last_heartbeat": 0,
+            "status": "active", "simulate_heartbeat": False,
+        }
+    return nodes
+
+
+def make_arrivals(count, workload, groups, affinity_share, priority_levels, fail_every, seed):
+    """Seeded event stream: ("pod", pod) arrivals with a ("fail", None) every ``fail_every`` pods."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        cpu, mem = WORKLOADS[workload](rng)
+        pod = {
+            "pod_id": f"pod_{i}", "cpu": cpu, "memory": mem,
+            "network_group": f"group_{rng.randrange(groups)}",
+            "cpu_usage": 0, "priority": rng.randrange(priority_levels),
+        }
+        if rng.random() < affinity_share:
+            pod["node_affinity"] = rng.choice(list(NODE_SHAPES))
+        events.append(("pod", pod))
+        if fail_every and (i + 1) % fail_every == 0:
+            events.append(("fail", None))
+    return events
+
+
+# ----------------------------------
+# Harness
+# ----------------------------------
+def detach_persistence():
+    """Send every write to an in-memory store instead of SQLite."""
+    server.store = MemoryStore()
+
+
+def reset_cluster(nodes):
+    with server.nodes_lock:
+        server.nodes.clear()
+        server.nodes.update(nodes)
+        server.capacity_index.rebuild(server.nodes)
+        server.priority_index.rebuild(server.nodes)
+        server.pending_pods.__init__()
+        server.event_log.clear()
+        server.event_ring.__init__(server.EVENT_RING_SIZE)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def packing_efficiency(nodes):
+    """Share of CPU and memory in use on the active nodes that host at least one pod."""
+    used = [n for n in nodes.values() if n["status"] == "active" and n["pods"]]
+    cpu_total = sum(n["cpu_total"] for n in used)
+    mem_total = sum(n["memory_total"] for n in used)
+    if not cpu_total or not mem_total:
+        return 0.0
+    cpu_used = sum(n["cpu_total"] - n["cpu_available"] for n in used)
+    mem_used = sum(n["memory_total"] - n["memory_available"] for n in used)
+    return (cpu_used / cpu_total + mem_used / mem_total) / 2
+
+
+def run(algo, nodes, events, seed):
+    reset_cluster(copy.deepcopy(nodes))
+    arrivals = copy.deepcopy(events)
+    rng = random.Random(seed)
+    latencies, failovers = [], []
+    rejected = 0
+    gc.collect()
+    start = time.perf_counter()
+    for kind, pod in arrivals:
+        if kind == "pod":
+            t0 = time.perf_counter()
+            scheduled, _ = server.schedule_pod(pod, algo)
+            latencies.append(time.perf_counter() - t0)
+            rejected += not scheduled
+            continue
+        with server.nodes_lock:
+            active = [n for n in server.nodes.values() if n["status"] == "active"]
+            if not active:
+                continue
+            target = rng.choice(active)
+            target["status"] = "failed"
+            server.capacity_index.update(target)
+        t0 = time.perf_counter()
+        server.reschedule_pods_from_failed_node(target["node_id"])
+        failovers.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    arrived = len(latencies)
+    return {
+        "pods_per_sec": arrived / sum(latencies) if latencies else 0.0,
+        "wall_sec": elapsed,
+        "latency_us": {
+            "p50": percentile(latencies, 50) * 1e6,
+            "p95": percentile(latencies, 95) * 1e6,
+            "p99": percentile(latencies, 99) * 1e6,
+            "max": max(latencies, default=0) * 1e6,
+        },
+        "rejection_rate": rejected / arrived if arrived else 0.0,
+        "packing_efficiency": packing_efficiency(server.nodes),
+        "nodes_used": sum(1 for n in server.nodes.values() if n["pods"]),
+        "failovers": len(failovers),
+        "failover_ms": {
+            "p50": percentile(failovers, 50) * 1e3,
+            "max": max(failovers, default=0) * 1e3,
+        },
+        "pending_after_failover": len(server.pending_pods),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling algorithms without SQLite, Docker or Socket.IO")
+    parser.add_argument("--nodes", type=int, default=1000, help="Cluster size (default: 1000)")
+    parser.add_argument("--groups", type=int, default=2, help="Network groups (default: 2)")
+    parser.add_argument("--pods", type=int, default=10000, help="Pod arrivals (default: 10000)")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="uniform", help="Pod size distribution")
+    parser.add_argument("--affinity_share", type=float, default=0.2, help="Share of pods with a node_affinity")
+    parser.add_argument("--priority_levels", type=int, default=1, help="Distinct priorities (>1 exercises preemption)")
+    parser.add_argument("--fail_every", type=int, default=500, help="Fail a random node every N arrivals (0: never)")
+    parser.add_argument("--algorithms", nargs="+", default=server.SCHEDULING_ALGORITHMS, choices=server.SCHEDULING_ALGORITHMS)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    detach_persistence()
+    nodes = make_cluster(args.nodes, args.groups, args.seed)
+    events = make_arrivals(args.pods, args.workload, args.groups, args.affinity_share,
+                           args.priority_levels, args.fail_every, args.seed + 1)
+
+    results = {}
+    print(f"{'algorithm':>18} {'pods/s':>9} {'p50 us':>8} {'p99 us':>8} {'reject':>7} {'packing':>8} {'nodes':>6} {'failover ms':>12}")
+    for algo in args.algorithms:
+        res = results[algo] = run(algo, nodes, events, args.seed + 2)
+        print(f"{algo:>18} {res['pods_per_sec']:>9.0f} {res['latency_us']['p50']:>8.1f} {res['latency_us']['p99']:>8.1f} "
+              f"{res['rejection_rate']:>7.1%} {res['packing_efficiency']:>8.1%} {res['nodes_used']:>6} "
+              f"{res['failover_ms']['p50']:>12.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "params": vars(args),
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,121 @@
+"""Pods/sec of the best_fit / worst_fit lookup paths at growing cluster sizes.
+
+Compares the original linear scan from schedule_pod, the CapacityIndex and the
+NumPy CapacityColumns path on identical synthetic clusters. Each placement also
+applies the capacity update, so index maintenance is part of the measurement.
+
+    python -m benchmarks.scoring --sizes 1000 10000 100000 --pods 300
+"""
+import argparse
+import copy
+import gc
+import random
+import time
+
+from scheduling import CapacityIndex, np
+
+NODE_TYPES = ["balanced", "high_cpu", "high_mem"]
+NETWORK_GROUPS = ["default", "isolated"]
+
+
+def make_nodes(count, seed):
+    rng = random.Random(seed)
+    nodes = {}
+    for i in range(count):
+        cpu = rng.choice([4, 8, 16, 32])
+        mem = rng.choice([8, 16, 32, 64])
+        nid = f"node_{i}"
+        nodes[nid] = {
+            "node_id": nid,
+            "cpu_total": cpu, "cpu_available": cpu,
+            "memory_total": mem, "memory_available": mem,
+            "node_type": rng.choice(NODE_TYPES),
+            "network_group": rng.choice(NETWORK_GROUPS),
+            "status": "active" if rng.random() > 0.05 else "failed",
+            "pods": [],
+        }
+    return nodes
+
+
+def make_pods(count, seed):
+    rng = random.Random(seed)
+    pods = []
+    for i in range(count):
+        pod = {
+            "pod_id": f"pod_{i}",
+            "cpu": rng.randint(1, 4),
+            "memory": rng.randint(1, 8),
+            "network_group": rng.choice(NETWORK_GROUPS),
+        }
+        if rng.random() < 0.3:
+            pod["node_affinity"] = rng.choice(NODE_TYPES)
+        pods.append(pod)
+    return pods
+
+
+def scan_find(nodes, pod, algo):
+    """The pre-index schedule_pod lookup, kept as the baseline."""
+    eligible = [
+        n for n in nodes.values()
+        if n["status"] == "active"
+           and n["cpu_available"] >= pod["cpu"]
+           and n["memory_available"] >= pod["memory"]
+           and n["network_group"] == pod["network_group"]
+    ]
+    if "node_affinity" in pod:
+        eligible = [n for n in eligible if n["node_type"] == pod["node_affinity"]]
+    if not eligible:
+        return None
+    if algo == "best_fit":
+        return min(eligible, key=lambda n: (n["cpu_available"] - pod["cpu"]) + (n["memory_available"] - pod["memory"]))["node_id"]
+    return max(eligible, key=lambda n: n["cpu_available"] + n["memory_available"])["node_id"]
+
+
+def run(impl, nodes, pods, algo):
+    """Place every pod with ``impl`` and return (pods/sec, placements)."""
+    nodes = copy.deepcopy(nodes)
+    index = None
+    if impl != "scan":
+        index = CapacityIndex(vectorized=(impl == "numpy"))
+        index.rebuild(nodes)
+
+    placements = []
+    gc.collect()  # keep collections of the cluster copy out of the timed loop
+    start = time.perf_counter()
+    for pod in pods:
+        nid = scan_find(nodes, pod, algo) if index is None else index.find(pod, algo)
+        placements.append(nid)
+        if nid is None:
+            continue
+        node = nodes[nid]
+        node["pods"].append(pod)
+        node["cpu_available"] -= pod["cpu"]
+        node["memory_available"] -= pod["memory"]
+        if index is not None:
+            index.update(node)
+    elapsed = time.perf_counter() - start
+    return len(pods) / elapsed, placements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark schedule_pod lookup paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Cluster sizes (nodes)")
+    parser.add_argument("--pods", type=int, default=300, help="Pods placed per run (default: 300)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    impls = ["scan", "index"] + (["numpy"] if np is not None else [])
+    if np is None:
+        print("⚠️ NumPy not installed—skipping the vectorized path.")
+
+    print(f"{'nodes':>8} {'algo':>10} " + " ".join(f"{i + ' pods/s':>14}" for i in impls))
+    for size in args.sizes:
+        nodes = make_nodes(size, args.seed)
+        pods = make_pods(args.pods, args.seed + 1)
+        for algo in ("best_fit", "worst_fit"):
+            results = {impl: run(impl, nodes, pods, algo) for impl in impls}
+            reference = results["scan"][1]
+            for impl, (_, placements) in results.items():
+                if placements != reference:
+                    print(f"❌ {impl} diverged from the linear scan for {algo}")
+            print(f"{size:>8} {algo:>10} " + " ".join(f"{results[i][0]:>14.0f}" for i in impls))
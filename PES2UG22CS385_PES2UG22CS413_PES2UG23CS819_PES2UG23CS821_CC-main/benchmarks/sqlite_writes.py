@@ -0,0 +1,92 @@
+"""Rows/sec of small SQLite writes: connect-per-write vs the shared WAL connection.
+
+Replays the server's two hottest write shapes (a node upsert per heartbeat and
+an event_logs insert per log line), one commit per row, against a scratch
+database. ``connect`` is the old helper pattern (open, rollback-journal
+commit, close on every call); ``shared`` goes through SQLiteStore's
+transaction(), as the server does. With ``--threads`` > 1 the writers run concurrently, the way
+werkzeug request threads do.
+
+    python -m benchmarks.sqlite_writes --rows 2000 --threads 1 8
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from state_store import SQLiteStore, node_db_row
+
+NODE_UPSERT = "INSERT OR REPLACE INTO nodes VALUES (?,?,?,?,?,?,?,?,?,?,?)"
+EVENT_INSERT = "INSERT INTO event_logs (timestamp, message) VALUES (?,?)"
+
+
+def fresh_db(directory, name):
+    """A store on a new database file."""
+    return SQLiteStore(os.path.join(directory, name))
+
+
+def make_rows(kind, count, worker):
+    if kind == "event":
+        return [(EVENT_INSERT, (f"2024-01-01 00:00:{i % 60:02d}", f"Heartbeat from node_{worker}_{i}")) for i in range(count)]
+    rows = []
+    for i in range(count):
+        node = {
+            "node_id": f"node_{worker}_{i % 50}",
+            "cpu_total": 8, "cpu_available": i % 8,
+            "memory_total": 16, "memory_available": i % 16,
+            "node_type": "balanced", "network_group": "default",
+            "last_heartbeat": float(i), "status": "active",
+            "simulate_heartbeat": True,
+        }
+        rows.append((NODE_UPSERT, node_db_row(node)))
+    return rows
+
+
+def connect_write(store, rows):
+    for sql, params in rows:
+        with store.lock:
+            conn = sqlite3.connect(store.path, timeout=30)
+            conn.execute(sql, params)
+            conn.commit()
+            conn.close()
+
+
+def shared_write(store, rows):
+    for sql, params in rows:
+        with store.transaction() as conn:
+            conn.execute(sql, params)
+
+
+WRITERS = {"connect": connect_write, "shared": shared_write}
+
+
+def run(mode, kind, rows, threads, directory):
+    store = fresh_db(directory, f"{mode}_{kind}_{threads}.db")
+    per_thread = [make_rows(kind, rows // threads, w) for w in range(threads)]
+    workers = [threading.Thread(target=WRITERS[mode], args=(store, batch)) for batch in per_thread]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return sum(len(b) for b in per_thread) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-write connections against the shared WAL connection")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows written per run (default: 2000)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="Concurrent writers (default: 1 8)")
+    parser.add_argument("--dir", help="Directory for the scratch databases (default: a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"{'kind':>6} {'threads':>8} {'connect rows/s':>15} {'shared rows/s':>14} {'speedup':>8}")
+        for kind in ("node", "event"):
+            for threads in args.threads:
+                base = run("connect", kind, args.rows, threads, directory)
+                shared = run("shared", kind, args.rows, threads, directory)
+                print(f"{kind:>6} {threads:>8} {base:>15.0f} {shared:>14.0f} {shared / base:>7.1f}x")
@@ -1,8 +1,12 @@
 import argparse
+import json
 import requests
 import sys
+import time
 import webbrowser
 
+SCHEDULING_ALGORITHMS = ["first_fit", "best_fit", "worst_fit", "dominant_best_fit", "dot_product", "least_stranded"]
+
 def add_node(server_url, cpu, memory, node_type, network_group):
     url = f"{server_url}/api/add_node"
     payload = {
@@ -20,13 +24,14 @@ def add_node(server_url, cpu, memory, node_type, network_group):
         print("Error adding node:", response.json())
         sys.exit(1)
 
-def launch_pod(server_url, cpu_required, memory_required, scheduling_algorithm, network_group, node_affinity):
+def launch_pod(server_url, cpu_required, memory_required, scheduling_algorithm, network_group, node_affinity, priority=0):
     url = f"{server_url}/api/launch_pod"
     payload = {
         "cpu_required": cpu_required,
         "memory_required": memory_required,
         "scheduling_algorithm": scheduling_algorithm,
-        "network_group": network_group
+        "network_group": network_group,
+        "priority": priority
     }
     
     if node_affinity:
@@ -36,9 +41,54 @@ def launch_pod(server_url, cpu_required, memory_required, scheduling_algorithm,
     if response.status_code == 200:
         data = response.json()
         print(f"Pod {data['pod_id']} scheduled on node {data['assigned_node']} using {data['scheduling_algorithm']}")
+    elif response.status_code == 202:
+        data = response.json()
+        print(f"Pod {data['pod_id']} queued until a node has capacity (check with pod_status)")
     else:
         print("Error launching pod:", response.json())
 
+def launch_pods(server_url, count, cpu_required, memory_required, scheduling_algorithm, network_group, node_affinity, spec_file, priority=0):
+    url = f"{server_url}/api/launch_pods"
+    if spec_file:
+        # JSON list of pod specs using the same keys as launch_pod
+        with open(spec_file) as f:
+            payload = {"pods": json.load(f), "scheduling_algorithm": scheduling_algorithm}
+    else:
+        payload = {
+            "count": count,
+            "cpu_required": cpu_required,
+            "memory_required": memory_required,
+            "scheduling_algorithm": scheduling_algorithm,
+            "network_group": network_group,
+            "priority": priority
+        }
+        if node_affinity:
+            payload["node_affinity"] = node_affinity
+
+    response = requests.post(url, json=payload)
+    if response.status_code in (200, 202):
+        data = response.json()
+        for pod_id, node_id in data["placements"].items():
+            print(f"Pod {pod_id} scheduled on node {node_id}")
+        for pod_id in data["pending"]:
+            print(f"Pod {pod_id} queued")
+        print(f"{data['scheduled']} pods scheduled using {data['scheduling_algorithm']}, "
+              f"{len(data['pending'])} queued, {len(data['unscheduled'])} unscheduled")
+    else:
+        print("Error launching pods:", response.json())
+
+def pod_status(server_url, pod_id):
+    url = f"{server_url}/api/pod_status/{pod_id}"
+    response = requests.get(url)
+    if response.status_code == 200:
+        data = response.json()
+        if data["status"] == "pending":
+            print(f"Pod {pod_id} is pending (position {data['position']} of {data['pending_count']})")
+        else:
+            print(f"Pod {pod_id} is scheduled on node {data['node_id']} ({data['node_status']})")
+    else:
+        print("Error fetching pod status:", response.json())
+
 def list_nodes(server_url):
     url = f"{server_url}/api/list_nodes"
     response = requests.get(url)
@@ -65,6 +115,31 @@ def chaos_monkey(server_url):
     else:
         print("Error triggering Chaos Monkey:", response.json())
 
+def logs(server_url, node_id, pod_id, contains, since_minutes, page_size):
+    """Print every matching event, oldest first, one keyset page at a time."""
+    url = f"{server_url}/api/logs"
+    params = {"limit": page_size, "after_id": 0}
+    if node_id:
+        params["node_id"] = node_id
+    if pod_id:
+        params["pod_id"] = pod_id
+    if contains:
+        params["contains"] = contains
+    if since_minutes is not None:
+        params["since"] = time.time() - since_minutes * 60
+    session = requests.Session()
+    while True:
+        response = session.get(url, params=params)
+        if response.status_code != 200:
+            print("Error fetching logs:", response.json())
+            return
+        data = response.json()
+        for log in data["logs"]:
+            print(f"[{log['timestamp']}] {log['severity'].upper():7} {log['message']}")
+        if len(data["logs"]) < page_size:
+            return
+        params["after_id"] = data["next_after_id"]
+
 def open_dashboard(server_url):
     url = server_url
     print(f"Opening dashboard at {url}")
@@ -84,9 +159,30 @@ if __name__ == "__main__":
     parser_pod = subparsers.add_parser("launch_pod", help="Launch a pod with given requirements")
     parser_pod.add_argument("--cpu_required", type=int, required=True, help="CPU cores required")
     parser_pod.add_argument("--memory_required", type=int, default=4, help="Memory in GB required (default: 4)")
-    parser_pod.add_argument("--scheduling_algorithm", type=str, choices=["first_fit", "best_fit", "worst_fit"], default="first_fit", help="Scheduling algorithm")
+    parser_pod.add_argument("--scheduling_algorithm", type=str, choices=SCHEDULING_ALGORITHMS, default="first_fit", help="Scheduling algorithm")
     parser_pod.add_argument("--network_group", type=str, default="default", help="Network group")
     parser_pod.add_argument("--node_affinity", type=str, choices=["", "balanced", "high_cpu", "high_mem"], default="", help="Node affinity")
+    parser_pod.add_argument("--priority", type=int, default=0, help="Priority; may preempt lower-priority pods when the cluster is full (default: 0)")
+
+    parser_pods = subparsers.add_parser("launch_pods", help="Launch many pods in one request")
+    parser_pods.add_argument("--count", type=int, default=1, help="Number of identical pods to launch (default: 1)")
+    parser_pods.add_argument("--file", type=str, help="JSON file with a list of pod specs (overrides --count)")
+    parser_pods.add_argument("--cpu_required", type=int, default=1, help="CPU cores required per pod (default: 1)")
+    parser_pods.add_argument("--memory_required", type=int, default=4, help="Memory in GB required per pod (default: 4)")
+    parser_pods.add_argument("--scheduling_algorithm", type=str, choices=SCHEDULING_ALGORITHMS, default="first_fit", help="Scheduling algorithm (applied largest pod first)")
+    parser_pods.add_argument("--network_group", type=str, default="default", help="Network group")
+    parser_pods.add_argument("--node_affinity", type=str, choices=["", "balanced", "high_cpu", "high_mem"], default="", help="Node affinity")
+    parser_pods.add_argument("--priority", type=int, default=0, help="Priority of every pod in the batch (default: 0)")
+
+    parser_status = subparsers.add_parser("pod_status", help="Show whether a pod is scheduled or still queued")
+    parser_status.add_argument("--pod_id", type=str, required=True, help="Pod ID returned by launch_pod")
+
+    parser_logs = subparsers.add_parser("logs", help="Print stored events, oldest first")
+    parser_logs.add_argument("--node_id", type=str, help="Only events on this node")
+    parser_logs.add_argument("--pod_id", type=str, help="Only events about this pod")
+    parser_logs.add_argument("--contains", type=str, help="Only events whose message contains this text")
+    parser_logs.add_argument("--since_minutes", type=float, help="Only events from the last N minutes")
+    parser_logs.add_argument("--page_size", type=int, default=1000, help="Events fetched per request (default: 1000)")
 
     subparsers.add_parser("list_nodes", help="List all nodes in the cluster")
     subparsers.add_parser("chaos_monkey", help="Trigger a Chaos Monkey event")
@@ -96,7 +192,13 @@ if __name__ == "__main__":
     if args.command == "add_node":
         add_node(args.server, args.cpu, args.memory, args.node_type, args.network_group)
     elif args.command == "launch_pod":
-        launch_pod(args.server, args.cpu_required, args.memory_required, args.scheduling_algorithm, args.network_group, args.node_affinity)
+        launch_pod(args.server, args.cpu_required, args.memory_required, args.scheduling_algorithm, args.network_group, args.node_affinity, args.priority)
+    elif args.command == "launch_pods":
+        launch_pods(args.server, args.count, args.cpu_required, args.memory_required, args.scheduling_algorithm, args.network_group, args.node_affinity, args.file, args.priority)
+    elif args.command == "pod_status":
+        pod_status(args.server, args.pod_id)
+    elif args.command == "logs":
+        logs(args.server, args.node_id, args.pod_id, args.contains, args.since_minutes, args.page_size)
     elif args.command == "list_nodes":
         list_nodes(args.server)
     elif args.command == "chaos_monkey":
@@ -0,0 +1,119 @@
+import threading
+from collections import deque
+
+# ----------------------------------
+# Structured events
+# ----------------------------------
+# An event row is a tuple in EVENT_COLUMNS order: the display message plus
+# what it is about. node_id is the node the event happened on (a pod's new
+# node for placements and moves), pod_id the pod it concerns, if any.
+EVENT_COLUMNS = ("timestamp", "message", "type", "severity", "node_id", "pod_id", "network_group")
+SEVERITIES    = ("info", "warning", "error")
+EVENT_NODE_ID, EVENT_POD_ID = 4, 5
+
+
+def event_row(ts, message, type, severity="info", node_id=None, pod_id=None, group=None):
+    return (ts, message, type, severity, node_id, pod_id, group)
+
+
+def event_dict(event_id, row):
+    return {"id": event_id, **dict(zip(EVENT_COLUMNS, row))}
+
+
+class EventRing:
+    """The newest ``capacity`` events, indexed by node and by pod.
+
+    Events get increasing ids. The oldest event is evicted first, so it is
+    also the oldest entry in its node's and pod's index and leaves both from
+    the front; a per-node or per-pod query walks only that entity's events.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.last_id = 0
+        self._events = deque()   # (id, row), oldest first
+        self._by_node = {}       # node_id -> deque of (id, row)
+        self._by_pod = {}        # pod_id -> deque of (id, row)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    @staticmethod
+    def _unindex(index, key):
+        entries = index[key]
+        entries.popleft()
+        if not entries:
+            del index[key]
+
+    def _evict_oldest(self):
+        _, row = self._events.popleft()
+        if row[EVENT_NODE_ID] is not None:
+            self._unindex(self._by_node, row[EVENT_NODE_ID])
+        if row[EVENT_POD_ID] is not None:
+            self._unindex(self._by_pod, row[EVENT_POD_ID])
+
+    def append(self, row, event_id=None):
+        """Add one event row; returns its id (``event_id`` if given, else the next one)."""
+        with self._lock:
+            self.last_id = event_id if event_id is not None else self.last_id + 1
+            entry = (self.last_id, row)
+            self._events.append(entry)
+            if row[EVENT_NODE_ID] is not None:
+                self._by_node.setdefault(row[EVENT_NODE_ID], deque()).append(entry)
+            if row[EVENT_POD_ID] is not None:
+                self._by_pod.setdefault(row[EVENT_POD_ID], deque()).append(entry)
+            if len(self._events) > self.capacity:
+                self._evict_oldest()
+            return self.last_id
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _newest(self, entries, limit):
+        with self._lock:
+            out = []
+            for entry in reversed(entries):
+                if len(out) == limit:
+                    break
+                out.append(entry)
+            return out
+
+    def recent(self, limit):
+        """The newest ``limit`` (id, row) pairs, newest first."""
+        return self._newest(self._events, limit)
+
+    def for_node(self, node_id, limit):
+        return self._newest(self._by_node.get(node_id, ()), limit)
+
+    def for_pod(self, pod_id, limit):
+        return self._newest(self._by_pod.get(pod_id, ()), limit)
+
+    def after(self, after_id, node_id=None, pod_id=None):
+        """(id, row) pairs with id > after_id, oldest first, from the node's or pod's index when given."""
+        with self._lock:
+            if pod_id is not None:
+                entries = list(self._by_pod.get(pod_id, ()))
+            elif node_id is not None:
+                entries = list(self._by_node.get(node_id, ()))
+            else:
+                entries = list(self._events)
+        # ids increase along every list, so skip the older ones by bisection
+        lo, hi = 0, len(entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entries[mid][0] <= after_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return entries[lo:]
+
+    def drop_older(self, ts):
+        """Evict events stamped before ``ts``; returns how many went."""
+        with self._lock:
+            dropped = 0
+            while self._events and self._events[0][1][0] < ts:
+                self._evict_oldest()
+                dropped += 1
+            return dropped
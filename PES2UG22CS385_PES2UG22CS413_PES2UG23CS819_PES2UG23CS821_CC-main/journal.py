@@ -0,0 +1,361 @@
+import argparse
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory lock on the state directory
+    fcntl = None
+
+# ----------------------------------
+# File format
+# ----------------------------------
+# A state directory holds one snapshot.bin and one or more journal-<gen>.bin
+# files. Both are a magic line followed by frames of <length, crc32> + pickle.
+# The snapshot holds a single frame (gen, node rows, pod rows) covering every
+# journal generation below ``gen``; each journal frame is one committed batch
+# of mutations. Rows use the server's nodes/pods column order (node_db_row /
+# pod_db_row), so a row is a node_id / pod_id followed by its columns.
+#
+# Mutations, applied in order within a batch:
+#   ("drop_node", node_id)   node row and every pod row still on it
+#   ("node", row)            insert or replace a node row
+#   ("pod", row)             insert or replace a pod row (node_id None: pending)
+#   ("move_pod", pod_id, node_id)
+SNAPSHOT_MAGIC = b"CCSNAP1\n"
+JOURNAL_MAGIC  = b"CCJRNL1\n"
+FRAME          = struct.Struct("<II")  # payload length, crc32
+SNAPSHOT_FILE  = "snapshot.bin"
+LOCK_FILE      = "LOCK"  # flock'ed by the one process that has the directory open
+
+NODE_CPU_TOTAL, NODE_CPU_AVAILABLE, NODE_MEMORY_TOTAL, NODE_MEMORY_AVAILABLE = 1, 2, 3, 4
+POD_NODE_ID, POD_CPU, POD_MEMORY = 1, 2, 3
+
+
+class JournalError(Exception):
+    """A snapshot or journal file that cannot be trusted (bad magic, checksum or torn frame)."""
+
+
+class JournalLocked(JournalError):
+    """The state directory is already open in another process."""
+
+
+def _journal_name(gen):
+    return f"journal-{gen:06d}.bin"
+
+
+def _frames(buf, start):
+    """Yield (payload, end offset) for every intact frame; stops at the first torn one."""
+    offset = start
+    while offset + FRAME.size <= len(buf):
+        length, crc = FRAME.unpack_from(buf, offset)
+        end = offset + FRAME.size + length
+        if end > len(buf):
+            return
+        payload = buf[offset + FRAME.size:end]
+        if zlib.crc32(payload) != crc:
+            return
+        yield payload, end
+        offset = end
+
+
+def _frame(payload):
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class ClusterRows:
+    """Node and pod rows keyed by id; the pods-by-node index for drop_node is built on first use."""
+
+    def __init__(self, node_rows=(), pod_rows=()):
+        self.nodes = {row[0]: row for row in node_rows}
+        self.pods = {row[0]: row for row in pod_rows}
+        self._by_node = None
+
+    def by_node(self):
+        if self._by_node is None:
+            self._by_node = {}
+            for pid, row in self.pods.items():
+                self._by_node.setdefault(row[POD_NODE_ID], set()).add(pid)
+        return self._by_node
+
+    def _put_pod(self, row):
+        old = self.pods.get(row[0])
+        self.pods[row[0]] = row
+        if self._by_node is not None:
+            if old is not None:
+                self._by_node[old[POD_NODE_ID]].discard(row[0])
+            self._by_node.setdefault(row[POD_NODE_ID], set()).add(row[0])
+
+    def apply(self, ops):
+        for op in ops:
+            kind = op[0]
+            if kind == "node":
+                self.nodes[op[1][0]] = op[1]
+            elif kind == "pod":
+                self._put_pod(op[1])
+            elif kind == "drop_node":
+                self.nodes.pop(op[1], None)
+                for pid in self.by_node().pop(op[1], ()):
+                    del self.pods[pid]
+            elif kind == "move_pod":
+                row = self.pods.get(op[1])
+                if row is not None:
+                    self._put_pod((row[0], op[2]) + row[2:])
+            else:
+                raise JournalError(f"Unknown mutation {kind!r}")
+
+
+# ----------------------------------
+# Snapshot + journal
+# ----------------------------------
+class StateJournal:
+    """Append-only mutation journal with periodic snapshots of the whole state.
+
+    ``append`` writes one frame per committed batch, so a batch is replayed
+    completely or not at all. ``compact`` switches appends to a fresh
+    journal generation first and folds the older ones into a new snapshot
+    afterwards, so writers are only held up for the file switch. A crash at
+    any point leaves either the old snapshot plus every journal, or the new
+    snapshot plus the journals it does not cover; both replay to the same
+    state. Files are trusted pickles: only point this at directories the
+    server itself wrote. ``load`` and ``start`` take an exclusive lock on
+    the directory (where fcntl exists) that ``close`` releases, so a second
+    process fails fast instead of appending to and compacting the same files.
+    """
+
+    def __init__(self, directory, sync=False):
+        self.directory = directory
+        self.sync = sync              # fsync every batch (otherwise only snapshots)
+        self.journal_bytes = 0        # size of the generation being appended to
+        self._gen = None
+        self._file = None
+        self._dir_lock = None
+        self._lock = threading.Lock()          # append vs. generation switch
+        self._compacting = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _lock_directory(self):
+        if self._dir_lock is not None or fcntl is None:
+            return
+        f = open(self._path(LOCK_FILE), "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise JournalLocked(f"{self.directory} is in use by another process")
+        self._dir_lock = f
+
+    def _journal_gens(self):
+        gens = []
+        for name in os.listdir(self.directory):
+            if name.startswith("journal-") and name.endswith(".bin"):
+                gens.append(int(name[len("journal-"):-len(".bin")]))
+        return sorted(gens)
+
+    def exists(self):
+        return os.path.exists(self._path(SNAPSHOT_FILE))
+
+    def _read_snapshot(self):
+        path = self._path(SNAPSHOT_FILE)
+        start = len(SNAPSHOT_MAGIC) + FRAME.size
+        if os.path.getsize(path) < start:
+            raise JournalError(f"{SNAPSHOT_FILE}: truncated")
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise JournalError(f"{SNAPSHOT_FILE}: not a snapshot")
+            length, crc = FRAME.unpack_from(buf, len(SNAPSHOT_MAGIC))
+            # Checksum and unpickle straight from the mapping, without a copy
+            with memoryview(buf)[start:start + length] as payload:
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    raise JournalError(f"{SNAPSHOT_FILE}: checksum mismatch")
+                return pickle.loads(payload)
+
+    def _replay_journal(self, gen, rows, repair=False):
+        """Apply every intact frame of one generation; return (frames, torn bytes)."""
+        path = self._path(_journal_name(gen))
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < len(JOURNAL_MAGIC) and JOURNAL_MAGIC.startswith(data):
+            # Created but its header never reached the disk
+            if repair:
+                open(path, "wb").close()
+            return 0, len(data)
+        if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+            raise JournalError(f"{_journal_name(gen)}: not a journal")
+        frames, end = 0, len(JOURNAL_MAGIC)
+        for payload, end in _frames(data, end):
+            rows.apply(pickle.loads(payload))
+            frames += 1
+        torn = len(data) - end
+        if torn and repair:
+            # A batch cut off by a crash was never acknowledged; drop it
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return frames, torn
+
+    def _write_snapshot(self, gen, rows):
+        payload = pickle.dumps((gen, list(rows.nodes.values()), list(rows.pods.values())),
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = self._path(SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_frame(payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(SNAPSHOT_FILE))
+
+    def _open_generation(self, gen):
+        # Caller holds _lock (or is the only user, during load/start)
+        path = self._path(_journal_name(gen))
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        f = open(path, "ab")
+        if fresh:
+            f.write(JOURNAL_MAGIC)
+            f.flush()
+        if self._file is not None:
+            self._file.close()
+        self._file, self._gen = f, gen
+        self.journal_bytes = f.tell()
+
+    def load(self):
+        """Snapshot plus journal tail as ClusterRows; later appends go to the newest generation."""
+        self._lock_directory()
+        snap_gen, node_rows, pod_rows = self._read_snapshot()
+        rows = ClusterRows(node_rows, pod_rows)
+        gens = [g for g in self._journal_gens() if g >= snap_gen]
+        for gen in gens:
+            _, torn = self._replay_journal(gen, rows, repair=(gen == gens[-1]))
+            if torn and gen != gens[-1]:
+                raise JournalError(f"{_journal_name(gen)}: damaged before the newest journal")
+        self._remove_journals_below(snap_gen)
+        self._open_generation(gens[-1] if gens else snap_gen)
+        return rows
+
+    def start(self, rows):
+        """Begin a new state directory from ``rows`` (e.g. imported from SQLite)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_directory()
+        self._write_snapshot(1, rows)
+        self._remove_journals_below(1)
+        self._open_generation(1)
+
+    def append(self, ops):
+        if not ops:
+            return
+        data = _frame(pickle.dumps(ops, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            self.journal_bytes += len(data)
+
+    def _remove_journals_below(self, gen):
+        for old in self._journal_gens():
+            if old < gen:
+                os.remove(self._path(_journal_name(old)))
+
+    def compact(self):
+        """Fold every finished journal generation into a new snapshot; False if one is already running."""
+        if not self._compacting.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                covered = self._gen
+                self._open_generation(covered + 1)
+            snap_gen, node_rows, pod_rows = self._read_snapshot()
+            rows = ClusterRows(node_rows, pod_rows)
+            for gen in self._journal_gens():
+                if snap_gen <= gen <= covered:
+                    self._replay_journal(gen, rows)
+            self._write_snapshot(covered + 1, rows)
+            self._remove_journals_below(covered + 1)
+            return True
+        finally:
+            self._compacting.release()
+
+    def compact_in_background(self):
+        if not self._compacting.locked():
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._dir_lock is not None:
+                self._dir_lock.close()  # releases the flock
+                self._dir_lock = None
+
+
+# ----------------------------------
+# Offline checks
+# ----------------------------------
+def verify(directory):
+    """Replay a state directory read-only and return (summary, problems)."""
+    journal = StateJournal(directory)
+    snap_gen, node_rows, pod_rows = journal._read_snapshot()
+    rows = ClusterRows(node_rows, pod_rows)
+    summary = {"snapshot_gen": snap_gen, "snapshot_nodes": len(node_rows),
+               "snapshot_pods": len(pod_rows), "journal_frames": 0, "torn_bytes": 0}
+    problems = []
+    gens = [g for g in journal._journal_gens() if g >= snap_gen]
+    for gen in gens:
+        frames, torn = journal._replay_journal(gen, rows)
+        summary["journal_frames"] += frames
+        summary["torn_bytes"] += torn
+        if torn and gen != gens[-1]:
+            problems.append(f"{_journal_name(gen)}: {torn} damaged bytes before the newest journal")
+
+    used = {nid: [0, 0] for nid in rows.nodes}
+    for pid, row in rows.pods.items():
+        nid = row[POD_NODE_ID]
+        if nid is None:
+            continue
+        if nid not in used:
+            problems.append(f"pod {pid} is on unknown node {nid}")
+            continue
+        used[nid][0] += row[POD_CPU]
+        used[nid][1] += row[POD_MEMORY]
+    for nid, (cpu, mem) in used.items():
+        row = rows.nodes[nid]
+        if (row[NODE_CPU_TOTAL] - row[NODE_CPU_AVAILABLE], row[NODE_MEMORY_TOTAL] - row[NODE_MEMORY_AVAILABLE]) != (cpu, mem):
+            problems.append(f"node {nid} accounts {row[NODE_CPU_TOTAL] - row[NODE_CPU_AVAILABLE]} CPU/"
+                            f"{row[NODE_MEMORY_TOTAL] - row[NODE_MEMORY_AVAILABLE]}GB in use, its pods hold {cpu} CPU/{mem}GB")
+    summary["nodes"] = len(rows.nodes)
+    summary["pods"] = len(rows.pods)
+    summary["pending_pods"] = len(rows.by_node().get(None, ()))
+    return summary, problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or compact a cluster state directory (server must be stopped to compact)")
+    parser.add_argument("command", choices=["verify", "compact"])
+    parser.add_argument("directory", nargs="?", default="cluster_state", help="State directory (default: cluster_state)")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.directory, SNAPSHOT_FILE)):
+        sys.exit(f"❌ No {SNAPSHOT_FILE} in {args.directory}")
+    try:
+        if args.command == "compact":
+            journal = StateJournal(args.directory)
+            journal.load()
+            journal.compact()
+            journal.close()
+            print(f"✅ Compacted {args.directory}")
+        summary, problems = verify(args.directory)
+    except JournalError as e:
+        sys.exit(f"❌ {e}")
+    print(", ".join(f"{k}={v}" for k, v in summary.items()))
+    for problem in problems:
+        print("❌", problem)
+    if problems:
+        sys.exit(1)
+    print("✅ State is consistent")
@@ -0,0 +1,103 @@
+import csv
+import gc
+import io
+import json
+
+# ----------------------------------
+# Cluster report export
+# ----------------------------------
+# A report is taken in two steps. ``snapshot`` runs under the caller's lock
+# and only copies the per-node fields into tuples (pods are kept by
+# reference: pod_id, cpu, memory, network_group and priority never change
+# after a pod is created). ``export`` then formats rows from that snapshot
+# outside the lock, ``chunk`` rows per yielded string, so nothing but the
+# snapshot itself grows with the cluster.
+NODE_REPORT_COLUMNS = ("node_id", "status", "node_type", "network_group", "cpu_total", "cpu_available",
+                       "memory_total", "memory_available", "pod_count")
+POD_REPORT_COLUMNS  = ("pod_id", "status", "node_id", "network_group", "cpu", "memory", "priority")
+REPORT_COLUMNS      = {"nodes": NODE_REPORT_COLUMNS, "pods": POD_REPORT_COLUMNS}
+# format -> (mimetype, file extension)
+REPORT_FORMATS      = {"csv": ("text/csv", "csv"), "ndjson": ("application/x-ndjson", "ndjson"),
+                       "columnar": ("application/json", "json")}
+
+
+def snapshot(nodes, pending):
+    """(node tuples, pending pods); call with the lock that guards ``nodes`` held."""
+    # A big cluster's tuples would trigger several full collections over the
+    # live node and pod dicts, most of the time spent under the lock; the
+    # tuples hold no cycles, so collection waits until they are built
+    paused = gc.isenabled()
+    gc.disable()
+    try:
+        return ([(n["node_id"], n["status"], n["node_type"], n["network_group"], n["cpu_total"], n["cpu_available"],
+                  n["memory_total"], n["memory_available"], tuple(n["pods"])) for n in nodes.values()],
+                list(pending))
+    finally:
+        if paused:
+            gc.enable()
+
+
+def report_rows(snap, rows):
+    """Row tuples in REPORT_COLUMNS[rows] order: one per node, or one per pod (placed, then pending)."""
+    node_rows, pending = snap
+    if rows == "nodes":
+        for *fields, pods in node_rows:
+            yield (*fields, len(pods))
+        return
+    for node_id, *_, pods in node_rows:
+        for p in pods:
+            yield (p["pod_id"], "scheduled", node_id, p["network_group"], p["cpu"], p["memory"], p.get("priority", 0))
+    for p in pending:
+        yield (p["pod_id"], "pending", None, p["network_group"], p["cpu"], p["memory"], p.get("priority", 0))
+
+
+def _chunks(rows, chunk):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv(snap, rows, chunk):
+    out = io.StringIO()
+    w = csv.writer(out)
+    w.writerow(REPORT_COLUMNS[rows])
+    for batch in _chunks(report_rows(snap, rows), chunk):
+        w.writerows(batch)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+
+def _ndjson(snap, rows, chunk):
+    columns = REPORT_COLUMNS[rows]
+    for batch in _chunks(report_rows(snap, rows), chunk):
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in batch)
+
+
+def _columnar(snap, rows, chunk):
+    # {"columns": [...], "data": {column: [values...]}}: one pass over the
+    # snapshot per column, so each column is written out contiguously
+    columns = REPORT_COLUMNS[rows]
+    yield '{"columns": %s, "data": {' % json.dumps(columns)
+    for i, column in enumerate(columns):
+        yield ("," if i else "") + json.dumps(column) + ": ["
+        sep = ""
+        for batch in _chunks(report_rows(snap, rows), chunk):
+            yield sep + json.dumps([row[i] for row in batch])[1:-1]
+            sep = ","
+        yield "]"
+    yield "}}"
+
+
+ENCODERS = {"csv": _csv, "ndjson": _ndjson, "columnar": _columnar}
+
+
+def export(snap, fmt="csv", rows="nodes", chunk=1000):
+    """Yield the report as strings of up to ``chunk`` rows each."""
+    return ENCODERS[fmt](snap, rows, chunk)
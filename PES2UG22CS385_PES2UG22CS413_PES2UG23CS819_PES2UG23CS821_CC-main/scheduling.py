@@ -0,0 +1,691 @@
+import bisect
+import itertools
+
+try:
+    import numpy as np
+except ImportError:  # vectorized scoring is optional
+    np = None
+
+
+# ----------------------------------
+# Scoring strategies
+# ----------------------------------
+# name -> (score, maximize). ``score(cpu_left, mem_left, cpu_total, mem_total,
+# pod_cpu, pod_mem)`` is evaluated on what a node would have left after taking
+# the pod; it must only use arithmetic so the same function scores one node
+# (plain numbers) or every candidate at once (NumPy arrays). Ties go to the
+# node that joined the cluster first.
+STRATEGIES = {}
+
+
+def strategy(name, maximize=False):
+    """Register a scoring function under ``name`` (usable as scheduling_algorithm)."""
+    def register(score):
+        STRATEGIES[name] = (score, maximize)
+        return score
+    return register
+
+
+def _larger(a, b):
+    """Element-wise max that works on numbers and NumPy arrays alike."""
+    return (a + b + abs(a - b)) / 2
+
+
+@strategy("first_fit")
+def _first_fit(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    return 0 * cpu_left
+
+
+@strategy("best_fit")
+def _best_fit(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    return cpu_left + mem_left
+
+
+@strategy("worst_fit", maximize=True)
+def _worst_fit(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    return cpu_left + mem_left
+
+
+@strategy("dominant_best_fit")
+def _dominant_best_fit(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    """Tightest node measured by its dominant leftover share, not cores + GB."""
+    return _larger(cpu_left / cpu_total, mem_left / mem_total)
+
+
+@strategy("dot_product", maximize=True)
+def _dot_product(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    """Node whose free shape lines up best with the pod's demand (normalized)."""
+    cpu_free, mem_free = cpu_left + pod_cpu, mem_left + pod_mem
+    return (pod_cpu / cpu_total) * (cpu_free / cpu_total) + (pod_mem / mem_total) * (mem_free / mem_total)
+
+
+@strategy("least_stranded")
+def _least_stranded(cpu_left, mem_left, cpu_total, mem_total, pod_cpu, pod_mem):
+    """Node left most balanced, so neither resource is stranded by the other running out."""
+    return abs(cpu_left / cpu_total - mem_left / mem_total)
+
+
+# Strategies the sorted CapacityIndex answers without scoring every candidate
+INDEXED_STRATEGIES = ("first_fit", "best_fit", "worst_fit")
+
+
+def choose_node(eligible, pod, algo):
+    """Pick from already-filtered node dicts with a registered strategy (ties: first in list)."""
+    score, maximize = STRATEGIES[algo]
+    best = best_key = None
+    for n in eligible:
+        key = score(n["cpu_available"] - pod["cpu"], n["memory_available"] - pod["memory"],
+                    n["cpu_total"], n["memory_total"], pod["cpu"], pod["memory"])
+        if maximize:
+            key = -key
+        if best is None or key < best_key:
+            best, best_key = n, key
+    return best
+
+
+class _Partition:
+    """Active nodes of one (network_group, node_type) pair.
+
+    Two views are kept in sync:
+      * a max-segment-tree over insertion slots, so first_fit can descend to the
+        left-most node with enough CPU *and* memory without visiting the rest;
+      * a list sorted by free capacity (cpu + memory), so best_fit / worst_fit
+        start from a bisect position instead of scanning every node.
+    """
+
+    def __init__(self):
+        self.slot_of = {}      # node_id -> slot (insertion order inside partition)
+        self.slot_ids = []     # slot -> node_id (None once removed)
+        self.cap = 1
+        self.max_cpu = [-1, -1]
+        self.max_mem = [-1, -1]
+        self.by_free = []      # sorted (cpu + memory, seq, node_id, cpu, memory)
+        self.free_key = {}     # node_id -> its tuple in by_free
+        self.removed = 0
+
+    # -- segment tree helpers --
+    def _grow(self):
+        old = self.cap
+        while self.cap < len(self.slot_ids):
+            self.cap *= 2
+        if self.cap == old:
+            return
+        cpu = [-1] * (2 * self.cap)
+        mem = [-1] * (2 * self.cap)
+        cpu[self.cap:self.cap + old] = self.max_cpu[old:2 * old]
+        mem[self.cap:self.cap + old] = self.max_mem[old:2 * old]
+        for i in range(self.cap - 1, 0, -1):
+            cpu[i] = max(cpu[2 * i], cpu[2 * i + 1])
+            mem[i] = max(mem[2 * i], mem[2 * i + 1])
+        self.max_cpu, self.max_mem = cpu, mem
+
+    def _set_leaf(self, slot, cpu, mem):
+        i = self.cap + slot
+        self.max_cpu[i], self.max_mem[i] = cpu, mem
+        i //= 2
+        while i:
+            self.max_cpu[i] = max(self.max_cpu[2 * i], self.max_cpu[2 * i + 1])
+            self.max_mem[i] = max(self.max_mem[2 * i], self.max_mem[2 * i + 1])
+            i //= 2
+
+    def _compact(self):
+        live = [nid for nid in self.slot_ids if nid is not None]
+        leaves = [(self.max_cpu[self.cap + self.slot_of[nid]],
+                   self.max_mem[self.cap + self.slot_of[nid]]) for nid in live]
+        self.slot_ids, self.slot_of, self.removed = live, {}, 0
+        self.cap = 1
+        self.max_cpu, self.max_mem = [-1, -1], [-1, -1]
+        for slot, nid in enumerate(live):
+            self.slot_of[nid] = slot
+        self._grow()
+        for slot, (cpu, mem) in enumerate(leaves):
+            self._set_leaf(slot, cpu, mem)
+
+    # -- mutations --
+    def set(self, node_id, seq, cpu, mem, active):
+        slot = self.slot_of.get(node_id)
+        if slot is None:
+            slot = len(self.slot_ids)
+            self.slot_of[node_id] = slot
+            self.slot_ids.append(node_id)
+            self._grow()
+        self._set_leaf(slot, cpu if active else -1, mem if active else -1)
+
+        old = self.free_key.pop(node_id, None)
+        if old is not None:
+            del self.by_free[bisect.bisect_left(self.by_free, old)]
+        if active:
+            key = (cpu + mem, seq, node_id, cpu, mem)
+            bisect.insort(self.by_free, key)
+            self.free_key[node_id] = key
+
+    def drop(self, node_id):
+        self.set(node_id, 0, -1, -1, False)
+        slot = self.slot_of.pop(node_id)
+        self.slot_ids[slot] = None
+        self.removed += 1
+        if self.removed * 2 > len(self.slot_ids):
+            self._compact()
+
+    # -- lookups --
+    def first_fit(self, cpu, mem):
+        if self.max_cpu[1] < cpu or self.max_mem[1] < mem:
+            return None
+        stack = [1]
+        while stack:
+            i = stack.pop()
+            if self.max_cpu[i] < cpu or self.max_mem[i] < mem:
+                continue
+            if i >= self.cap:
+                return self.slot_ids[i - self.cap]
+            stack.append(2 * i + 1)
+            stack.append(2 * i)
+        return None
+
+    def best_fit(self, cpu, mem):
+        """Smallest cpu + memory leftover that still fits (ties: oldest node)."""
+        start = bisect.bisect_left(self.by_free, (cpu + mem,))
+        for j in range(start, len(self.by_free)):
+            entry = self.by_free[j]
+            if entry[3] >= cpu and entry[4] >= mem:
+                return entry
+        return None
+
+    def worst_fit(self, cpu, mem):
+        """Largest cpu + memory free that fits (ties: oldest node)."""
+        hi = len(self.by_free)
+        while hi:
+            total = self.by_free[hi - 1][0]
+            if total < cpu + mem:
+                break
+            # equal totals are ordered by seq, so the first fit in the run wins
+            lo = bisect.bisect_left(self.by_free, (total,), 0, hi)
+            for j in range(lo, hi):
+                entry = self.by_free[j]
+                if entry[3] >= cpu and entry[4] >= mem:
+                    return entry
+            hi = lo
+        return None
+
+
+class CapacityColumns:
+    """Columnar (NumPy) mirror of node capacity.
+
+    One row per node holding available and total CPU/memory, a status code,
+    an interned network-group id and node-type id, plus the arrival sequence
+    used for tie-breaks. Eligibility is a single boolean mask over the arrays
+    and fit scores are computed for all candidates at once instead of calling
+    a Python key function per node dict.
+    """
+
+    ACTIVE = 1
+
+    def __init__(self, capacity=1024):
+        self._row_of = {}      # node_id -> row
+        self._ids = []         # row -> node_id
+        self._free_rows = []
+        self._group_ids = {}
+        self._type_ids = {}
+        self.cpu_available = np.zeros(capacity)
+        self.memory_available = np.zeros(capacity)
+        self.cpu_total = np.ones(capacity)
+        self.memory_total = np.ones(capacity)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.group = np.full(capacity, -1, dtype=np.int32)
+        self.type = np.full(capacity, -1, dtype=np.int32)
+        self.seq = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self):
+        size = 2 * len(self.status)
+        fill = {"group": -1, "type": -1, "cpu_total": 1, "memory_total": 1}
+        for name in ("cpu_available", "memory_available", "cpu_total", "memory_total",
+                     "status", "group", "type", "seq"):
+            old = getattr(self, name)
+            new = np.full(size, fill.get(name, 0), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def update(self, node, seq):
+        nid = node["node_id"]
+        row = self._row_of.get(nid)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._ids[row] = nid
+            else:
+                row = len(self._ids)
+                self._ids.append(nid)
+                if row >= len(self.status):
+                    self._grow()
+            self._row_of[nid] = row
+        self.cpu_available[row] = node["cpu_available"]
+        self.memory_available[row] = node["memory_available"]
+        self.cpu_total[row] = node["cpu_total"]
+        self.memory_total[row] = node["memory_total"]
+        self.status[row] = self.ACTIVE if node["status"] == "active" else 0
+        self.group[row] = self._group_ids.setdefault(node["network_group"], len(self._group_ids))
+        self.type[row] = self._type_ids.setdefault(node["node_type"], len(self._type_ids))
+        self.seq[row] = seq
+
+    def remove(self, node_id):
+        row = self._row_of.pop(node_id, None)
+        if row is None:
+            return
+        self.status[row] = 0
+        self.group[row] = -1
+        self._ids[row] = None
+        self._free_rows.append(row)
+
+    def eligible_rows(self, pod):
+        """Rows of active nodes in the pod's group (and affinity) with room for it."""
+        gid = self._group_ids.get(pod["network_group"])
+        if gid is None:
+            return np.empty(0, dtype=np.intp)
+        n = len(self._ids)
+        mask = ((self.status[:n] == self.ACTIVE)
+                & (self.group[:n] == gid)
+                & (self.cpu_available[:n] >= pod["cpu"])
+                & (self.memory_available[:n] >= pod["memory"]))
+        if "node_affinity" in pod:
+            tid = self._type_ids.get(pod["node_affinity"])
+            if tid is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self.type[:n] == tid
+        return np.flatnonzero(mask)
+
+    def pick(self, rows, scores, maximize=False):
+        """node_id of the best-scoring row; ties go to the oldest node."""
+        best = scores.max() if maximize else scores.min()
+        tied = rows[scores == best]
+        return self._ids[tied[np.argmin(self.seq[tied])]]
+
+    def find(self, pod, algo):
+        """Score every eligible row with a registered strategy in one pass."""
+        rows = self.eligible_rows(pod)
+        if not rows.size:
+            return None
+        score, maximize = STRATEGIES[algo]
+        scores = score(self.cpu_available[rows] - pod["cpu"], self.memory_available[rows] - pod["memory"],
+                       self.cpu_total[rows], self.memory_total[rows], pod["cpu"], pod["memory"])
+        return self.pick(rows, scores, maximize)
+
+
+class CapacityIndex:
+    """Index of active nodes used by schedule_pod.
+
+    Nodes are partitioned by (network_group, node_type) and ordered by their
+    available CPU/memory, so placement lookups no longer scan ``nodes``. Every
+    code path that changes a node's capacity or status must call ``update``;
+    removing a node from the cluster must call ``remove``.
+
+    first_fit, best_fit and worst_fit are answered from the sorted views; any
+    other registered strategy scores the eligible nodes of the pod's
+    partitions. With ``vectorized=True`` (and NumPy installed) a
+    CapacityColumns mirror is kept in step and does that scoring, including
+    best_fit / worst_fit, in one vectorized pass.
+    """
+
+    def __init__(self, vectorized=False):
+        self._partitions = {}   # (network_group, node_type) -> _Partition
+        self._groups = {}       # network_group -> set of node_types present
+        self._key_of = {}       # node_id -> partition key
+        self._seq_of = {}       # node_id -> arrival order (first_fit tie-break)
+        self._nodes = {}        # node_id -> node dict (totals for strategy scoring)
+        self._seq = itertools.count()
+        self.columns = CapacityColumns() if vectorized and np is not None else None
+
+    def rebuild(self, nodes):
+        """Re-index every node from scratch (e.g. after load_cluster_state)."""
+        self.__init__(vectorized=self.columns is not None)
+        for node in nodes.values():
+            self.update(node)
+
+    def update(self, node):
+        """Refresh one node after its capacity, status or placement changed."""
+        nid = node["node_id"]
+        key = (node["network_group"], node["node_type"])
+        if self._key_of.get(nid, key) != key:
+            self.remove(nid)
+        if nid not in self._seq_of:
+            self._seq_of[nid] = next(self._seq)
+        part = self._partitions.get(key)
+        if part is None:
+            part = self._partitions[key] = _Partition()
+            self._groups.setdefault(key[0], set()).add(key[1])
+        self._key_of[nid] = key
+        self._nodes[nid] = node
+        part.set(nid, self._seq_of[nid], node["cpu_available"],
+                 node["memory_available"], node["status"] == "active")
+        if self.columns is not None:
+            self.columns.update(node, self._seq_of[nid])
+
+    def remove(self, node_id):
+        """Forget a node that has been removed from the cluster."""
+        key = self._key_of.pop(node_id, None)
+        self._seq_of.pop(node_id, None)
+        self._nodes.pop(node_id, None)
+        if key is not None:
+            self._partitions[key].drop(node_id)
+        if self.columns is not None:
+            self.columns.remove(node_id)
+
+    def _pod_partitions(self, pod):
+        group = pod["network_group"]
+        if "node_affinity" in pod:
+            types = [pod["node_affinity"]]
+        else:
+            types = self._groups.get(group, ())
+        for ntype in types:
+            part = self._partitions.get((group, ntype))
+            if part is not None:
+                yield part
+
+    def _scored_find(self, pod, algo):
+        score, maximize = STRATEGIES[algo]
+        cpu, mem = pod["cpu"], pod["memory"]
+        best = best_key = None
+        for part in self._pod_partitions(pod):
+            # nothing below this position has enough cpu + memory combined
+            start = bisect.bisect_left(part.by_free, (cpu + mem,))
+            for j in range(start, len(part.by_free)):
+                _, seq, nid, ncpu, nmem = part.by_free[j]
+                if ncpu < cpu or nmem < mem:
+                    continue
+                node = self._nodes[nid]
+                key = score(ncpu - cpu, nmem - mem, node["cpu_total"], node["memory_total"], cpu, mem)
+                key = (-key if maximize else key, seq)
+                if best is None or key < best_key:
+                    best, best_key = nid, key
+        return best
+
+    def find(self, pod, algo):
+        """Return the node_id chosen for ``pod`` by ``algo``, or None if nothing fits.
+
+        ``algo`` must be a name registered in STRATEGIES.
+        """
+        if algo not in STRATEGIES:
+            raise ValueError(f"Unknown scheduling algorithm: {algo}")
+        if self.columns is not None and algo != "first_fit":
+            return self.columns.find(pod, algo)
+        if algo not in INDEXED_STRATEGIES:
+            return self._scored_find(pod, algo)
+        cpu, mem = pod["cpu"], pod["memory"]
+
+        best = None
+        for part in self._pod_partitions(pod):
+            if algo == "first_fit":
+                nid = part.first_fit(cpu, mem)
+                if nid is not None and (best is None or self._seq_of[nid] < self._seq_of[best]):
+                    best = nid
+            elif algo == "best_fit":
+                entry = part.best_fit(cpu, mem)
+                if entry is not None and (best is None or entry[:2] < best[:2]):
+                    best = entry
+            else:  # worst_fit
+                entry = part.worst_fit(cpu, mem)
+                if entry is not None and (best is None or (entry[0], -entry[1]) > (best[0], -best[1])):
+                    best = entry
+        if best is None or algo == "first_fit":
+            return best
+        return best[2]
+
+
+# ----------------------------------
+# Priorities & preemption
+# ----------------------------------
+class PriorityIndex:
+    """Per-node view of placed pods ordered by priority, for preemption.
+
+    Each node keeps its pods sorted lowest priority first (newest first within
+    a priority), and nodes are kept sorted by their lowest pod priority, so
+    a preemptor of priority P only visits nodes that hold something below P
+    and only walks that node's pods below P. Callers mirror every placement
+    with ``add`` and every removal with ``remove`` / ``drop_node``.
+    """
+
+    def __init__(self):
+        self._pods = {}     # node_id -> sorted [(priority, -seq, pod_id, pod)]
+        self._floor = []    # sorted [(lowest priority, node_id)] for nodes with pods
+        self._seq = itertools.count()
+
+    def _set_floor(self, node_id, old, new):
+        if old is not None:
+            del self._floor[bisect.bisect_left(self._floor, (old, node_id))]
+        if new is not None:
+            bisect.insort(self._floor, (new, node_id))
+
+    def add(self, node_id, pod):
+        entries = self._pods.setdefault(node_id, [])
+        old = entries[0][0] if entries else None
+        bisect.insort(entries, (pod.get("priority", 0), -next(self._seq), pod["pod_id"], pod))
+        if entries[0][0] != old:
+            self._set_floor(node_id, old, entries[0][0])
+
+    def remove(self, node_id, pod_id):
+        entries = self._pods.get(node_id, [])
+        for i, entry in enumerate(entries):
+            if entry[2] == pod_id:
+                old = entries[0][0]
+                del entries[i]
+                new = entries[0][0] if entries else None
+                if new != old:
+                    self._set_floor(node_id, old, new)
+                if not entries:
+                    del self._pods[node_id]
+                return
+
+    def drop_node(self, node_id):
+        entries = self._pods.pop(node_id, None)
+        if entries:
+            self._set_floor(node_id, entries[0][0], None)
+
+    def rebuild(self, nodes):
+        # Same entries as add() per pod, but one sort per node instead of an insort per pod
+        self.__init__()
+        for node in nodes.values():
+            if node["pods"]:
+                entries = sorted((pod.get("priority", 0), -next(self._seq), pod["pod_id"], pod)
+                                 for pod in node["pods"])
+                self._pods[node["node_id"]] = entries
+                self._floor.append((entries[0][0], node["node_id"]))
+        self._floor.sort()
+
+    def nodes_below(self, priority):
+        """Node ids holding at least one pod with priority lower than ``priority``."""
+        end = bisect.bisect_left(self._floor, (priority,))
+        return [nid for _, nid in self._floor[:end]]
+
+    def victims(self, node, pod):
+        """Minimal lower-priority pod set on ``node`` whose eviction fits ``pod``.
+
+        Evicts lowest priority first, then reprieves the most valuable
+        victims that are not needed. Returns a list of pods, or None if even
+        evicting every lower-priority pod would not make room.
+        """
+        need_cpu = pod["cpu"] - node["cpu_available"]
+        need_mem = pod["memory"] - node["memory_available"]
+        entries = self._pods.get(node["node_id"], [])
+        lower = entries[:bisect.bisect_left(entries, (pod.get("priority", 0),))]
+        taken, cpu, mem = [], 0, 0
+        for entry in lower:
+            if cpu >= need_cpu and mem >= need_mem:
+                break
+            taken.append(entry)
+            cpu += entry[3]["cpu"]
+            mem += entry[3]["memory"]
+        if cpu < need_cpu or mem < need_mem:
+            return None
+        kept = []
+        for entry in reversed(taken):
+            victim = entry[3]
+            if cpu - victim["cpu"] >= need_cpu and mem - victim["memory"] >= need_mem:
+                cpu -= victim["cpu"]
+                mem -= victim["memory"]
+            else:
+                kept.append(victim)
+        return kept[::-1]
+
+
+# ----------------------------------
+# Fragmentation & consolidation
+# ----------------------------------
+def fragmentation(nodes, cpu, memory):
+    """Share of free CPU on active nodes that cannot host a ``cpu`` x ``memory`` pod.
+
+    0.0 means every free core sits on a node where such a pod still fits;
+    1.0 means the free capacity is scattered into pieces too small for it.
+    """
+    free = stranded = 0
+    for n in nodes.values():
+        if n["status"] != "active":
+            continue
+        free += n["cpu_available"]
+        if n["cpu_available"] < cpu or n["memory_available"] < memory:
+            stranded += n["cpu_available"]
+    return 0.0 if free == 0 else stranded / free
+
+
+def _load(node):
+    return ((node["cpu_total"] - node["cpu_available"]) / node["cpu_total"]
+            + (node["memory_total"] - node["memory_available"]) / node["memory_total"])
+
+
+def plan_consolidation(nodes, max_moves, cpu, memory):
+    """Migration plan that empties the least-loaded active nodes onto fuller ones.
+
+    A node is only drained if all of its pods fit on nodes that are more
+    loaded than it is (best fit, honouring network group and affinity) and
+    doing so strands less free CPU for a ``cpu`` x ``memory`` pod (see
+    ``fragmentation``). Every accepted step frees one whole node and no
+    pod moves twice. Returns at most ``max_moves`` (pod, from_node_id,
+    to_node_id) moves.
+    """
+    def stranded(changed):
+        return sum(c for c, m in changed.values() if c < cpu or m < memory)
+
+    active = sorted((n for n in nodes.values() if n["status"] == "active" and n["cpu_total"] and n["memory_total"]),
+                    key=_load)
+    free = {n["node_id"]: (n["cpu_available"], n["memory_available"]) for n in active}
+    moves, drained, receiving = [], set(), set()
+    for i, src in enumerate(active):
+        if (not src["pods"] or src["node_id"] in receiving
+                or len(moves) + len(src["pods"]) > max_moves):
+            continue
+        trial, plan = dict(free), []
+        for pod in sorted(src["pods"], key=lambda p: (p["cpu"], p["memory"]), reverse=True):
+            best = None
+            for dst in active[i + 1:]:
+                nid = dst["node_id"]
+                cpu_left, mem_left = trial[nid]
+                if (nid in drained or dst["network_group"] != pod["network_group"]
+                        or ("node_affinity" in pod and dst["node_type"] != pod["node_affinity"])
+                        or cpu_left < pod["cpu"] or mem_left < pod["memory"]):
+                    continue
+                left = cpu_left - pod["cpu"] + mem_left - pod["memory"]
+                if best is None or left < best[0]:
+                    best = (left, nid)
+            if best is None:
+                break
+            nid = best[1]
+            trial[nid] = (trial[nid][0] - pod["cpu"], trial[nid][1] - pod["memory"])
+            plan.append((pod, src["node_id"], nid))
+        else:
+            changed = {nid for _, _, nid in plan}
+            after = {nid: trial[nid] for nid in changed}
+            after[src["node_id"]] = (src["cpu_total"], src["memory_total"])
+            if stranded(after) >= stranded({nid: free[nid] for nid in after}):
+                continue
+            free = trial
+            free[src["node_id"]] = after[src["node_id"]]
+            moves += plan
+            drained.add(src["node_id"])
+            receiving.update(to for _, _, to in plan)
+    return moves
+
+
+# ----------------------------------
+# Pending pods
+# ----------------------------------
+class PendingQueue:
+    """Pods waiting for capacity, bucketed by (network_group, node_affinity, shape).
+
+    A shape is the pod's (cpu, memory) request plus its priority. When a
+    node gains capacity, ``candidates`` only looks at the two buckets the node
+    can serve (no affinity, or affinity equal to its node_type) and only at
+    shapes that fit its free capacity, so a capacity change costs
+    O(shapes), not O(queue). Pods come out highest priority first, then in
+    arrival order.
+    """
+
+    def __init__(self):
+        self._buckets = {}   # (network_group, node_affinity) -> {(cpu, memory, -priority): {pod_id: (order, pod)}}
+        self._where = {}     # pod_id -> (bucket key, shape)
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, pod_id):
+        return pod_id in self._where
+
+    def add(self, pod):
+        key = (pod["network_group"], pod.get("node_affinity"))
+        shape = (pod["cpu"], pod["memory"], -pod.get("priority", 0))
+        order = (shape[2], next(self._seq))
+        self._buckets.setdefault(key, {}).setdefault(shape, {})[pod["pod_id"]] = (order, pod)
+        self._where[pod["pod_id"]] = (key, shape)
+
+    def remove(self, pod_id):
+        """Drop a pod from the queue and return it (None if it was not queued)."""
+        where = self._where.pop(pod_id, None)
+        if where is None:
+            return None
+        key, shape = where
+        shapes = self._buckets[key]
+        _, pod = shapes[shape].pop(pod_id)
+        if not shapes[shape]:
+            del shapes[shape]
+            if not shapes:
+                del self._buckets[key]
+        return pod
+
+    def position(self, pod_id):
+        """1-based place of a queued pod in dequeue order, or None."""
+        where = self._where.get(pod_id)
+        if where is None:
+            return None
+        key, shape = where
+        order = self._buckets[key][shape][pod_id][0]
+        return 1 + sum(o < order for shapes in self._buckets.values()
+                       for bucket in shapes.values() for o, _ in bucket.values())
+
+    def pods(self):
+        """Every queued pod, highest priority first, then oldest first."""
+        entries = [e for shapes in self._buckets.values() for bucket in shapes.values() for e in bucket.values()]
+        return [pod for _, pod in sorted(entries, key=lambda e: e[0])]
+
+    def candidates(self, node):
+        """Queued pods that could fit on ``node`` as it is now, in dequeue order.
+
+        Per shape, no more pods are returned than the node could hold.
+        """
+        cpu, mem = node["cpu_available"], node["memory_available"]
+        found = []
+        for affinity in (None, node["node_type"]):
+            for (pod_cpu, pod_mem, _), bucket in self._buckets.get((node["network_group"], affinity), {}).items():
+                if pod_cpu > cpu or pod_mem > mem:
+                    continue
+                # Capacities and sizes may be floats; islice needs a count >= 0
+                room = max(0, int(min(cpu // pod_cpu if pod_cpu > 0 else len(bucket),
+                                      mem // pod_mem if pod_mem > 0 else len(bucket))))
+                found.extend(itertools.islice(bucket.values(), room))
+        return [pod for _, pod in sorted(found, key=lambda e: e[0])]
+
+
+def sort_for_packing(pods):
+    """Order a batch largest-first (CPU, then memory) for *-fit-decreasing packing.
+
+    Higher-priority pods go ahead of any lower-priority ones. The sort is
+    stable, so equally sized pods keep their request order.
+    """
+    return sorted(pods, key=lambda p: (p.get("priority", 0), p["cpu"], p["memory"]), reverse=True)
@@ -1,16 +1,51 @@
+# ASYNC_MODE picks the server runtime: "threading" (the default, Werkzeug's
+# dev server with an OS thread per connection) or "eventlet" / "gevent"
+# (green threads, for thousands of heartbeating agents and dashboards on one
+# process). Those two patch the standard library, so before anything else
+# imports it
+import os
+import sys
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "threading")
+if ASYNC_MODE not in ("threading", "eventlet", "gevent"):
+    sys.exit(f"Unknown ASYNC_MODE {ASYNC_MODE!r}, expected threading, eventlet or gevent")
+try:
+    if ASYNC_MODE == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif ASYNC_MODE == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+except ImportError:
+    sys.exit(f"ASYNC_MODE={ASYNC_MODE} needs the {ASYNC_MODE} package: pip install {ASYNC_MODE}")
+
 import time
 import uuid
 import random
-import csv
-import io
 import sqlite3
-from flask import Flask, request, jsonify, render_template_string, send_file
+import atexit
+import json
+from collections import Counter, defaultdict, deque
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
+
+# spacer line for GitHub diff
+from flask_socketio import ConnectionRefusedError, SocketIO, emit, join_room, leave_room
+
+# spacer line for GitHub diff
+from threading import RLock, Condition, Event
+
+# spacer line for GitHub diff
+from scheduling import (CapacityIndex, PendingQueue, PriorityIndex, STRATEGIES, fragmentation,
 
 # spacer line for GitHub diff
-from flask_socketio import SocketIO, emit
+                        plan_consolidation, sort_for_packing)
 
 # spacer line for GitHub diff
-from threading import Thread, RLock
+from events import EventRing, event_dict, event_row
+from reports import REPORT_COLUMNS, REPORT_FORMATS, export, snapshot
+from state_feed import PacketJSON, StateFeed, room_scope
+
+# spacer line for GitHub diff
+from state_store import IdAllocator, StoreError, node_db_row, open_store, pod_db_row
 
 # spacer line for GitHub diff
 
@@ -77,374 +112,498 @@ def ensure_network(group):
 # ----------------------------------
 # Database Initialization & Persistence
 # ----------------------------------
-def init_db():
+DB_PATH = "cluster.db"
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db")
+
+def open_state_store():
 
 # spacer line for GitHub diff
-    c = conn.cursor()
+    """Open the STATE_STORE backend; its schema or state directory is created on first use."""
 
 # spacer line for GitHub diff
-    c.execute("""
+    global store, pod_ids
 
 # spacer line for GitHub diff
-      CREATE TABLE IF NOT EXISTS event_logs (
+    if STATE_STORE == "journal":
 
 # spacer line for GitHub diff
-        id INTEGER PRIMARY KEY,
+        store = open_store("journal", path=DB_PATH, directory=STATE_JOURNAL_DIR, sync=JOURNAL_FSYNC,
 
 # spacer line for GitHub diff
-        timestamp TEXT,
+                           compact_bytes=JOURNAL_COMPACT_BYTES, rollups=UTILIZATION_ROLLUPS)
 
 # spacer line for GitHub diff
-        message TEXT
+    elif STATE_STORE == "sqlite":
 
 # spacer line for GitHub diff
-      )
+        store = open_store("sqlite", path=DB_PATH, rollups=UTILIZATION_ROLLUPS)
 
 # spacer line for GitHub diff
-    """)
+    elif STATE_STORE == "memory":
 
 # spacer line for GitHub diff
-    c.execute("""
+        store = open_store("memory", rollups=UTILIZATION_ROLLUPS)
 
 # spacer line for GitHub diff
-      CREATE TABLE IF NOT EXISTS utilization_history (
+    else:
 
 # spacer line for GitHub diff
-        id INTEGER PRIMARY KEY,
+        store = open_store(STATE_STORE)
 
 # spacer line for GitHub diff
-        timestamp REAL,
+    atexit.register(store.close)
 
 # spacer line for GitHub diff
-        utilization REAL
+    pod_ids = IdAllocator(store, "pod", POD_ID_BLOCK)
 
 # spacer line for GitHub diff
-      )
+    return store
 
 # spacer line for GitHub diff
-    """)
+
+def save_node_to_db(node):
 
 # spacer line for GitHub diff
-    c.execute("""
+    save_placements_to_db([node])
 
 # spacer line for GitHub diff
-      CREATE TABLE IF NOT EXISTS nodes (
+
+def delete_node_from_db(node_id):
 
 # spacer line for GitHub diff
-        node_id TEXT PRIMARY KEY,
+    store.write(deleted_node_ids=[node_id])
 
 # spacer line for GitHub diff
-        cpu_total INTEGER, cpu_available INTEGER,
+    state_changed([node_id])
 
 # spacer line for GitHub diff
-        memory_total INTEGER, memory_available INTEGER,
+
+def save_pod_to_db(pod, node_id):
 
 # spacer line for GitHub diff
-        node_type TEXT, network_group TEXT,
+    store.write(pod_rows=[pod_db_row(pod, node_id)])
 
 # spacer line for GitHub diff
-        last_heartbeat REAL, status TEXT,
+
+def save_placements_to_db(touched_nodes, placed_pods=(), events=(), deleted_node_ids=(), queued_pods=()):
 
 # spacer line for GitHub diff
-        simulate_heartbeat INTEGER,
+    # One store batch for a whole batch of changes. Must be called WITHOUT
 
 # spacer line for GitHub diff
-        container_id TEXT
+    # nodes_lock held: db_write_lock is taken first and rows are snapshotted
 
 # spacer line for GitHub diff
-      )
+    # under nodes_lock afterwards, so concurrent writers commit in snapshot
 
 # spacer line for GitHub diff
-    """)
+    # order and the newest in-memory state always lands last. Nodes (and
 
 # spacer line for GitHub diff
-    c.execute("""
+    # their pods) removed from the cluster meanwhile are skipped.
 
 # spacer line for GitHub diff
-      CREATE TABLE IF NOT EXISTS pods (
+    # deleted_node_ids lose their node row and remaining pod rows in the
 
 # spacer line for GitHub diff
-        pod_id TEXT PRIMARY KEY,
+    # same batch, ahead of the rows that re-home their pods.
 
 # spacer line for GitHub diff
-        node_id TEXT,
+    # queued_pods are stored with a NULL node_id while still pending.
 
 # spacer line for GitHub diff
-        cpu INTEGER, memory INTEGER,
+    with db_write_lock:
 
 # spacer line for GitHub diff
-        network_group TEXT,
+        with nodes_lock:
 
 # spacer line for GitHub diff
-        node_affinity TEXT,
+            node_rows = [node_db_row(n) for n in touched_nodes if nodes.get(n["node_id"]) is n]
 
 # spacer line for GitHub diff
-        FOREIGN KEY(node_id) REFERENCES nodes(node_id)
+            pod_rows  = [pod_db_row(p, nid) for p, nid in placed_pods
 
 # spacer line for GitHub diff
-      )
+                         if nid in nodes and any(q is p for q in nodes[nid]["pods"])]
 
 # spacer line for GitHub diff
-    """)
+            pod_rows += [pod_db_row(p, None) for p in queued_pods if p["pod_id"] in pending_pods]
 
 # spacer line for GitHub diff
-    conn.commit()
+        store.write(deleted_node_ids, node_rows, pod_rows, events=events)
 
 # spacer line for GitHub diff
-    conn.close()
+    state_changed([n["node_id"] for n in touched_nodes] + list(deleted_node_ids))
 
 # spacer line for GitHub diff
 
-def save_node_to_db(node):
+def update_pod_node_in_db(pod_id, new_node_id):
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db"); c = conn.cursor()
+    store.write(moved_pods=[(pod_id, new_node_id)])
 
 # spacer line for GitHub diff
-    c.execute("""
+
+def load_cluster_state():
 
 # spacer line for GitHub diff
-      INSERT OR REPLACE INTO nodes VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    node_rows, pod_rows = store.load()
 
 # spacer line for GitHub diff
-    """, (
+    for (nid, cpu_tot, cpu_av, mem_tot, mem_av, ntype, ngroup,
 
 # spacer line for GitHub diff
-      node["node_id"],
+         lh, status, sim, cont_id) in node_rows:
 
 # spacer line for GitHub diff
-      node["cpu_total"], node["cpu_available"],
+        nodes[nid] = {
 
 # spacer line for GitHub diff
-      node["memory_total"], node["memory_available"],
+            "node_id": nid,
 
 # spacer line for GitHub diff
-      node["node_type"], node["network_group"],
+            "cpu_total": cpu_tot,
 
 # spacer line for GitHub diff
-      node["last_heartbeat"], node["status"],
+            "cpu_available": cpu_av,
 
 # spacer line for GitHub diff
-      int(node["simulate_heartbeat"]),
+            "memory_total": mem_tot,
 
 # spacer line for GitHub diff
-      node.get("container_id")
+            "memory_available": mem_av,
 
 # spacer line for GitHub diff
-    ))
+            "node_type": ntype,
 
 # spacer line for GitHub diff
-    conn.commit(); conn.close()
+            "network_group": ngroup,
 
 # spacer line for GitHub diff
+            "last_heartbeat": lh,
 
-def delete_node_from_db(node_id):
+# spacer line for GitHub diff
+            "status": status,
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db"); c = conn.cursor()
+            "simulate_heartbeat": bool(sim),
 
 # spacer line for GitHub diff
-    c.execute("DELETE FROM pods WHERE node_id=?", (node_id,))
+            "pods": [],
 
 # spacer line for GitHub diff
-    c.execute("DELETE FROM nodes WHERE node_id=?", (node_id,))
+            "container_id": cont_id
 
 # spacer line for GitHub diff
-    conn.commit(); conn.close()
+        }
 
 # spacer line for GitHub diff
+    # Databases from before the id high-water mark only know their pod rows
 
-def save_pod_to_db(pod, node_id):
+# spacer line for GitHub diff
+    pod_ids.seed(max((int(row[0][4:]) for row in pod_rows
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db"); c = conn.cursor()
+                      if row[0].startswith("pod_") and row[0][4:].isdigit()), default=0))
 
 # spacer line for GitHub diff
-    c.execute("""
+    for (pid, nid, cpu, mem, ng, affinity, algo, prio) in pod_rows:
 
 # spacer line for GitHub diff
-      INSERT OR REPLACE INTO pods VALUES (?,?,?,?,?,?)
+        pod = {"pod_id": pid, "cpu": cpu, "memory": mem,
 
 # spacer line for GitHub diff
-    """, (
+               "network_group": ng, "cpu_usage": 0, "priority": prio or 0}
 
 # spacer line for GitHub diff
-      pod["pod_id"], node_id,
+        if affinity:
 
 # spacer line for GitHub diff
-      pod["cpu"], pod["memory"],
+            pod["node_affinity"] = affinity
 
 # spacer line for GitHub diff
-      pod["network_group"],
+        if algo:
 
 # spacer line for GitHub diff
-      pod.get("node_affinity")
+            pod["scheduling_algorithm"] = algo
 
 # spacer line for GitHub diff
-    ))
+        if nid in nodes:
 
 # spacer line for GitHub diff
-    conn.commit(); conn.close()
+            pod["status"] = "scheduled"
 
 # spacer line for GitHub diff
+            nodes[nid]["pods"].append(pod)
 
-def update_pod_node_in_db(pod_id, new_node_id):
+# spacer line for GitHub diff
+        elif nid is None:
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db"); c = conn.cursor()
+            queue_pod(pod)
 
 # spacer line for GitHub diff
-    c.execute("UPDATE pods SET node_id=? WHERE pod_id=?", (new_node_id, pod_id))
+    capacity_index.rebuild(nodes)
 
 # spacer line for GitHub diff
-    conn.commit(); conn.close()
+    priority_index.rebuild(nodes)
 
 # spacer line for GitHub diff
 
-def load_cluster_state():
+# ----------------------------------
+# Global Data & Locks
+# ----------------------------------
+nodes               = {}
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db"); c = conn.cursor()
+EVENT_RING_SIZE     = 10000
 
 # spacer line for GitHub diff
-    for (nid, cpu_tot, cpu_av, mem_tot, mem_av, ntype, ngroup,
+event_log           = deque(maxlen=50)              # dashboard tail: one line per action
 
 # spacer line for GitHub diff
-         lh, status, sim, cont_id) in c.execute("SELECT * FROM nodes"):
+event_ring          = EventRing(EVENT_RING_SIZE)    # every recent event, by node and by pod
 
 # spacer line for GitHub diff
-        nodes[nid] = {
+utilization_history = []
 
 # spacer line for GitHub diff
-            "node_id": nid,
+nodes_lock          = RLock()
 
 # spacer line for GitHub diff
-            "cpu_total": cpu_tot,
+# Versioned dashboard deltas (see state_feed.py); publish_lock keeps them in version order on the wire
+state_feed          = StateFeed(log_limit=50, history_limit=50, backlog=100, room="cluster")
 
 # spacer line for GitHub diff
-            "cpu_available": cpu_av,
+publish_lock        = RLock()
 
 # spacer line for GitHub diff
-            "memory_total": mem_tot,
+# One feed per room with subscribers, plus the cluster feed, which is never
+# dropped; room_feeds and room_members change under publish_lock
+room_feeds          = {"cluster": state_feed}
 
 # spacer line for GitHub diff
-            "memory_available": mem_av,
+room_members        = Counter()
 
 # spacer line for GitHub diff
-            "node_type": ntype,
+# Pushes follow mutations: state_changed() wakes push_worker, which publishes
+# at most once per PUSH_INTERVAL, and only while a dashboard is subscribed
+PUSH_INTERVAL       = 0.05      # seconds; changes within one interval share a delta
 
 # spacer line for GitHub diff
-            "network_group": ngroup,
+push_cond           = Condition()  # guards changed_nodes, view_changed, client_rooms
 
 # spacer line for GitHub diff
-            "last_heartbeat": lh,
+changed_nodes       = set()     # node ids to diff at the next publish
 
 # spacer line for GitHub diff
-            "status": status,
+view_changed        = False
 
 # spacer line for GitHub diff
-            "simulate_heartbeat": bool(sim),
+client_rooms        = {}        # sid -> rooms it is subscribed to
 
 # spacer line for GitHub diff
-            "pods": [],
+db_write_lock       = RLock()  # orders node/pod snapshots with their store writes
 
 # spacer line for GitHub diff
-            "container_id": cont_id
+POD_ID_BLOCK        = 1000     # pod ids leased at a time from the store's high-water mark
 
 # spacer line for GitHub diff
-        }
+pod_ids             = None     # IdAllocator, set by open_state_store()
 
 # spacer line for GitHub diff
-    for (pid, nid, cpu, mem, ng, affinity) in c.execute("""
+
+DEFAULT_NODE_CPU    = 8
 
 # spacer line for GitHub diff
-        SELECT pod_id,node_id,cpu,memory,network_group,node_affinity FROM pods
+DEFAULT_NODE_MEMORY = 16
 
 # spacer line for GitHub diff
-    """):
+DEFAULT_POD_MEMORY  = 4
 
 # spacer line for GitHub diff
-        pod = {"pod_id": pid, "cpu": cpu, "memory": mem,
+
+AUTO_SCALE_THRESHOLD  = 0.8
 
 # spacer line for GitHub diff
-               "network_group": ng, "cpu_usage": 0}
+last_auto_scale_time = 0
 
 # spacer line for GitHub diff
-        if affinity:
+AUTO_SCALE_COOLDOWN   = 60
 
 # spacer line for GitHub diff
-            pod["node_affinity"] = affinity
+HEARTBEAT_THRESHOLD   = 15
 
 # spacer line for GitHub diff
-        if nid in nodes:
+HEALTH_CHECK_INTERVAL = 5
 
 # spacer line for GitHub diff
-            nodes[nid]["pods"].append(pod)
+
+# Rebalancer: consolidates scattered free capacity by draining lightly loaded nodes
+REBALANCE_INTERVAL      = 30    # seconds between fragmentation checks
 
 # spacer line for GitHub diff
-    conn.close()
+REBALANCE_THRESHOLD     = 0.3   # fragmentation that triggers a plan (pending pods always do)
 
 # spacer line for GitHub diff
+REBALANCE_MAX_MOVES     = 50    # migrations per plan
 
-# ----------------------------------
-# Global Data & Locks
-# ----------------------------------
-nodes               = {}
+# spacer line for GitHub diff
+REBALANCE_BATCH_SIZE    = 10    # migrations per commit
 
 # spacer line for GitHub diff
-event_log           = []
+REBALANCE_BATCH_DELAY   = 1     # seconds between batches
 
 # spacer line for GitHub diff
-utilization_history = []
+FRAGMENTATION_POD_CPU    = DEFAULT_NODE_CPU // 2      # reference pod shape for the
 
 # spacer line for GitHub diff
-nodes_lock          = RLock()
+FRAGMENTATION_POD_MEMORY = DEFAULT_NODE_MEMORY // 2   # fragmentation metric
+
+# spacer line for GitHub diff
+
+# Write-behind: node/pod rows that may lag memory briefly (heartbeats, status
+# flips) are coalesced by id and flushed by persist_writer in one transaction
+PERSIST_INTERVAL        = 1     # seconds between flushes
 
 # spacer line for GitHub diff
-pod_id_lock         = RLock()
+PERSIST_BATCH_SIZE      = 5000  # dirty rows that trigger an early flush
 
 # spacer line for GitHub diff
-pod_id_counter      = 0
+persist_cond            = Condition()  # guards dirty_nodes/dirty_pods
 
 # spacer line for GitHub diff
+dirty_nodes             = {}    # node_id -> node
 
-DEFAULT_NODE_CPU    = 8
+# spacer line for GitHub diff
+dirty_pods              = {}    # pod_id -> (pod, node_id)
 
 # spacer line for GitHub diff
-DEFAULT_NODE_MEMORY = 16
+persist_stop            = Event()
 
 # spacer line for GitHub diff
-DEFAULT_POD_MEMORY  = 4
+persist_done            = Event()  # set once persist_writer has returned
 
 # spacer line for GitHub diff
 
-AUTO_SCALE_THRESHOLD  = 0.8
+SCHEDULING_ALGORITHMS = list(STRATEGIES)  # first_fit, best_fit, worst_fit + normalized multi-resource strategies
 
 # spacer line for GitHub diff
-last_auto_scale_time = 0
+MAX_BULK_PODS         = 1000
 
 # spacer line for GitHub diff
-AUTO_SCALE_COOLDOWN   = 60
+# NumPy column scoring for every non-first_fit strategy; see benchmarks/scoring.py before enabling
+VECTORIZED_SCORING    = False
 
 # spacer line for GitHub diff
-HEARTBEAT_THRESHOLD   = 15
+capacity_index        = CapacityIndex(vectorized=VECTORIZED_SCORING)
+
+# spacer line for GitHub diff
+# Pods that found no node wait here until capacity changes (see drain_pending)
+pending_pods          = PendingQueue()
+
+# spacer line for GitHub diff
+# Placed pods by node, lowest priority first, for finding preemption victims
+priority_index        = PriorityIndex()
+
+# spacer line for GitHub diff
+MAX_PENDING_PODS      = 10000
+
+# spacer line for GitHub diff
+PENDING_SHOWN         = 100  # queued pods pushed in each dashboard state
+
+# spacer line for GitHub diff
+
+# Where node/pod rows, events and utilization samples live (see state_store.py):
+# "journal" keeps node/pod rows in a snapshot + append-only journal and the
+# rest in SQLite, "sqlite" everything in SQLite, "supabase" the Supabase
+# tables, and "memory" nothing on disk (load tests). Set STATE_STORE in the
+# environment to choose at startup
+STATE_STORE           = os.environ.get("STATE_STORE", "journal")
+
+# spacer line for GitHub diff
+STATE_JOURNAL_DIR     = "cluster_state"
+
+# spacer line for GitHub diff
+JOURNAL_COMPACT_BYTES = 64 * 1024 * 1024  # journal size that triggers a new snapshot
+
+# spacer line for GitHub diff
+JOURNAL_FSYNC         = False             # fsync every batch, not only snapshots
+
+# spacer line for GitHub diff
+store                 = None              # set by open_state_store()
+
+# spacer line for GitHub diff
+# What a failed persist can raise: SQLite errors, I/O errors from the journal,
+# or StoreError from a backend's own client (Supabase)
+PERSIST_ERRORS        = (sqlite3.Error, OSError, StoreError)
 
 # spacer line for GitHub diff
-HEALTH_CHECK_INTERVAL = 5
+
+# Utilization samples are rolled up into min/avg/max buckets as they are recorded
+UTILIZATION_INTERVAL    = 10     # seconds between samples
+
+# spacer line for GitHub diff
+UTILIZATION_ROLLUPS     = {"1m": ("utilization_1m", 60), "1h": ("utilization_1h", 3600)}
+
+# spacer line for GitHub diff
+UTILIZATION_MAX_POINTS  = 1000   # resolution=auto picks the finest level under this
+
+# spacer line for GitHub diff
+UTILIZATION_QUERY_LIMIT = 10000  # rows returned by one /utilization_history range read
+
+# spacer line for GitHub diff
+# Retention: table -> (time column, TTL in seconds or None to keep forever)
+RETENTION_TTLS = {
+
+# spacer line for GitHub diff
+    "utilization_history": ("timestamp", 2 * 24 * 3600),
+
+# spacer line for GitHub diff
+    "utilization_1m":      ("bucket",    30 * 24 * 3600),
+
+# spacer line for GitHub diff
+    "utilization_1h":      ("bucket",    None),
+
+# spacer line for GitHub diff
+    "event_logs":          ("timestamp", 14 * 24 * 3600),
+
+# spacer line for GitHub diff
+}
+
+# spacer line for GitHub diff
+RETENTION_INTERVAL      = 600    # seconds between prune passes
+
+# spacer line for GitHub diff
+RETENTION_BATCH_SIZE    = 5000   # rows deleted per transaction
+
+# spacer line for GitHub diff
+LOG_PAGE_SIZE           = 100     # /logs rows per page unless ?limit= says otherwise
+
+# spacer line for GitHub diff
+LOG_PAGE_MAX            = 100000  # pages are streamed, so this bounds time, not memory
+
+# spacer line for GitHub diff
+LOG_STREAM_CHUNK        = 500     # rows fetched and written per chunk
+
+# spacer line for GitHub diff
+REPORT_CHUNK            = 1000    # /download_report rows formatted per chunk
 
 # spacer line for GitHub diff
 
-SCHEDULING_ALGORITHMS = ['first_fit','best_fit','worst_fit']
+PORT                    = int(os.environ.get("PORT", 5000))
+
+# spacer line for GitHub diff
+MAX_CONNECTIONS         = 20000  # agents + dashboards served at once under eventlet (its own default is 1024)
 
 # spacer line for GitHub diff
 
 app = Flask(__name__)
 
 # spacer line for GitHub diff
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+# PacketJSON sends the feed's pre-encoded payloads without encoding them again
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, json=PacketJSON)
 
 # spacer line for GitHub diff
 
@@ -545,6 +704,9 @@ advanced_dashboard_html = """
 # spacer line for GitHub diff
       <ul class="navbar-nav ml-auto">
 
+# spacer line for GitHub diff
+        <li class="nav-item"><input id="watch-group" class="form-control" placeholder="All network groups" title="Watch one network group"></li>
+
 # spacer line for GitHub diff
         <li class="nav-item"><button id="dark-toggle" class="btn btn-outline-dark nav-link">Dark Mode</button></li>
 
@@ -615,13 +777,16 @@ advanced_dashboard_html = """
         <div class="row">
 
 # spacer line for GitHub diff
-          <div class="col-lg-4 col-6"><div class="small-box bg-info"><div class="inner"><h3 id="active-nodes">0</h3><p>Active Nodes</p></div><div class="icon"><i class="fas fa-server"></i></div></div></div>
+          <div class="col-lg-3 col-6"><div class="small-box bg-info"><div class="inner"><h3 id="active-nodes">0</h3><p>Active Nodes</p></div><div class="icon"><i class="fas fa-server"></i></div></div></div>
+
+# spacer line for GitHub diff
+          <div class="col-lg-3 col-6"><div class="small-box bg-success"><div class="inner"><h3 id="utilization">0%</h3><p>Cluster Utilization</p></div><div class="icon"><i class="fas fa-chart-line"></i></div></div></div>
 
 # spacer line for GitHub diff
-          <div class="col-lg-4 col-6"><div class="small-box bg-success"><div class="inner"><h3 id="utilization">0%</h3><p>Cluster Utilization</p></div><div class="icon"><i class="fas fa-chart-line"></i></div></div></div>
+          <div class="col-lg-3 col-6"><div class="small-box bg-warning"><div class="inner"><h3 id="total-nodes">0</h3><p>Total Nodes</p></div><div class="icon"><i class="fas fa-list"></i></div></div></div>
 
 # spacer line for GitHub diff
-          <div class="col-lg-4 col-6"><div class="small-box bg-warning"><div class="inner"><h3 id="total-nodes">0</h3><p>Total Nodes</p></div><div class="icon"><i class="fas fa-list"></i></div></div></div>
+          <div class="col-lg-3 col-6"><div class="small-box bg-danger"><div class="inner"><h3 id="pending-pods">0</h3><p>Pending Pods</p></div><div class="icon"><i class="fas fa-hourglass-half"></i></div></div></div>
 
 # spacer line for GitHub diff
         </div>
@@ -772,6 +937,9 @@ advanced_dashboard_html = """
 # spacer line for GitHub diff
         <option value="first_fit">First Fit</option><option value="best_fit">Best Fit</option><option value="worst_fit">Worst Fit</option>
 
+# spacer line for GitHub diff
+        <option value="dominant_best_fit">Dominant-Resource Best Fit</option><option value="dot_product">Dot-Product Alignment</option><option value="least_stranded">Least Stranded</option>
+
 # spacer line for GitHub diff
       </select></div>
 
@@ -787,6 +955,9 @@ advanced_dashboard_html = """
 # spacer line for GitHub diff
       </select></div>
 
+# spacer line for GitHub diff
+      <div class="form-group"><label>Priority</label><input id="podPriority" type="number" class="form-control" placeholder="0"></div>
+
 # spacer line for GitHub diff
       <button type="submit" class="btn btn-primary">Launch Pod</button>
 
@@ -808,29 +979,122 @@ advanced_dashboard_html = """
 
 # spacer line for GitHub diff
 
-  // Socket setup
+  // Socket setup: the full state of each subscribed room on connect, then
+
+# spacer line for GitHub diff
+  // versioned deltas pushed as soon as the server changes (so actions need
+
+# spacer line for GitHub diff
+  // no manual refresh). The node table follows nodeRoom: the whole cluster,
+
+# spacer line for GitHub diff
+  // or one network group with the summary room for the log and history
 
 # spacer line for GitHub diff
   const socket = io();
 
+# spacer line for GitHub diff
+  let nodeRoom = "cluster";
+
+# spacer line for GitHub diff
+  let views = {}, resyncing = {};
+
 # spacer line for GitHub diff
   socket.on("state_update", state => {
 
 # spacer line for GitHub diff
-    console.log("🔄 state_update", state);
+    console.log("🔄 state_update", state.room, state.version);
+
+# spacer line for GitHub diff
+    const view = {version: state.version, nodes: {}, logs: state.logs, history: state.history,
+
+# spacer line for GitHub diff
+                  pending: state.pending, pending_count: state.pending_count};
+
+# spacer line for GitHub diff
+    state.nodes.forEach(n => { view.nodes[n.node_id] = n; });
+
+# spacer line for GitHub diff
+    views[state.room] = view;
+
+# spacer line for GitHub diff
+    resyncing[state.room] = false;
+
+# spacer line for GitHub diff
+    if (state.room === nodeRoom) renderDashboard();
+
+# spacer line for GitHub diff
+    else renderSummary(null);
+
+# spacer line for GitHub diff
+  });
+
+# spacer line for GitHub diff
+  socket.on("state_delta", delta => {
+
+# spacer line for GitHub diff
+    const view = views[delta.room];
+
+# spacer line for GitHub diff
+    if (!view || delta.version <= view.version) return;
+
+# spacer line for GitHub diff
+    if (delta.version !== view.version + 1) {
+
+# spacer line for GitHub diff
+      // Missed one: the server replays the gap, or sends a new state_update
+
+# spacer line for GitHub diff
+      if (!resyncing[delta.room]) {
 
 # spacer line for GitHub diff
-    updateDashboard(state);
+        resyncing[delta.room] = true;
 
 # spacer line for GitHub diff
-    updateNodeGraph(state.nodes);
+        socket.emit("resync", {room: delta.room, version: view.version});
+
+# spacer line for GitHub diff
+      }
+
+# spacer line for GitHub diff
+      return;
+
+# spacer line for GitHub diff
+    }
+
+# spacer line for GitHub diff
+    resyncing[delta.room] = false;
+
+# spacer line for GitHub diff
+    updateDashboard(view, delta);
 
 # spacer line for GitHub diff
   });
 
 # spacer line for GitHub diff
 
-  // On connect, we get initial state. Later broadcasts keep it fresh.
+  // Watch one network group (blank: the whole cluster)
+
+# spacer line for GitHub diff
+  $("#watch-group").change(function() {
+
+# spacer line for GitHub diff
+    const group = $(this).val().trim();
+
+# spacer line for GitHub diff
+    nodeRoom = group ? "group:" + group : "cluster";
+
+# spacer line for GitHub diff
+    views = {}; resyncing = {};
+
+# spacer line for GitHub diff
+    $("#nodes-table tbody").empty();
+
+# spacer line for GitHub diff
+    socket.emit("subscribe", {rooms: group ? [nodeRoom, "summary"] : ["cluster"]});
+
+# spacer line for GitHub diff
+  });
 
 # spacer line for GitHub diff
 
@@ -882,12 +1146,6 @@ advanced_dashboard_html = """
 # spacer line for GitHub diff
         $("#addNodeModal").modal("hide");
 
-# spacer line for GitHub diff
-        // Immediately fetch new state
-
-# spacer line for GitHub diff
-        socket.emit("connect");
-
 # spacer line for GitHub diff
       },
 
@@ -932,10 +1190,13 @@ advanced_dashboard_html = """
           grp      = $("#networkGroup").val()||"default",
 
 # spacer line for GitHub diff
-          affinity = $("#nodeAffinity").val()||null;
+          affinity = $("#nodeAffinity").val()||null,
+
+# spacer line for GitHub diff
+          priority = parseInt($("#podPriority").val())||0;
 
 # spacer line for GitHub diff
-    console.log("🐳 Launch pod", {cpuReq,memReq,algo,grp,affinity});
+    console.log("🐳 Launch pod", {cpuReq,memReq,algo,grp,affinity,priority});
 
 # spacer line for GitHub diff
     const payload = {
@@ -950,7 +1211,10 @@ advanced_dashboard_html = """
       scheduling_algorithm: algo,
 
 # spacer line for GitHub diff
-      network_group: grp
+      network_group: grp,
+
+# spacer line for GitHub diff
+      priority: priority
 
 # spacer line for GitHub diff
     };
@@ -976,9 +1240,6 @@ advanced_dashboard_html = """
 # spacer line for GitHub diff
         $("#launchPodModal").modal("hide");
 
-# spacer line for GitHub diff
-        socket.emit("connect");  // refresh state
-
 # spacer line for GitHub diff
       },
 
@@ -1014,7 +1275,7 @@ advanced_dashboard_html = """
     $.post("/chaos_monkey")
 
 # spacer line for GitHub diff
-      .done(res => { console.log("✅ chaos_monkey", res); alert(res.message); socket.emit("connect"); })
+      .done(res => { console.log("✅ chaos_monkey", res); alert(res.message); })
 
 # spacer line for GitHub diff
       .fail(xhr => { console.error("❌ chaos_monkey", xhr.responseJSON); });
@@ -1048,7 +1309,7 @@ advanced_dashboard_html = """
     })
 
 # spacer line for GitHub diff
-    .done(r => { console.log("✅ toggle_simulation", r); socket.emit("connect"); })
+    .done(r => console.log("✅ toggle_simulation", r))
 
 # spacer line for GitHub diff
     .fail(xhr => console.error("❌ toggle_simulation", xhr.responseJSON));
@@ -1082,7 +1343,7 @@ advanced_dashboard_html = """
     })
 
 # spacer line for GitHub diff
-    .done(r => { console.log("✅ remove_node", r); socket.emit("connect"); })
+    .done(r => console.log("✅ remove_node", r))
 
 # spacer line for GitHub diff
     .fail(xhr => console.error("❌ remove_node", xhr.responseJSON));
@@ -1095,91 +1356,223 @@ advanced_dashboard_html = """
   // *** Dashboard update functions ***
 
 # spacer line for GitHub diff
-  function updateDashboard(state) {
+  function nodeRow(n) {
 
 # spacer line for GitHub diff
-    let totalCPU=0, activeCnt=0, rows="";
+    let pods = n.pods.length
 
 # spacer line for GitHub diff
-    const usedCPUs=[];
+      ? n.pods.map(p=>`${p.pod_id} (CPU:${p.cpu},Mem:${p.memory})`).join("<br>")
 
 # spacer line for GitHub diff
-    state.nodes.forEach(n=>{
+      : "None";
 
 # spacer line for GitHub diff
-      totalCPU += n.cpu_total;
+    let simBtn = n.simulate_heartbeat ? "Disable" : "Enable",
 
 # spacer line for GitHub diff
-      if(n.status==="active") activeCnt++;
+        nextSim = n.simulate_heartbeat?false:true;
 
 # spacer line for GitHub diff
-      usedCPUs.push({node_id:n.node_id,used:(n.cpu_total-n.cpu_available)});
+    return `
 
 # spacer line for GitHub diff
-      // build row...
+      <tr id="node-row-${n.node_id}">
 
 # spacer line for GitHub diff
-      let pods = n.pods.length
+        <td>${n.node_id}</td>
 
 # spacer line for GitHub diff
-        ? n.pods.map(p=>`${p.pod_id} (CPU:${p.cpu},Mem:${p.memory})`).join("<br>")
+        <td>${n.node_type}</td>
 
 # spacer line for GitHub diff
-        : "None";
+        <td>${n.cpu_total} / ${n.cpu_available}</td>
 
 # spacer line for GitHub diff
-      let simBtn = n.simulate_heartbeat ? "Disable" : "Enable",
+        <td>${n.memory_total} / ${n.memory_available}</td>
 
 # spacer line for GitHub diff
-          nextSim = n.simulate_heartbeat?false:true;
+        <td>${n.status}</td>
 
 # spacer line for GitHub diff
-      rows += `
+        <td>${pods}</td>
 
 # spacer line for GitHub diff
-        <tr>
+        <td><button class="btn btn-info btn-sm toggle-btn" data-node="${n.node_id}" data-simulate="${nextSim}">${simBtn}</button></td>
 
 # spacer line for GitHub diff
-          <td>${n.node_id}</td>
+        <td><button class="btn btn-danger btn-sm remove-btn" data-node="${n.node_id}">Remove</button></td>
 
 # spacer line for GitHub diff
-          <td>${n.node_type}</td>
+      </tr>`;
 
 # spacer line for GitHub diff
-          <td>${n.cpu_total} / ${n.cpu_available}</td>
+  }
 
 # spacer line for GitHub diff
-          <td>${n.memory_total} / ${n.memory_available}</td>
+
+  function renderDashboard() {
 
 # spacer line for GitHub diff
-          <td>${n.status}</td>
+    $("#nodes-table tbody").html(Object.values(views[nodeRoom].nodes).map(nodeRow).join(""));
 
 # spacer line for GitHub diff
-          <td>${pods}</td>
+    renderSummary(null);
 
 # spacer line for GitHub diff
-          <td><button class="btn btn-info btn-sm toggle-btn" data-node="${n.node_id}" data-simulate="${nextSim}">${simBtn}</button></td>
+  }
 
 # spacer line for GitHub diff
-          <td><button class="btn btn-danger btn-sm remove-btn" data-node="${n.node_id}">Remove</button></td>
+
+  // Apply one delta to a room's view; only the rows of nodes it touches are redrawn
 
 # spacer line for GitHub diff
-        </tr>`;
+  function updateDashboard(view, delta) {
 
 # spacer line for GitHub diff
-    });
+    view.version = delta.version;
 
 # spacer line for GitHub diff
-    $("#nodes-table tbody").html(rows);
+    const touched = new Set();
 
 # spacer line for GitHub diff
-    $("#active-nodes").text(activeCnt);
+    Object.entries(delta.nodes || {}).forEach(([id, fields]) => {
 
 # spacer line for GitHub diff
-    $("#total-nodes").text(state.nodes.length);
+      view.nodes[id] = Object.assign(view.nodes[id] || {pods: []}, fields);
 
 # spacer line for GitHub diff
-    let utilPct = totalCPU>0
+      touched.add(id);
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    Object.entries(delta.pods_removed || {}).forEach(([id, podIds]) => {
+
+# spacer line for GitHub diff
+      const gone = new Set(podIds);
+
+# spacer line for GitHub diff
+      view.nodes[id].pods = view.nodes[id].pods.filter(p => !gone.has(p.pod_id));
+
+# spacer line for GitHub diff
+      touched.add(id);
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    Object.entries(delta.pods_added || {}).forEach(([id, pods]) => {
+
+# spacer line for GitHub diff
+      view.nodes[id].pods = view.nodes[id].pods.concat(pods);
+
+# spacer line for GitHub diff
+      touched.add(id);
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    (delta.removed_nodes || []).forEach(id => {
+
+# spacer line for GitHub diff
+      delete view.nodes[id];
+
+# spacer line for GitHub diff
+      $(document.getElementById("node-row-" + id)).remove();
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    touched.forEach(id => {
+
+# spacer line for GitHub diff
+      if (!view.nodes[id]) return;
+
+# spacer line for GitHub diff
+      const row = document.getElementById("node-row-" + id);
+
+# spacer line for GitHub diff
+      if (row) $(row).replaceWith(nodeRow(view.nodes[id]));
+
+# spacer line for GitHub diff
+      else $("#nodes-table tbody").append(nodeRow(view.nodes[id]));
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    if (delta.logs) view.logs = view.logs.concat(delta.logs).slice(-50);
+
+# spacer line for GitHub diff
+    if (delta.history) view.history = view.history.concat(delta.history).slice(-50);
+
+# spacer line for GitHub diff
+    if ("pending" in delta) { view.pending = delta.pending; view.pending_count = delta.pending_count; }
+
+# spacer line for GitHub diff
+    renderSummary(delta);
+
+# spacer line for GitHub diff
+  }
+
+# spacer line for GitHub diff
+
+  // Counters and charts, from the whole view (delta null) or the parts a delta changed
+
+# spacer line for GitHub diff
+  function renderSummary(delta) {
+
+# spacer line for GitHub diff
+    const view = views[nodeRoom];
+
+# spacer line for GitHub diff
+    if (!view) return;
+
+# spacer line for GitHub diff
+    const side = views.summary || view;
+
+# spacer line for GitHub diff
+    const nodeList = Object.values(view.nodes);
+
+# spacer line for GitHub diff
+    let totalCPU=0, activeCnt=0;
+
+# spacer line for GitHub diff
+    const usedCPUs=[];
+
+# spacer line for GitHub diff
+    nodeList.forEach(n=>{
+
+# spacer line for GitHub diff
+      totalCPU += n.cpu_total;
+
+# spacer line for GitHub diff
+      if(n.status==="active") activeCnt++;
+
+# spacer line for GitHub diff
+      usedCPUs.push({node_id:n.node_id,used:(n.cpu_total-n.cpu_available)});
+
+# spacer line for GitHub diff
+    });
+
+# spacer line for GitHub diff
+    $("#active-nodes").text(activeCnt);
+
+# spacer line for GitHub diff
+    $("#total-nodes").text(nodeList.length);
+
+# spacer line for GitHub diff
+    $("#pending-pods").text(view.pending_count || 0)
+
+# spacer line for GitHub diff
+      .closest(".small-box").attr("title", (view.pending || []).map(p=>`${p.pod_id} (CPU:${p.cpu},Mem:${p.memory})`).join(", "));
+
+# spacer line for GitHub diff
+    let utilPct = totalCPU>0
 
 # spacer line for GitHub diff
       ? Math.round((usedCPUs.reduce((a,b)=>a+b.used,0)/totalCPU)*100)
@@ -1195,17 +1588,25 @@ advanced_dashboard_html = """
     updatePieChart(usedCPUs);
 
 # spacer line for GitHub diff
-    $("#log-panel").html(state.logs.join("<br>"));
+    if (!delta || delta.logs) $("#log-panel").html(side.logs.join("<br>"));
+
+# spacer line for GitHub diff
+    if (!delta || delta.history) {
+
+# spacer line for GitHub diff
+      const times = side.history.map(h=>new Date(h.timestamp*1000).toLocaleTimeString());
 
 # spacer line for GitHub diff
+      const utils = side.history.map(h=>h.utilization.toFixed(2));
 
-    const times = state.history.map(h=>new Date(h.timestamp*1000).toLocaleTimeString());
+# spacer line for GitHub diff
+      updateLineChart(times, utils);
 
 # spacer line for GitHub diff
-    const utils = state.history.map(h=>h.utilization.toFixed(2));
+    }
 
 # spacer line for GitHub diff
-    updateLineChart(times, utils);
+    if (!delta || delta.nodes || delta.removed_nodes) updateNodeGraph(nodeList);
 
 # spacer line for GitHub diff
   }
@@ -1355,68 +1756,95 @@ def get_current_timestamp():
 
 # spacer line for GitHub diff
 
-def log_event_func(event):
+def event_timestamp(ts=None):
+
+# spacer line for GitHub diff
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(get_current_timestamp() if ts is None else ts))
+
+# spacer line for GitHub diff
+
+def remember_events(rows, headline):
+
+# spacer line for GitHub diff
+    # In-memory copies only (the store rows are written by the caller): every
 
 # spacer line for GitHub diff
-    ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(get_current_timestamp()))
+    # row goes to event_ring, the headline row to the dashboard tail
 
 # spacer line for GitHub diff
-    entry = f"[{ts}] {event}"
+    event_ring.extend(rows)
 
 # spacer line for GitHub diff
     with nodes_lock:
 
 # spacer line for GitHub diff
-        event_log.append(entry)
+        event_log.append(f"[{headline[0]}] {headline[1]}")
 
 # spacer line for GitHub diff
-        if len(event_log) > 50:
+    state_changed()
 
 # spacer line for GitHub diff
-            event_log.pop(0)
+
+def log_event_func(event, type, severity="info", node_id=None, pod_id=None, group=None):
 
 # spacer line for GitHub diff
-    conn = sqlite3.connect("cluster.db")
+    row = event_row(event_timestamp(), event, type, severity, node_id, pod_id, group)
 
 # spacer line for GitHub diff
-    c = conn.cursor()
+    remember_events([row], row)
 
 # spacer line for GitHub diff
-    c.execute("INSERT INTO event_logs (timestamp, message) VALUES (?,?)", (ts, event))
+    store.write(events=[row])
 
 # spacer line for GitHub diff
-    conn.commit()
+
+def eviction_events(ts, pods, placements, waiting, from_nid, what="pod"):
 
 # spacer line for GitHub diff
-    conn.close()
+    # Where each evicted pod went; pods that found no node are filed under
 
 # spacer line for GitHub diff
+    # the node they left
 
-@socketio.on('connect')
+# spacer line for GitHub diff
+    rows = []
 
 # spacer line for GitHub diff
-def on_connect():
+    for pod in pods:
 
 # spacer line for GitHub diff
-    with nodes_lock:
+        pid, new_nid, group = pod["pod_id"], placements.get(pod["pod_id"]), pod["network_group"]
 
 # spacer line for GitHub diff
-        state = {
+        if new_nid:
 
 # spacer line for GitHub diff
-            "nodes": list(nodes.values()),
+            rows.append(event_row(ts, f"Rescheduled {what} {pid} → {new_nid}", "pod_rescheduled", "info", new_nid, pid, group))
 
 # spacer line for GitHub diff
-            "logs":  event_log[-50:],
+        elif pid in waiting:
 
 # spacer line for GitHub diff
-            "history": [{"timestamp": ts, "utilization": u} for ts,u in utilization_history]
+            rows.append(event_row(ts, f"{what.capitalize()} {pid} queued until capacity frees up", "pod_queued", "warning", from_nid, pid, group))
 
 # spacer line for GitHub diff
-        }
+        else:
+
+# spacer line for GitHub diff
+            rows.append(event_row(ts, f"Failed to reschedule {what} {pid}", "pod_unschedulable", "error", from_nid, pid, group))
+
+# spacer line for GitHub diff
+    return rows
+
+# spacer line for GitHub diff
+
+@socketio.on('connect')
 
 # spacer line for GitHub diff
-    emit('state_update', state)
+def on_connect(auth=None):
+
+# spacer line for GitHub diff
+    connect_dashboard(auth)
 
 # spacer line for GitHub diff
 
@@ -1426,7 +1854,7 @@ def record_utilization():
     while True:
 
 # spacer line for GitHub diff
-        time.sleep(10)
+        time.sleep(UTILIZATION_INTERVAL)
 
 # spacer line for GitHub diff
         util = get_cluster_utilization() * 100
@@ -1447,1007 +1875,3014 @@ def record_utilization():
                 utilization_history.pop(0)
 
 # spacer line for GitHub diff
-        conn = sqlite3.connect("cluster.db")
+        state_changed()
 
 # spacer line for GitHub diff
-        c = conn.cursor()
+        store.record_utilization(ts, util)
 
 # spacer line for GitHub diff
-        c.execute("INSERT INTO utilization_history (timestamp, utilization) VALUES (?,?)", (ts, util))
 
-# spacer line for GitHub diff
-        conn.commit()
+def query_utilization(start, end, resolution):
 
 # spacer line for GitHub diff
-        conn.close()
+    """Samples (raw) or bucket averages with min/max (rollups) in [start, end), oldest first."""
 
 # spacer line for GitHub diff
+    rows = store.utilization_range(start, end, resolution, UTILIZATION_QUERY_LIMIT + 1)
 
-@socketio.on('connect')
+# spacer line for GitHub diff
+    if resolution == "raw":
 
 # spacer line for GitHub diff
-def handle_connect():
+        hist = [{"timestamp": ts, "utilization": util} for ts, util in rows]
 
 # spacer line for GitHub diff
-    # Send the current full state immediately on new client connection
-    with nodes_lock:
+    else:
 
 # spacer line for GitHub diff
-        state = {
+        hist = [{"timestamp": b, "utilization": avg, "min": lo, "max": hi} for b, avg, lo, hi in rows]
 
 # spacer line for GitHub diff
-            "nodes": list(nodes.values()),
+    return hist[:UTILIZATION_QUERY_LIMIT], len(hist) > UTILIZATION_QUERY_LIMIT
 
 # spacer line for GitHub diff
-            "logs":  event_log[-50:],
+
+def pick_resolution(span):
 
 # spacer line for GitHub diff
-            "history": [
+    # Finest resolution that keeps the span within UTILIZATION_MAX_POINTS (else the coarsest)
 
 # spacer line for GitHub diff
-                {"timestamp": ts, "utilization": util}
+    widths = [("raw", UTILIZATION_INTERVAL)] + [(name, width) for name, (_, width) in UTILIZATION_ROLLUPS.items()]
 
 # spacer line for GitHub diff
-                for ts, util in utilization_history
+    for name, width in widths:
 
 # spacer line for GitHub diff
-            ]
+        if span / width <= UTILIZATION_MAX_POINTS:
 
 # spacer line for GitHub diff
-        }
+            return name
 
 # spacer line for GitHub diff
-    emit('state_update', state)
+    return widths[-1][0]
 
 # spacer line for GitHub diff
 
-def get_cluster_utilization():
+def prune_history():
 
 # spacer line for GitHub diff
-    total = used = 0
+    """Delete rows past their RETENTION_TTLS entry, a batch per transaction; returns rows deleted."""
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    now = get_current_timestamp()
 
 # spacer line for GitHub diff
-        for n in nodes.values():
+    cutoffs = {}
 
 # spacer line for GitHub diff
-            if n["status"] == "active":
+    for table, (column, ttl) in RETENTION_TTLS.items():
 
 # spacer line for GitHub diff
-                total += n["cpu_total"]
+        if ttl is not None:
 
 # spacer line for GitHub diff
-                used += (n["cpu_total"] - n["cpu_available"])
+            cutoffs[table] = (column, event_timestamp(now - ttl) if table == "event_logs" else now - ttl)
 
 # spacer line for GitHub diff
-    return 0.0 if total == 0 else used / total
+    return store.prune(cutoffs, RETENTION_BATCH_SIZE)
 
 # spacer line for GitHub diff
 
-# ----------------------------------
-# Scheduling & Pod Persistence
-# ----------------------------------
-def schedule_pod(pod, algo):
+def retention_worker():
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    while True:
 
 # spacer line for GitHub diff
-        eligible = [
+        time.sleep(RETENTION_INTERVAL)
 
 # spacer line for GitHub diff
-            n for n in nodes.values()
+        try:
 
 # spacer line for GitHub diff
-            if n["status"] == "active"
+            prune_history()
 
 # spacer line for GitHub diff
-               and n["cpu_available"] >= pod["cpu"]
+        except PERSIST_ERRORS as e:
 
 # spacer line for GitHub diff
-               and n["memory_available"] >= pod["memory"]
+            print(f"❌ Could not prune history: {e}")
 
 # spacer line for GitHub diff
-               and n["network_group"] == pod["network_group"]
 
-# spacer line for GitHub diff
-        ]
+@socketio.on('connect')
 
 # spacer line for GitHub diff
-        if "node_affinity" in pod:
+def handle_connect(auth=None):
 
 # spacer line for GitHub diff
-            eligible = [n for n in eligible if n["node_type"] == pod["node_affinity"]]
+    connect_dashboard(auth)
 
 # spacer line for GitHub diff
-        if not eligible:
 
-# spacer line for GitHub diff
-            return False, None
+def connect_dashboard(auth=None):
 
 # spacer line for GitHub diff
-        if algo == "first_fit":
+    # A client joins the rooms in its auth data ({"rooms": [...]}), or the
 
 # spacer line for GitHub diff
-            cand = eligible[0]
+    # whole cluster; an unknown room refuses the connection
 
 # spacer line for GitHub diff
-        elif algo == "best_fit":
+    rooms = (auth or {}).get("rooms", ["cluster"]) if isinstance(auth, dict) else ["cluster"]
 
 # spacer line for GitHub diff
-            cand = min(eligible, key=lambda n: (n["cpu_available"] - pod["cpu"]) + (n["memory_available"] - pod["memory"]))
+    try:
 
 # spacer line for GitHub diff
-        else:  # worst_fit
+        subscribe_rooms(rooms)
 
 # spacer line for GitHub diff
-            cand = max(eligible, key=lambda n: n["cpu_available"] + n["memory_available"])
+    except ValueError as e:
 
 # spacer line for GitHub diff
-        cand["pods"].append(pod)
+        raise ConnectionRefusedError(str(e))
 
 # spacer line for GitHub diff
-        cand["cpu_available"]   -= pod["cpu"]
 
-# spacer line for GitHub diff
-        cand["memory_available"]-= pod["memory"]
+def subscribe_rooms(rooms):
 
 # spacer line for GitHub diff
-        save_node_to_db(cand)
+    """Replace the calling client's rooms; it gets the full state of each room it joins.
 
 # spacer line for GitHub diff
-        log_event_func(f"Pod {pod['pod_id']} scheduled on node {cand['node_id']} via {algo}")
 
-# spacer line for GitHub diff
-        return True, cand["node_id"]
+    Pending changes are published to everyone first, so deltas from the
 
 # spacer line for GitHub diff
-
-def reschedule_pods_from_failed_node(nid):
+    snapshot's version on apply on top of it. The full diff also catches
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    anything changed while nobody was subscribed.
 
 # spacer line for GitHub diff
-        failed = nodes.pop(nid, None)
+    """
 
 # spacer line for GitHub diff
-    if not failed:
+    if not isinstance(rooms, list) or not all(isinstance(room, str) for room in rooms):
 
 # spacer line for GitHub diff
-        return
+        raise ValueError('Expected {"rooms": [room, ...]}')
 
 # spacer line for GitHub diff
-    delete_node_from_db(nid)
+    wanted = set(rooms)
 
 # spacer line for GitHub diff
-    for pod in failed["pods"]:
+    for room in wanted:
 
 # spacer line for GitHub diff
-        ok, new_nid = schedule_pod(pod, "first_fit")
+        room_scope(room)
 
 # spacer line for GitHub diff
-        if ok:
+    sid = request.sid
 
 # spacer line for GitHub diff
-            update_pod_node_in_db(pod["pod_id"], new_nid)
+    with publish_lock:
 
 # spacer line for GitHub diff
-            log_event_func(f"Rescheduled pod {pod['pod_id']} → {new_nid}")
+        with push_cond:
 
 # spacer line for GitHub diff
-        else:
+            current = client_rooms.get(sid, set())
 
 # spacer line for GitHub diff
-            log_event_func(f"Failed to reschedule pod {pod['pod_id']}")
+        joined, left = wanted - current, current - wanted
 
 # spacer line for GitHub diff
-
-# ----------------------------------
-# Health Monitor & Heartbeats
-# ----------------------------------
-def health_monitor():
+        for room in joined:
 
 # spacer line for GitHub diff
-    while True:
+            if room not in room_feeds:
 
 # spacer line for GitHub diff
-        time.sleep(HEALTH_CHECK_INTERVAL)
+                room_feeds[room] = StateFeed(log_limit=50, history_limit=50, backlog=100, room=room)
 
 # spacer line for GitHub diff
-        now = get_current_timestamp()
+            room_members[room] += 1
 
 # spacer line for GitHub diff
-        to_fail = []
+        if joined:
 
 # spacer line for GitHub diff
-        with nodes_lock:
+            publish_state(full=True)
 
 # spacer line for GitHub diff
-            for nid, n in list(nodes.items()):
+        for room in left:
 
 # spacer line for GitHub diff
-                if n["status"] == "active" and (now - n["last_heartbeat"]) > HEARTBEAT_THRESHOLD:
+            leave_room(room)
 
 # spacer line for GitHub diff
-                    n["status"] = "failed"
+            release_room(room)
 
 # spacer line for GitHub diff
-                    save_node_to_db(n)
+        for room in joined:
 
 # spacer line for GitHub diff
-                    log_event_func(f"Node {nid} marked FAILED")
+            join_room(room)
 
 # spacer line for GitHub diff
-                    to_fail.append(nid)
+            emit('state_update', room_feeds[room].snapshot())
 
 # spacer line for GitHub diff
-        for nid in to_fail:
+        with push_cond:
 
 # spacer line for GitHub diff
-            socketio.emit("alert", {"msg": f"Node {nid} failed"})
+            if wanted:
 
 # spacer line for GitHub diff
-            reschedule_pods_from_failed_node(nid)
+                client_rooms[sid] = wanted
 
 # spacer line for GitHub diff
+            else:
 
-def simulate_heartbeat_thread():
+# spacer line for GitHub diff
+                client_rooms.pop(sid, None)
 
 # spacer line for GitHub diff
-    while True:
+
+def release_room(room):
 
 # spacer line for GitHub diff
-        time.sleep(NODE_HEARTBEAT_INTERVAL)
+    # Drop a room's feed with its last subscriber; call with publish_lock held
 
 # spacer line for GitHub diff
-        with nodes_lock:
+    room_members[room] -= 1
 
 # spacer line for GitHub diff
-            for n in nodes.values():
+    if room_members[room] <= 0:
 
 # spacer line for GitHub diff
-                if n["simulate_heartbeat"]:
+        del room_members[room]
 
 # spacer line for GitHub diff
-                    n["last_heartbeat"] = get_current_timestamp()
+        if room != "cluster":
 
 # spacer line for GitHub diff
-                    save_node_to_db(n)
+            room_feeds.pop(room, None)
 
 # spacer line for GitHub diff
 
-# ----------------------------------
-# Auto‐scaling with Docker & Persistence
-# ----------------------------------
-def auto_scale_cluster():
+@socketio.on('subscribe')
 
 # spacer line for GitHub diff
-    global last_auto_scale_time
+def handle_subscribe(data):
 
 # spacer line for GitHub diff
-    while True:
+    # {"rooms": [...]}: see state_feed.py for the room names
 
 # spacer line for GitHub diff
-        time.sleep(HEALTH_CHECK_INTERVAL)
+    rooms = data.get("rooms") if isinstance(data, dict) else None
 
 # spacer line for GitHub diff
-        util = get_cluster_utilization()
+    try:
 
 # spacer line for GitHub diff
-        now = get_current_timestamp()
+        subscribe_rooms(rooms)
 
 # spacer line for GitHub diff
-        if util >= AUTO_SCALE_THRESHOLD and (now - last_auto_scale_time) >= AUTO_SCALE_COOLDOWN:
+    except ValueError as e:
 
 # spacer line for GitHub diff
-            nid = str(uuid.uuid4())
+        return {"error": str(e)}
 
 # spacer line for GitHub diff
-            nt = random.choice(["high_cpu","high_mem","balanced"])
+    return {"rooms": sorted(rooms)}
 
 # spacer line for GitHub diff
-            ng = random.choice(["default","isolated"])
 
-# spacer line for GitHub diff
-            node = {
+@socketio.on('disconnect')
 
 # spacer line for GitHub diff
-                "node_id": nid,
+def handle_disconnect(*args):
 
 # spacer line for GitHub diff
-                "cpu_total": DEFAULT_NODE_CPU,
+    # Socket.IO leaves the rooms itself; only the feeds are released here
 
 # spacer line for GitHub diff
-                "cpu_available": DEFAULT_NODE_CPU,
+    with publish_lock:
 
 # spacer line for GitHub diff
-                "memory_total": DEFAULT_NODE_MEMORY,
+        with push_cond:
 
 # spacer line for GitHub diff
-                "memory_available": DEFAULT_NODE_MEMORY,
+            rooms = client_rooms.pop(request.sid, set())
 
 # spacer line for GitHub diff
-                "node_type": nt,
+        for room in rooms:
 
 # spacer line for GitHub diff
-                "network_group": ng,
+            release_room(room)
 
 # spacer line for GitHub diff
-                "pods": [],
 
-# spacer line for GitHub diff
-                "last_heartbeat": now,
+@socketio.on('resync')
 
 # spacer line for GitHub diff
-                "status": "active",
+def handle_resync(data):
 
 # spacer line for GitHub diff
-                "simulate_heartbeat": True
+    # A client saw a gap in one room's delta versions: replay what it missed,
 
 # spacer line for GitHub diff
-            }
+    # or send a new snapshot when those deltas have left the backlog
 
 # spacer line for GitHub diff
-            with nodes_lock:
+    data = data if isinstance(data, dict) else {}
 
 # spacer line for GitHub diff
-                nodes[nid] = node
+    room = data.get("room", "cluster")
 
 # spacer line for GitHub diff
-            save_node_to_db(node)
+    try:
 
 # spacer line for GitHub diff
-            net = ensure_network(ng)
+        version = int(data.get("version"))
 
 # spacer line for GitHub diff
-            if docker_client and net:
+    except (TypeError, ValueError):
 
 # spacer line for GitHub diff
-                try:
+        version = -1
 
 # spacer line for GitHub diff
-                    cont = docker_client.containers.run(
+    with publish_lock:
 
 # spacer line for GitHub diff
-                        DOCKER_NODE_IMAGE,
+        with push_cond:
 
 # spacer line for GitHub diff
-                        entrypoint=["python", "node.py"],
+            subscribed = room in client_rooms.get(request.sid, ())
 
 # spacer line for GitHub diff
-                        command=[
+        feed = room_feeds.get(room)
 
 # spacer line for GitHub diff
-                            "python","node.py",
+        if not subscribed or feed is None:
 
 # spacer line for GitHub diff
-                            "--server","http://host.docker.internal:5000",
+            return
 
 # spacer line for GitHub diff
-                            "--node_id",nid,
+        missed = feed.since(version) if version >= 0 else None
 
 # spacer line for GitHub diff
-                            "--interval",str(NODE_HEARTBEAT_INTERVAL)
+        if missed is None:
 
 # spacer line for GitHub diff
-                        ],
+            emit('state_update', feed.snapshot())
 
 # spacer line for GitHub diff
-                        name=f"node_{nid}",
+        else:
 
 # spacer line for GitHub diff
-                        detach=True,
+            for delta in missed:
 
 # spacer line for GitHub diff
-                        network=net.name,
+                emit('state_delta', delta)
 
 # spacer line for GitHub diff
-                        cpu_count=DEFAULT_NODE_CPU,
 
-# spacer line for GitHub diff
-                        mem_limit=f"{DEFAULT_NODE_MEMORY}g",
+def get_cluster_utilization():
 
 # spacer line for GitHub diff
-                        labels={"sim-node": nid, "autoscaled": "true"},
+    total = used = 0
 
 # spacer line for GitHub diff
-                        remove = True 
+    with nodes_lock:
 
 # spacer line for GitHub diff
-                    )
+        for n in nodes.values():
 
 # spacer line for GitHub diff
-                    nodes[nid]["container_id"] = cont.id
+            if n["status"] == "active":
 
 # spacer line for GitHub diff
-                    save_node_to_db(nodes[nid])
+                total += n["cpu_total"]
 
 # spacer line for GitHub diff
-                    log_event_func(f"Container {cont.id[:12]} launched for auto‐scaled node {nid}")
+                used += (n["cpu_total"] - n["cpu_available"])
 
 # spacer line for GitHub diff
-                except Exception as e:
+    return 0.0 if total == 0 else used / total
 
 # spacer line for GitHub diff
-                    log_event_func(f"Auto‐scale container error for {nid}: {e}")
 
-# spacer line for GitHub diff
-            else:
+# ----------------------------------
+# Scheduling & Pod Persistence
+# ----------------------------------
+def reserve_pod(node, pod):
+
+# spacer line for GitHub diff
+    # Caller holds nodes_lock
+
+# spacer line for GitHub diff
+    node["pods"].append(pod)
+
+# spacer line for GitHub diff
+    node["cpu_available"]   -= pod["cpu"]
+
+# spacer line for GitHub diff
+    node["memory_available"]-= pod["memory"]
+
+# spacer line for GitHub diff
+    pod["status"] = "scheduled"
+
+# spacer line for GitHub diff
+    capacity_index.update(node)
+
+# spacer line for GitHub diff
+    priority_index.add(node["node_id"], pod)
+
+# spacer line for GitHub diff
+
+def release_pod(node, pod):
+
+# spacer line for GitHub diff
+    """Undo reserve_pod: roll back an unpersisted placement or evict the pod."""
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        for i, p in enumerate(node["pods"]):
+
+# spacer line for GitHub diff
+            if p is pod:
+
+# spacer line for GitHub diff
+                del node["pods"][i]
+
+# spacer line for GitHub diff
+                node["cpu_available"]   += pod["cpu"]
+
+# spacer line for GitHub diff
+                node["memory_available"]+= pod["memory"]
+
+# spacer line for GitHub diff
+                if nodes.get(node["node_id"]) is node:
+
+# spacer line for GitHub diff
+                    capacity_index.update(node)
+
+# spacer line for GitHub diff
+                    priority_index.remove(node["node_id"], pod["pod_id"])
+
+# spacer line for GitHub diff
+                return
+
+# spacer line for GitHub diff
+
+def queue_pod(pod):
+
+# spacer line for GitHub diff
+    # Caller holds nodes_lock
+
+# spacer line for GitHub diff
+    if len(pending_pods) >= MAX_PENDING_PODS:
+
+# spacer line for GitHub diff
+        return False
+
+# spacer line for GitHub diff
+    pending_pods.add(pod)
+
+# spacer line for GitHub diff
+    pod["status"] = "pending"
+
+# spacer line for GitHub diff
+    return True
+
+# spacer line for GitHub diff
+
+def rollback_placements(placed, touched, queued=()):
+
+# spacer line for GitHub diff
+    """Undo a plan whose DB write failed: free reservations, dequeue queued pods."""
+
+# spacer line for GitHub diff
+    for pod, nid in placed:
+
+# spacer line for GitHub diff
+        release_pod(touched[nid], pod)
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        for pod in queued:
+
+# spacer line for GitHub diff
+            pending_pods.remove(pod["pod_id"])
+
+# spacer line for GitHub diff
+
+def plan_placements(pods, algo=None, queue_if_full=False):
+
+# spacer line for GitHub diff
+    """Reserve capacity for a set of pods in one pass, largest first.
+
+# spacer line for GitHub diff
+
+    Caller holds nodes_lock. Each pod is placed with ``algo`` or, when that
+
+# spacer line for GitHub diff
+    is None, the algorithm it was originally launched with. Pods that fit
+
+# spacer line for GitHub diff
+    nowhere join pending_pods when ``queue_if_full`` is set. Returns
+
+# spacer line for GitHub diff
+    (placements, placed, touched, queued): pod_id -> node_id (None if
+
+# spacer line for GitHub diff
+    unplaced), the (pod, node_id) pairs reserved, node_id -> node for every
+
+# spacer line for GitHub diff
+    node whose capacity changed, and the pods that were queued.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    placements, placed, touched, queued = {}, [], {}, []
+
+# spacer line for GitHub diff
+    for pod in sort_for_packing(pods):
+
+# spacer line for GitHub diff
+        nid = capacity_index.find(pod, algo or pod.get("scheduling_algorithm", "first_fit"))
+
+# spacer line for GitHub diff
+        placements[pod["pod_id"]] = nid
+
+# spacer line for GitHub diff
+        if nid is None:
+
+# spacer line for GitHub diff
+            if queue_if_full and queue_pod(pod):
+
+# spacer line for GitHub diff
+                queued.append(pod)
+
+# spacer line for GitHub diff
+            continue
+
+# spacer line for GitHub diff
+        cand = nodes[nid]
+
+# spacer line for GitHub diff
+        reserve_pod(cand, pod)
+
+# spacer line for GitHub diff
+        placed.append((pod, nid))
+
+# spacer line for GitHub diff
+        touched[nid] = cand
+
+# spacer line for GitHub diff
+    return placements, placed, touched, queued
+
+# spacer line for GitHub diff
+
+def find_preemption(pod):
+
+# spacer line for GitHub diff
+    """Pick the node to free for ``pod`` by evicting lower-priority pods.
+
+# spacer line for GitHub diff
+
+    Caller holds nodes_lock. Only nodes holding pods below the pod's priority
+
+# spacer line for GitHub diff
+    are visited. Among those the pod may run on, the one whose minimal victim
+
+# spacer line for GitHub diff
+    set has the lowest top priority wins, then the fewest victims.
+
+# spacer line for GitHub diff
+    Returns (node_id, victims), or (None, []) if no node can be freed.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    best, best_key = (None, []), None
+
+# spacer line for GitHub diff
+    for nid in priority_index.nodes_below(pod.get("priority", 0)):
+
+# spacer line for GitHub diff
+        n = nodes[nid]
+
+# spacer line for GitHub diff
+        if (n["status"] != "active" or n["network_group"] != pod["network_group"]
+
+# spacer line for GitHub diff
+                or ("node_affinity" in pod and n["node_type"] != pod["node_affinity"])):
+
+# spacer line for GitHub diff
+            continue
+
+# spacer line for GitHub diff
+        victims = priority_index.victims(n, pod)
+
+# spacer line for GitHub diff
+        if not victims:
+
+# spacer line for GitHub diff
+            continue
+
+# spacer line for GitHub diff
+        prios = [v.get("priority", 0) for v in victims]
+
+# spacer line for GitHub diff
+        key = (max(prios), len(victims), sum(prios))
+
+# spacer line for GitHub diff
+        if best_key is None or key < best_key:
+
+# spacer line for GitHub diff
+            best, best_key = (nid, victims), key
+
+# spacer line for GitHub diff
+    return best
+
+# spacer line for GitHub diff
+
+def schedule_pod(pod, algo, queue_if_full=False):
+
+# spacer line for GitHub diff
+    # 1) reserve capacity (or a queue slot) in memory under a short lock; a pod
+
+# spacer line for GitHub diff
+    #    that fits nowhere may preempt lower-priority pods on one node, and the
+
+# spacer line for GitHub diff
+    #    victims go through the reschedule flow (own algorithm, else the queue)
+
+# spacer line for GitHub diff
+    victims, evicted, queued = [], {}, []
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        placements, placed, touched, _ = plan_placements([pod], algo)
+
+# spacer line for GitHub diff
+        nid = placements[pod["pod_id"]]
+
+# spacer line for GitHub diff
+        if nid is None:
+
+# spacer line for GitHub diff
+            nid, victims = find_preemption(pod)
+
+# spacer line for GitHub diff
+            # Only preempt when every victim could still wait in the queue;
+
+# spacer line for GitHub diff
+            # one that fits nowhere else would otherwise be dropped
+
+# spacer line for GitHub diff
+            if nid is not None and len(pending_pods) + len(victims) > MAX_PENDING_PODS:
+
+# spacer line for GitHub diff
+                nid, victims = None, []
+
+# spacer line for GitHub diff
+            if nid is not None:
+
+# spacer line for GitHub diff
+                node = nodes[nid]
+
+# spacer line for GitHub diff
+                for victim in victims:
+
+# spacer line for GitHub diff
+                    release_pod(node, victim)
+
+# spacer line for GitHub diff
+                reserve_pod(node, pod)
+
+# spacer line for GitHub diff
+                placed.append((pod, nid))
+
+# spacer line for GitHub diff
+                touched[nid] = node
+
+# spacer line for GitHub diff
+                evicted, moved, moved_to, queued = plan_placements(victims, queue_if_full=True)
+
+# spacer line for GitHub diff
+                placed += moved
+
+# spacer line for GitHub diff
+                touched.update(moved_to)
+
+# spacer line for GitHub diff
+            elif queue_if_full and queue_pod(pod):
+
+# spacer line for GitHub diff
+                queued = [pod]
+
+# spacer line for GitHub diff
+    if nid is not None:
+
+# spacer line for GitHub diff
+        event, kind = f"Pod {pod['pod_id']} scheduled on node {nid} via {algo}", "pod_scheduled"
+
+# spacer line for GitHub diff
+        if victims:
+
+# spacer line for GitHub diff
+            event += f", preempting {', '.join(v['pod_id'] for v in victims)}"
+
+# spacer line for GitHub diff
+    elif queued:
+
+# spacer line for GitHub diff
+        event, kind = f"Pod {pod['pod_id']} queued: no node with sufficient resources", "pod_queued"
+
+# spacer line for GitHub diff
+    else:
+
+# spacer line for GitHub diff
+        return False, None
+
+# spacer line for GitHub diff
+    # 2) persist node rows, pod rows and events in one commit outside the lock;
+
+# spacer line for GitHub diff
+    #    a failed write rolls the reservations (and evictions) back
+
+# spacer line for GitHub diff
+    ts = event_timestamp()
+
+# spacer line for GitHub diff
+    headline = event_row(ts, event, kind, "info" if nid else "warning", nid, pod["pod_id"], pod["network_group"])
+
+# spacer line for GitHub diff
+    events = [headline] + eviction_events(ts, victims, evicted, {p["pod_id"] for p in queued}, nid, "preempted pod")
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(touched.values(), placed, events, queued_pods=queued)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS:
+
+# spacer line for GitHub diff
+        rollback_placements(placed, touched, queued)
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            if victims and nodes.get(nid) is node:
+
+# spacer line for GitHub diff
+                for victim in victims:
+
+# spacer line for GitHub diff
+                    reserve_pod(node, victim)
+
+# spacer line for GitHub diff
+        raise
+
+# spacer line for GitHub diff
+    remember_events(events, headline)
+
+# spacer line for GitHub diff
+    return nid is not None, nid
+
+# spacer line for GitHub diff
+
+def drain_pending(changed_nodes):
+
+# spacer line for GitHub diff
+    """Place queued pods after capacity grew on ``changed_nodes``.
+
+# spacer line for GitHub diff
+
+    Call without nodes_lock, once the capacity change itself is persisted.
+
+# spacer line for GitHub diff
+    Only pods whose bucket and shape could fit one of the changed nodes are
+
+# spacer line for GitHub diff
+    retried, oldest first, each with its own scheduling algorithm.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        if not pending_pods:
+
+# spacer line for GitHub diff
+            return
+
+# spacer line for GitHub diff
+        candidates = {}
+
+# spacer line for GitHub diff
+        for node in changed_nodes:
+
+# spacer line for GitHub diff
+            if node["status"] == "active" and nodes.get(node["node_id"]) is node:
+
+# spacer line for GitHub diff
+                for pod in pending_pods.candidates(node):
+
+# spacer line for GitHub diff
+                    candidates.setdefault(pod["pod_id"], pod)
+
+# spacer line for GitHub diff
+        placed, touched = [], {}
+
+# spacer line for GitHub diff
+        for pod in candidates.values():
+
+# spacer line for GitHub diff
+            nid = capacity_index.find(pod, pod.get("scheduling_algorithm", "first_fit"))
+
+# spacer line for GitHub diff
+            if nid is None:
+
+# spacer line for GitHub diff
+                continue
+
+# spacer line for GitHub diff
+            pending_pods.remove(pod["pod_id"])
+
+# spacer line for GitHub diff
+            reserve_pod(nodes[nid], pod)
+
+# spacer line for GitHub diff
+            placed.append((pod, nid))
+
+# spacer line for GitHub diff
+            touched[nid] = nodes[nid]
+
+# spacer line for GitHub diff
+    if not placed:
+
+# spacer line for GitHub diff
+        return
+
+# spacer line for GitHub diff
+    ts = event_timestamp()
+
+# spacer line for GitHub diff
+    summary = f"Pending queue: {len(placed)} pods scheduled on {len(touched)} nodes, {len(pending_pods)} still waiting"
+
+# spacer line for GitHub diff
+    events = [event_row(ts, f"Pod {p['pod_id']} scheduled on node {nid} from the pending queue", "pod_scheduled",
+
+# spacer line for GitHub diff
+                        "info", nid, p["pod_id"], p["network_group"]) for p, nid in placed]
+
+# spacer line for GitHub diff
+    events.append(event_row(ts, summary, "pending_drained"))
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(touched.values(), placed, events)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS as e:
+
+# spacer line for GitHub diff
+        rollback_placements(placed, touched)
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            for pod, _ in placed:
+
+# spacer line for GitHub diff
+                queue_pod(pod)
+
+# spacer line for GitHub diff
+        print(f"❌ Could not persist pending pod placements: {e}")
+
+# spacer line for GitHub diff
+        return
+
+# spacer line for GitHub diff
+    remember_events(events, events[-1])
+
+# spacer line for GitHub diff
+
+def reschedule_pods_from_failed_node(nid):
+
+# spacer line for GitHub diff
+    # Plan the whole evicted set under one lock hold, then delete the failed
+
+# spacer line for GitHub diff
+    # node and re-home its pods in a single transaction; pods that fit
+
+# spacer line for GitHub diff
+    # nowhere wait in the pending queue
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        failed = nodes.pop(nid, None)
+
+# spacer line for GitHub diff
+        capacity_index.remove(nid)
+
+# spacer line for GitHub diff
+        priority_index.drop_node(nid)
+
+# spacer line for GitHub diff
+        if not failed:
+
+# spacer line for GitHub diff
+            return
+
+# spacer line for GitHub diff
+        placements, placed, touched, queued = plan_placements(failed["pods"], queue_if_full=True)
+
+# spacer line for GitHub diff
+    ts = event_timestamp()
+
+# spacer line for GitHub diff
+    events = eviction_events(ts, failed["pods"], placements, {p["pod_id"] for p in queued}, nid)
+
+# spacer line for GitHub diff
+    summary = (f"Failover of node {nid}: {len(placed)}/{len(placements)} pods rescheduled on "
+
+# spacer line for GitHub diff
+               f"{len(touched)} nodes, {len(queued)} queued")
+
+# spacer line for GitHub diff
+    events.append(event_row(ts, summary, "node_failover", "warning", nid, group=failed["network_group"]))
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(touched.values(), placed, events, deleted_node_ids=[nid], queued_pods=queued)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS as e:
+
+# spacer line for GitHub diff
+        rollback_placements(placed, touched, queued)
+
+# spacer line for GitHub diff
+        print(f"❌ Could not persist failover of node {nid}: {e}")
+
+# spacer line for GitHub diff
+        log_event_func(f"Failover of node {nid} failed to persist; {len(placements)} pods left unscheduled",
+
+# spacer line for GitHub diff
+                       "node_failover", "error", nid, group=failed["network_group"])
+
+# spacer line for GitHub diff
+        return
+
+# spacer line for GitHub diff
+    remember_events(events, events[-1])
+
+# spacer line for GitHub diff
+
+def schedule_pods_bulk(pods, algo, queue_if_full=False):
+
+# spacer line for GitHub diff
+    """Place a batch of pods in one pass, largest first, and persist it in one transaction."""
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        placements, placed, touched, queued = plan_placements(pods, algo, queue_if_full)
+
+# spacer line for GitHub diff
+    ts = event_timestamp()
+
+# spacer line for GitHub diff
+    summary = (f"Bulk launch: {len(placed)}/{len(pods)} pods scheduled on {len(touched)} nodes "
+
+# spacer line for GitHub diff
+               f"via {algo} (decreasing), {len(queued)} queued")
+
+# spacer line for GitHub diff
+    events = [event_row(ts, f"Pod {p['pod_id']} scheduled on node {nid} via {algo}", "pod_scheduled",
+
+# spacer line for GitHub diff
+                        "info", nid, p["pod_id"], p["network_group"]) for p, nid in placed]
+
+# spacer line for GitHub diff
+    events.append(event_row(ts, summary, "bulk_launch"))
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(touched.values(), placed, events, queued_pods=queued)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS:
+
+# spacer line for GitHub diff
+        rollback_placements(placed, touched, queued)
+
+# spacer line for GitHub diff
+        raise
+
+# spacer line for GitHub diff
+    remember_events(events, events[-1])
+
+# spacer line for GitHub diff
+    return placements
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# Write-behind Persistence
+# ----------------------------------
+def persist_later(touched_nodes=(), placed_pods=()):
+
+# spacer line for GitHub diff
+    """Queue rows for persist_writer; a later update to the same id replaces the earlier one."""
+
+# spacer line for GitHub diff
+    with persist_cond:
+
+# spacer line for GitHub diff
+        for n in touched_nodes:
+
+# spacer line for GitHub diff
+            dirty_nodes[n["node_id"]] = n
+
+# spacer line for GitHub diff
+        for p, nid in placed_pods:
+
+# spacer line for GitHub diff
+            dirty_pods[p["pod_id"]] = (p, nid)
+
+# spacer line for GitHub diff
+        if len(dirty_nodes) + len(dirty_pods) >= PERSIST_BATCH_SIZE:
+
+# spacer line for GitHub diff
+            persist_cond.notify()
+
+# spacer line for GitHub diff
+    state_changed([n["node_id"] for n in touched_nodes] + [nid for _, nid in placed_pods])
+
+# spacer line for GitHub diff
+
+def flush_persist_queue():
+
+# spacer line for GitHub diff
+    # Rows are snapshotted at flush time by save_placements_to_db, so a
+
+# spacer line for GitHub diff
+    # coalesced entry always writes the newest in-memory state, and nodes
+
+# spacer line for GitHub diff
+    # deleted since they were queued are skipped
+
+# spacer line for GitHub diff
+    with persist_cond:
+
+# spacer line for GitHub diff
+        batch_nodes = list(dirty_nodes.values())
+
+# spacer line for GitHub diff
+        batch_pods  = list(dirty_pods.values())
+
+# spacer line for GitHub diff
+        dirty_nodes.clear()
+
+# spacer line for GitHub diff
+        dirty_pods.clear()
+
+# spacer line for GitHub diff
+    if not batch_nodes and not batch_pods:
+
+# spacer line for GitHub diff
+        return 0
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(batch_nodes, batch_pods)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS:
+
+# spacer line for GitHub diff
+        # Put the batch back behind anything queued meanwhile and retry next flush
+
+# spacer line for GitHub diff
+        with persist_cond:
+
+# spacer line for GitHub diff
+            for n in batch_nodes:
+
+# spacer line for GitHub diff
+                dirty_nodes.setdefault(n["node_id"], n)
+
+# spacer line for GitHub diff
+            for p, nid in batch_pods:
+
+# spacer line for GitHub diff
+                dirty_pods.setdefault(p["pod_id"], (p, nid))
+
+# spacer line for GitHub diff
+        raise
+
+# spacer line for GitHub diff
+    return len(batch_nodes) + len(batch_pods)
+
+# spacer line for GitHub diff
+
+def persist_writer():
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        while not persist_stop.is_set():
+
+# spacer line for GitHub diff
+            with persist_cond:
+
+# spacer line for GitHub diff
+                persist_cond.wait_for(
+
+# spacer line for GitHub diff
+                    lambda: persist_stop.is_set() or len(dirty_nodes) + len(dirty_pods) >= PERSIST_BATCH_SIZE,
+
+# spacer line for GitHub diff
+                    timeout=PERSIST_INTERVAL)
+
+# spacer line for GitHub diff
+            try:
+
+# spacer line for GitHub diff
+                flush_persist_queue()
+
+# spacer line for GitHub diff
+            except PERSIST_ERRORS as e:
+
+# spacer line for GitHub diff
+                print(f"❌ Could not flush queued rows: {e}")
+
+# spacer line for GitHub diff
+    finally:
+
+# spacer line for GitHub diff
+        persist_done.set()
+
+# spacer line for GitHub diff
+
+def stop_persist_writer():
+
+# spacer line for GitHub diff
+    """Wake persist_writer, let it finish its flush, then write whatever is still queued."""
+
+# spacer line for GitHub diff
+    persist_stop.set()
+
+# spacer line for GitHub diff
+    with persist_cond:
+
+# spacer line for GitHub diff
+        persist_cond.notify()
+
+# spacer line for GitHub diff
+    persist_done.wait(timeout=10)
+
+# spacer line for GitHub diff
+    flush_persist_queue()
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# Health Monitor & Heartbeats
+# ----------------------------------
+def health_monitor():
+
+# spacer line for GitHub diff
+    while True:
+
+# spacer line for GitHub diff
+        time.sleep(HEALTH_CHECK_INTERVAL)
+
+# spacer line for GitHub diff
+        now = get_current_timestamp()
+
+# spacer line for GitHub diff
+        to_fail = []
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            for nid, n in list(nodes.items()):
+
+# spacer line for GitHub diff
+                if n["status"] == "active" and (now - n["last_heartbeat"]) > HEARTBEAT_THRESHOLD:
+
+# spacer line for GitHub diff
+                    n["status"] = "failed"
+
+# spacer line for GitHub diff
+                    capacity_index.update(n)
+
+# spacer line for GitHub diff
+                    to_fail.append(n)
+
+# spacer line for GitHub diff
+        persist_later(to_fail)
+
+# spacer line for GitHub diff
+        for n in to_fail:
+
+# spacer line for GitHub diff
+            nid = n["node_id"]
+
+# spacer line for GitHub diff
+            log_event_func(f"Node {nid} marked FAILED", "node_failed", "warning", nid, group=n["network_group"])
+
+# spacer line for GitHub diff
+            socketio.emit("alert", {"msg": f"Node {nid} failed"})
+
+# spacer line for GitHub diff
+            reschedule_pods_from_failed_node(nid)
+
+# spacer line for GitHub diff
+
+def simulate_heartbeat_thread():
+
+# spacer line for GitHub diff
+    while True:
+
+# spacer line for GitHub diff
+        time.sleep(NODE_HEARTBEAT_INTERVAL)
+
+# spacer line for GitHub diff
+        beating = []
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            for n in nodes.values():
+
+# spacer line for GitHub diff
+                if n["simulate_heartbeat"]:
+
+# spacer line for GitHub diff
+                    n["last_heartbeat"] = get_current_timestamp()
+
+# spacer line for GitHub diff
+                    beating.append(n)
+
+# spacer line for GitHub diff
+        persist_later(beating)
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# Auto‐scaling with Docker & Persistence
+# ----------------------------------
+def auto_scale_cluster():
+
+# spacer line for GitHub diff
+    global last_auto_scale_time
+
+# spacer line for GitHub diff
+    while True:
+
+# spacer line for GitHub diff
+        time.sleep(HEALTH_CHECK_INTERVAL)
+
+# spacer line for GitHub diff
+        util = get_cluster_utilization()
+
+# spacer line for GitHub diff
+        now = get_current_timestamp()
+
+# spacer line for GitHub diff
+        if util >= AUTO_SCALE_THRESHOLD and (now - last_auto_scale_time) >= AUTO_SCALE_COOLDOWN:
+
+# spacer line for GitHub diff
+            nid = str(uuid.uuid4())
+
+# spacer line for GitHub diff
+            nt = random.choice(["high_cpu","high_mem","balanced"])
+
+# spacer line for GitHub diff
+            ng = random.choice(["default","isolated"])
+
+# spacer line for GitHub diff
+            node = {
+
+# spacer line for GitHub diff
+                "node_id": nid,
+
+# spacer line for GitHub diff
+                "cpu_total": DEFAULT_NODE_CPU,
+
+# spacer line for GitHub diff
+                "cpu_available": DEFAULT_NODE_CPU,
+
+# spacer line for GitHub diff
+                "memory_total": DEFAULT_NODE_MEMORY,
+
+# spacer line for GitHub diff
+                "memory_available": DEFAULT_NODE_MEMORY,
+
+# spacer line for GitHub diff
+                "node_type": nt,
+
+# spacer line for GitHub diff
+                "network_group": ng,
+
+# spacer line for GitHub diff
+                "pods": [],
+
+# spacer line for GitHub diff
+                "last_heartbeat": now,
+
+# spacer line for GitHub diff
+                "status": "active",
+
+# spacer line for GitHub diff
+                "simulate_heartbeat": True
+
+# spacer line for GitHub diff
+            }
+
+# spacer line for GitHub diff
+            with nodes_lock:
+
+# spacer line for GitHub diff
+                nodes[nid] = node
+
+# spacer line for GitHub diff
+                capacity_index.update(node)
+
+# spacer line for GitHub diff
+            save_node_to_db(node)
+
+# spacer line for GitHub diff
+            drain_pending([node])
+
+# spacer line for GitHub diff
+            net = ensure_network(ng)
+
+# spacer line for GitHub diff
+            if docker_client and net:
+
+# spacer line for GitHub diff
+                try:
+
+# spacer line for GitHub diff
+                    cont = docker_client.containers.run(
+
+# spacer line for GitHub diff
+                        DOCKER_NODE_IMAGE,
+
+# spacer line for GitHub diff
+                        entrypoint=["python", "node.py"],
+
+# spacer line for GitHub diff
+                        command=[
+
+# spacer line for GitHub diff
+                            "python","node.py",
+
+# spacer line for GitHub diff
+                            "--server","http://host.docker.internal:5000",
+
+# spacer line for GitHub diff
+                            "--node_id",nid,
+
+# spacer line for GitHub diff
+                            "--interval",str(NODE_HEARTBEAT_INTERVAL)
+
+# spacer line for GitHub diff
+                        ],
+
+# spacer line for GitHub diff
+                        name=f"node_{nid}",
+
+# spacer line for GitHub diff
+                        detach=True,
+
+# spacer line for GitHub diff
+                        network=net.name,
+
+# spacer line for GitHub diff
+                        cpu_count=DEFAULT_NODE_CPU,
+
+# spacer line for GitHub diff
+                        mem_limit=f"{DEFAULT_NODE_MEMORY}g",
+
+# spacer line for GitHub diff
+                        labels={"sim-node": nid, "autoscaled": "true"},
+
+# spacer line for GitHub diff
+                        remove = True 
+
+# spacer line for GitHub diff
+                    )
+
+# spacer line for GitHub diff
+                    nodes[nid]["container_id"] = cont.id
+
+# spacer line for GitHub diff
+                    save_node_to_db(nodes[nid])
+
+# spacer line for GitHub diff
+                    log_event_func(f"Container {cont.id[:12]} launched for auto‐scaled node {nid}", "container_launched", node_id=nid, group=ng)
+
+# spacer line for GitHub diff
+                except Exception as e:
+
+# spacer line for GitHub diff
+                    log_event_func(f"Auto‐scale container error for {nid}: {e}", "container_error", "error", nid, group=ng)
+
+# spacer line for GitHub diff
+            else:
+
+# spacer line for GitHub diff
+                log_event_func(f"Skipping container launch for auto‐scaled node {nid}", "container_skipped", node_id=nid, group=ng)
+
+# spacer line for GitHub diff
+            log_event_func(f"Auto‐scaled: Added node {nid} ({DEFAULT_NODE_CPU} CPU, {DEFAULT_NODE_MEMORY}GB, Type:{nt}, Group:{ng})",
+
+# spacer line for GitHub diff
+                           "node_added", node_id=nid, group=ng)
+
+# spacer line for GitHub diff
+            last_auto_scale_time = now
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# Rebalancer (defragmentation)
+# ----------------------------------
+def get_fragmentation():
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        return fragmentation(nodes, FRAGMENTATION_POD_CPU, FRAGMENTATION_POD_MEMORY)
+
+# spacer line for GitHub diff
+
+def migrate_pods(moves):
+
+# spacer line for GitHub diff
+    """Apply one batch of (pod, from_node_id, to_node_id) moves and persist it.
+
+# spacer line for GitHub diff
+
+    Moves that went stale since planning (pod gone, node failed, room taken)
+
+# spacer line for GitHub diff
+    are skipped. Node rows and the moved pods' rows are written in one
+
+# spacer line for GitHub diff
+    commit; a failed write moves the pods back. Returns the source nodes
+
+# spacer line for GitHub diff
+    that gave up capacity.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    applied, touched = [], {}
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        for pod, src_id, dst_id in moves:
+
+# spacer line for GitHub diff
+            src, dst = nodes.get(src_id), nodes.get(dst_id)
+
+# spacer line for GitHub diff
+            if (not src or not dst or dst["status"] != "active"
+
+# spacer line for GitHub diff
+                    or not any(p is pod for p in src["pods"])
+
+# spacer line for GitHub diff
+                    or dst["cpu_available"] < pod["cpu"] or dst["memory_available"] < pod["memory"]):
+
+# spacer line for GitHub diff
+                continue
+
+# spacer line for GitHub diff
+            release_pod(src, pod)
+
+# spacer line for GitHub diff
+            reserve_pod(dst, pod)
+
+# spacer line for GitHub diff
+            applied.append((pod, src, dst))
+
+# spacer line for GitHub diff
+            touched[src_id], touched[dst_id] = src, dst
+
+# spacer line for GitHub diff
+    if not applied:
+
+# spacer line for GitHub diff
+        return []
+
+# spacer line for GitHub diff
+    ts = event_timestamp()
+
+# spacer line for GitHub diff
+    events = [event_row(ts, f"Rebalancer moved pod {p['pod_id']} {src['node_id']} → {dst['node_id']}", "pod_migrated",
+
+# spacer line for GitHub diff
+                        "info", dst["node_id"], p["pod_id"], p["network_group"]) for p, src, dst in applied]
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        save_placements_to_db(touched.values(), [(p, dst["node_id"]) for p, _, dst in applied], events)
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS as e:
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            for pod, src, dst in reversed(applied):
+
+# spacer line for GitHub diff
+                release_pod(dst, pod)
+
+# spacer line for GitHub diff
+                if nodes.get(src["node_id"]) is src:
+
+# spacer line for GitHub diff
+                    reserve_pod(src, pod)
+
+# spacer line for GitHub diff
+        print(f"❌ Could not persist pod migrations: {e}")
+
+# spacer line for GitHub diff
+        return []
+
+# spacer line for GitHub diff
+    return list({src["node_id"]: src for _, src, _ in applied}.values())
+
+# spacer line for GitHub diff
+
+def rebalance_once():
+
+# spacer line for GitHub diff
+    """Plan one consolidation round and apply it in rate-limited batches.
+
+# spacer line for GitHub diff
+
+    Free capacity is consolidated for the largest queued pod, or for the
+
+# spacer line for GitHub diff
+    reference shape when nothing is queued.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        shapes = [(p["cpu"], p["memory"]) for p in pending_pods.pods()]
+
+# spacer line for GitHub diff
+        cpu, mem = max(shapes) if shapes else (FRAGMENTATION_POD_CPU, FRAGMENTATION_POD_MEMORY)
+
+# spacer line for GitHub diff
+        frag = fragmentation(nodes, cpu, mem)
+
+# spacer line for GitHub diff
+        if frag < REBALANCE_THRESHOLD and not shapes:
+
+# spacer line for GitHub diff
+            return
+
+# spacer line for GitHub diff
+        moves = plan_consolidation(nodes, REBALANCE_MAX_MOVES, cpu, mem)
+
+# spacer line for GitHub diff
+    if not moves:
+
+# spacer line for GitHub diff
+        return
+
+# spacer line for GitHub diff
+    log_event_func(f"Rebalancer: fragmentation {frag:.0%} for {cpu} CPU/{mem}GB pods, migrating {len(moves)} pods", "rebalance_started")
+
+# spacer line for GitHub diff
+    for i in range(0, len(moves), REBALANCE_BATCH_SIZE):
+
+# spacer line for GitHub diff
+        if i:
+
+# spacer line for GitHub diff
+            time.sleep(REBALANCE_BATCH_DELAY)
+
+# spacer line for GitHub diff
+        drain_pending(migrate_pods(moves[i:i + REBALANCE_BATCH_SIZE]))
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        frag = fragmentation(nodes, cpu, mem)
+
+# spacer line for GitHub diff
+    log_event_func(f"Rebalancer: fragmentation now {frag:.0%}", "rebalance_finished")
+
+# spacer line for GitHub diff
+
+def rebalancer():
+
+# spacer line for GitHub diff
+    while True:
+
+# spacer line for GitHub diff
+        time.sleep(REBALANCE_INTERVAL)
+
+# spacer line for GitHub diff
+        rebalance_once()
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# Chaos Monkey & Broadcast
+# ----------------------------------
+def chaos_monkey():
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        active = [n for n in nodes.values() if n["status"]=="active"]
+
+# spacer line for GitHub diff
+    if not active:
+
+# spacer line for GitHub diff
+        return {"message":"No active nodes"}
+
+# spacer line for GitHub diff
+    target = random.choice(active)
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        target["status"] = "failed"
+
+# spacer line for GitHub diff
+        capacity_index.update(target)
+
+# spacer line for GitHub diff
+    persist_later([target])
+
+# spacer line for GitHub diff
+    log_event_func(f"Chaos Monkey killed node {target['node_id']}", "node_failed", "warning", target["node_id"], group=target["network_group"])
+
+# spacer line for GitHub diff
+    reschedule_pods_from_failed_node(target["node_id"])
+
+# spacer line for GitHub diff
+    return {"message":f"Killed node {target['node_id']}"}
+
+# spacer line for GitHub diff
+
+def state_changed(node_ids=()):
+
+# spacer line for GitHub diff
+    """Note a dashboard-visible change for push_worker; node_ids are nodes added, modified or removed."""
+
+# spacer line for GitHub diff
+    global view_changed
+
+# spacer line for GitHub diff
+    with push_cond:
+
+# spacer line for GitHub diff
+        changed_nodes.update(node_ids)
+
+# spacer line for GitHub diff
+        view_changed = True
+
+# spacer line for GitHub diff
+        push_cond.notify()
+
+# spacer line for GitHub diff
+
+def publish_state(full=False):
+
+# spacer line for GitHub diff
+    """Send each room the delta since its last published version, if any; returns the cluster room's.
+
+# spacer line for GitHub diff
+
+    Only the nodes noted by state_changed are diffed, unless ``full``, and
+
+# spacer line for GitHub diff
+    each room only diffs those in its own slice.
+
+# spacer line for GitHub diff
+    """
+
+# spacer line for GitHub diff
+    global view_changed
+
+# spacer line for GitHub diff
+    with publish_lock:
+
+# spacer line for GitHub diff
+        with push_cond:
+
+# spacer line for GitHub diff
+            changed = None if full else set(changed_nodes)
+
+# spacer line for GitHub diff
+            changed_nodes.clear()
+
+# spacer line for GitHub diff
+            view_changed = False
+
+# spacer line for GitHub diff
+        deltas = {}
+
+# spacer line for GitHub diff
+        with nodes_lock:
+
+# spacer line for GitHub diff
+            pending = pending_pods.pods()
+
+# spacer line for GitHub diff
+            by_group = None if changed is None else changes_by_group(changed)
+
+# spacer line for GitHub diff
+            for room, feed in room_feeds.items():
+
+# spacer line for GitHub diff
+                delta = tick_room(room, feed, changed, by_group, pending)
+
+# spacer line for GitHub diff
+                if delta is not None:
+
+# spacer line for GitHub diff
+                    deltas[room] = delta
+
+# spacer line for GitHub diff
+        for room, delta in deltas.items():
+
+# spacer line for GitHub diff
+            socketio.emit("state_delta", delta, to=room)
+
+# spacer line for GitHub diff
+        return deltas.get("cluster")
+
+# spacer line for GitHub diff
+
+def changes_by_group(changed):
+
+# spacer line for GitHub diff
+    # Changed node ids per network group; removed nodes under None, as any group's room may hold them
+
+# spacer line for GitHub diff
+    groups = defaultdict(list)
+
+# spacer line for GitHub diff
+    for nid in changed:
+
+# spacer line for GitHub diff
+        node = nodes.get(nid)
+
+# spacer line for GitHub diff
+        groups[node["network_group"] if node else None].append(nid)
+
+# spacer line for GitHub diff
+    return groups
+
+# spacer line for GitHub diff
+
+def tick_room(room, feed, changed, by_group, pending):
+
+# spacer line for GitHub diff
+    # One room's slice of the cluster; call with nodes_lock held
+
+# spacer line for GitHub diff
+    kind, key = room_scope(room)
+
+# spacer line for GitHub diff
+    if kind == "cluster":
+
+# spacer line for GitHub diff
+        return feed.tick(nodes, event_log, utilization_history, pending[:PENDING_SHOWN], len(pending), changed)
+
+# spacer line for GitHub diff
+    if kind == "summary":
+
+# spacer line for GitHub diff
+        return feed.tick({}, event_log, utilization_history, changed=(), summary=cluster_summary())
+
+# spacer line for GitHub diff
+    if kind == "node":
+
+# spacer line for GitHub diff
+        if changed is not None and key not in changed:
+
+# spacer line for GitHub diff
+            return None
+
+# spacer line for GitHub diff
+        return feed.tick(nodes, changed=[key])
+
+# spacer line for GitHub diff
+    queued = [p for p in pending if p["network_group"] == key]
+
+# spacer line for GitHub diff
+    if changed is not None:
+
+# spacer line for GitHub diff
+        changed = by_group.get(key, []) + by_group.get(None, [])
+
+# spacer line for GitHub diff
+    return feed.tick(nodes, pending=queued[:PENDING_SHOWN], pending_count=len(queued), changed=changed,
+
+# spacer line for GitHub diff
+                     select=lambda n: n["network_group"] == key)
+
+# spacer line for GitHub diff
+
+def push_worker():
+
+# spacer line for GitHub diff
+    # Sleeps until something changed while a dashboard is connected (an idle
+
+# spacer line for GitHub diff
+    # or unwatched cluster costs nothing), then waits out the rest of
+
+# spacer line for GitHub diff
+    # PUSH_INTERVAL so a burst of changes goes out as one delta
+
+# spacer line for GitHub diff
+    last = 0.0
+
+# spacer line for GitHub diff
+    while True:
+
+# spacer line for GitHub diff
+        with push_cond:
+
+# spacer line for GitHub diff
+            push_cond.wait_for(lambda: view_changed and client_rooms)
+
+# spacer line for GitHub diff
+        time.sleep(max(0.0, last + PUSH_INTERVAL - time.monotonic()))
+
+# spacer line for GitHub diff
+        publish_state()
+
+# spacer line for GitHub diff
+        last = time.monotonic()
+
+# spacer line for GitHub diff
+
+# ----------------------------------
+# API Endpoints
+# ----------------------------------
+@app.route('/add_node', methods=['POST'])
+
+# spacer line for GitHub diff
+def add_node_endpoint():
+
+# spacer line for GitHub diff
+    data = request.get_json() or {}
+
+# spacer line for GitHub diff
+    print("▶️  /add_node called with:", data)
+
+# spacer line for GitHub diff
+
+    cpu = data.get("cpu")
+
+# spacer line for GitHub diff
+    if cpu is None:
+
+# spacer line for GitHub diff
+        print("❌  Missing cpu in payload")
+
+# spacer line for GitHub diff
+        return jsonify({"error":"Missing cpu"}), 400
+
+# spacer line for GitHub diff
+    mem = data.get("memory", DEFAULT_NODE_MEMORY)
+
+# spacer line for GitHub diff
+    # Strategies score nodes by their share of cpu_total / memory_total
+
+# spacer line for GitHub diff
+    if any(type(v) not in (int, float) or v <= 0 for v in (cpu, mem)):
+
+# spacer line for GitHub diff
+        print(f"❌  Invalid capacity cpu={cpu!r} memory={mem!r}")
+
+# spacer line for GitHub diff
+        return jsonify({"error":"cpu and memory must be positive numbers"}), 400
+
+# spacer line for GitHub diff
+    nt  = data.get("node_type", "balanced")
+
+# spacer line for GitHub diff
+    ng  = data.get("network_group", "default")
+
+# spacer line for GitHub diff
+
+    # 1) create node record
+    node_id = str(uuid.uuid4())
+
+# spacer line for GitHub diff
+    node = {
+
+# spacer line for GitHub diff
+        "node_id": node_id,
+
+# spacer line for GitHub diff
+        "cpu_total": cpu, "cpu_available": cpu,
+
+# spacer line for GitHub diff
+        "memory_total": mem, "memory_available": mem,
+
+# spacer line for GitHub diff
+        "node_type": nt, "network_group": ng,
+
+# spacer line for GitHub diff
+        "pods": [], "last_heartbeat": time.time(),
+
+# spacer line for GitHub diff
+        "status": "active", "simulate_heartbeat": True
+
+# spacer line for GitHub diff
+    }
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        nodes[node_id] = node
+
+# spacer line for GitHub diff
+        capacity_index.update(node)
+
+# spacer line for GitHub diff
+    save_node_to_db(node)
+
+# spacer line for GitHub diff
+    log_event_func(f"Added node {node_id} ({cpu} CPU, {mem}GB, {nt}/{ng})", "node_added", node_id=node_id, group=ng)
+
+# spacer line for GitHub diff
+    drain_pending([node])
+
+# spacer line for GitHub diff
+
+    # 2) launch container
+    if docker_client:
+
+# spacer line for GitHub diff
+        server_url = "http://host.docker.internal:5000"
+
+# spacer line for GitHub diff
+        print(f"⚙️  Launching container for {node_id} on network '{ng}' via {server_url}")
+
+# spacer line for GitHub diff
+        net = ensure_network(ng)
+
+# spacer line for GitHub diff
+        try:
+
+# spacer line for GitHub diff
+            container = docker_client.containers.run(
+
+# spacer line for GitHub diff
+                DOCKER_NODE_IMAGE,
+
+# spacer line for GitHub diff
+                entrypoint= ["python", "node.py"],
+
+# spacer line for GitHub diff
+                command=[
+
+# spacer line for GitHub diff
+                  "python", "node.py",
+
+# spacer line for GitHub diff
+                  "--server", server_url,
+
+# spacer line for GitHub diff
+                  "--node_id", node_id,
+
+# spacer line for GitHub diff
+                  "--interval", str(NODE_HEARTBEAT_INTERVAL)
+
+# spacer line for GitHub diff
+                ],
+
+# spacer line for GitHub diff
+                name=f"node_{node_id}",
+
+# spacer line for GitHub diff
+                detach=True,
+
+# spacer line for GitHub diff
+                network=net.name if net else None,
+
+# spacer line for GitHub diff
+                cpu_count=cpu,
+
+# spacer line for GitHub diff
+                mem_limit=f"{mem}g",
+
+# spacer line for GitHub diff
+                labels={"sim-node": node_id},
+
+# spacer line for GitHub diff
+                auto_remove = False
+
+# spacer line for GitHub diff
+            )
+
+# spacer line for GitHub diff
+            print("✅ Container started:", container.id)
+
+# spacer line for GitHub diff
+            with nodes_lock:
+
+# spacer line for GitHub diff
+                nodes[node_id]["container_id"] = container.id
+
+# spacer line for GitHub diff
+            save_node_to_db(nodes[node_id])
+
+# spacer line for GitHub diff
+            log_event_func(f"Container {container.id[:12]} launched for node {node_id}", "container_launched", node_id=node_id, group=ng)
+
+# spacer line for GitHub diff
+        except Exception as ex:
+
+# spacer line for GitHub diff
+            print("❌ Container launch error:", ex)
+
+# spacer line for GitHub diff
+            log_event_func(f"ERROR launching container for node {node_id}: {ex}", "container_error", "error", node_id, group=ng)
+
+# spacer line for GitHub diff
+    else:
+
+# spacer line for GitHub diff
+        print("⚠️  Skipping container launch (no docker_client)")
+
+# spacer line for GitHub diff
+
+    return jsonify({"message":"Node added","node_id":node_id}), 200
+
+# spacer line for GitHub diff
+
+
+@app.route('/toggle_simulation', methods=['POST'])
+
+# spacer line for GitHub diff
+def toggle_simulation():
+
+# spacer line for GitHub diff
+    data = request.get_json()
+
+# spacer line for GitHub diff
+    nid, sim = data.get("node_id"), bool(data.get("simulate"))
+
+# spacer line for GitHub diff
+    if not nid:
+
+# spacer line for GitHub diff
+        return jsonify({"error":"Missing node_id"}),400
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        n = nodes.get(nid)
+
+# spacer line for GitHub diff
+        if not n:
+
+# spacer line for GitHub diff
+            return jsonify({"error":"Not found"}),404
+
+# spacer line for GitHub diff
+        n["simulate_heartbeat"] = sim
+
+# spacer line for GitHub diff
+    persist_later([n])
+
+# spacer line for GitHub diff
+    log_event_func(f"Simulation for {nid} set to {sim}", "simulation_toggled", node_id=nid, group=n["network_group"])
+
+# spacer line for GitHub diff
+    return jsonify({"message":"OK"}),200
+
+# spacer line for GitHub diff
+
+@app.route('/list_nodes', methods=['GET'])
+
+# spacer line for GitHub diff
+def list_nodes_api():
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        return jsonify({"nodes": list(nodes.values())}),200
+
+# spacer line for GitHub diff
+
+@app.route('/heartbeat', methods=['POST'])
+
+# spacer line for GitHub diff
+def heartbeat_api():
+
+# spacer line for GitHub diff
+    data = request.get_json() or {}
+
+# spacer line for GitHub diff
+    nid = data.get("node_id")
+
+# spacer line for GitHub diff
+    with nodes_lock:
+
+# spacer line for GitHub diff
+        n = nodes.get(nid)
+
+# spacer line for GitHub diff
+        if not n:
+
+# spacer line for GitHub diff
+            return jsonify({"error":"Unknown"}),404
+
+# spacer line for GitHub diff
+        n["last_heartbeat"] = time.time()
+
+# spacer line for GitHub diff
+        reactivated = n["status"] == "failed"
+
+# spacer line for GitHub diff
+        if reactivated:
+
+# spacer line for GitHub diff
+            n["status"] = "active"
+
+# spacer line for GitHub diff
+            capacity_index.update(n)
+
+# spacer line for GitHub diff
+    persist_later([n])
+
+# spacer line for GitHub diff
+    if reactivated:
+
+# spacer line for GitHub diff
+        log_event_func(f"Node {nid} reactivated", "node_reactivated", node_id=nid, group=n["network_group"])
+
+# spacer line for GitHub diff
+        drain_pending([n])
+
+# spacer line for GitHub diff
+    return jsonify({"message":"OK"}),200
+
+# spacer line for GitHub diff
+@app.route('/launch_pod', methods=['POST'])
+
+# spacer line for GitHub diff
+def launch_pod_endpoint():
+
+# spacer line for GitHub diff
+    data = request.get_json() or {}
+
+# spacer line for GitHub diff
+    print("▶️  /launch_pod called with:", data)
+
+# spacer line for GitHub diff
+
+    cpu_req = data.get("cpu_required")
+
+# spacer line for GitHub diff
+    if cpu_req is None:
+
+# spacer line for GitHub diff
+        print("❌  Missing cpu_required")
+
+# spacer line for GitHub diff
+        return jsonify({"error":"Missing cpu_required"}), 400
+
+# spacer line for GitHub diff
+
+    mem_req = data.get("memory_required", DEFAULT_POD_MEMORY)
+
+# spacer line for GitHub diff
+    # A size that is not a positive number could never be placed or drained
+
+# spacer line for GitHub diff
+    if any(type(v) not in (int, float) or v <= 0 for v in (cpu_req, mem_req)):
+
+# spacer line for GitHub diff
+        print(f"❌  Invalid pod size cpu={cpu_req!r} memory={mem_req!r}")
+
+# spacer line for GitHub diff
+        return jsonify({"error":"cpu_required and memory_required must be positive numbers"}), 400
+
+# spacer line for GitHub diff
+    algo    = data.get("scheduling_algorithm", "first_fit")
+
+# spacer line for GitHub diff
+    algo    = algo.lower() if isinstance(algo, str) else algo  # anything else fails the check below
+
+# spacer line for GitHub diff
+    ng      = data.get("network_group", "default")
+
+# spacer line for GitHub diff
+    affinity= data.get("node_affinity")
+
+# spacer line for GitHub diff
+    priority= data.get("priority", 0)
+
+# spacer line for GitHub diff
+    if algo not in SCHEDULING_ALGORITHMS:
+
+# spacer line for GitHub diff
+        print(f"❌  Unknown scheduling_algorithm {algo}")
+
+# spacer line for GitHub diff
+        return jsonify({"error": f"Unknown scheduling_algorithm, expected one of {SCHEDULING_ALGORITHMS}"}), 400
+
+# spacer line for GitHub diff
+    if type(priority) is not int:
+
+# spacer line for GitHub diff
+        print(f"❌  Invalid priority {priority}")
+
+# spacer line for GitHub diff
+        return jsonify({"error": "priority must be an integer"}), 400
+
+# spacer line for GitHub diff
+
+    try:
+
+# spacer line for GitHub diff
+        pid = f"pod_{pod_ids.next_id()}"
+
+# spacer line for GitHub diff
+    except PERSIST_ERRORS as e:
+
+# spacer line for GitHub diff
+        print(f"❌ Could not lease pod ids: {e}")
+
+# spacer line for GitHub diff
+        return jsonify({"error": "Failed to reserve a pod id"}), 500
+
+# spacer line for GitHub diff
+
+    pod = {
+
+# spacer line for GitHub diff
+        "pod_id": pid,
+
+# spacer line for GitHub diff
+        "cpu": cpu_req,
+
+# spacer line for GitHub diff
+        "memory": mem_req,
+
+# spacer line for GitHub diff
+        "network_group": ng,
+
+# spacer line for GitHub diff
+        "cpu_usage": 0,
+
+# spacer line for GitHub diff
+        "scheduling_algorithm": algo,
+
+# spacer line for GitHub diff
+        "priority": priority
+
+# spacer line for GitHub diff
+    }
+
+# spacer line for GitHub diff
+    if affinity:
+
+# spacer line for GitHub diff
+        pod["node_affinity"] = affinity
+
+# spacer line for GitHub diff
+
+    try:
+
+# spacer line for GitHub diff
+        scheduled, assigned = schedule_pod(pod, algo, queue_if_full=True)
 
 # spacer line for GitHub diff
-                log_event_func(f"Skipping container launch for auto‐scaled node {nid}")
+    except PERSIST_ERRORS as e:
 
 # spacer line for GitHub diff
-            log_event_func(f"Auto‐scaled: Added node {nid} ({DEFAULT_NODE_CPU} CPU, {DEFAULT_NODE_MEMORY}GB, Type:{nt}, Group:{ng})")
+        print(f"❌ Could not persist pod {pid}: {e}")
 
 # spacer line for GitHub diff
-            last_auto_scale_time = now
+        return jsonify({"error": "Failed to persist pod placement"}), 500
 
 # spacer line for GitHub diff
+    if scheduled:
 
-# ----------------------------------
-# Chaos Monkey & Broadcast
-# ----------------------------------
-def chaos_monkey():
+# spacer line for GitHub diff
+        print(f"✅ Pod {pid} scheduled on node {assigned} via {algo}")
 
 # spacer line for GitHub diff
-    with nodes_lock:
+        return jsonify({
 
 # spacer line for GitHub diff
-        active = [n for n in nodes.values() if n["status"]=="active"]
+            "message": "Pod launched",
 
 # spacer line for GitHub diff
-    if not active:
+            "pod_id": pid,
 
 # spacer line for GitHub diff
-        return {"message":"No active nodes"}
+            "assigned_node": assigned,
 
 # spacer line for GitHub diff
-    target = random.choice(active)
+            "scheduling_algorithm": algo,
 
 # spacer line for GitHub diff
-    target["status"] = "failed"
+            "priority": priority
 
 # spacer line for GitHub diff
-    save_node_to_db(target)
+        }), 200
 
 # spacer line for GitHub diff
-    log_event_func(f"Chaos Monkey killed node {target['node_id']}")
+    elif pod.get("status"):
 
 # spacer line for GitHub diff
-    reschedule_pods_from_failed_node(target["node_id"])
+        # Queued; it may already have been placed by a concurrent capacity change
 
 # spacer line for GitHub diff
-    return {"message":f"Killed node {target['node_id']}"}
+        print(f"⏳ No capacity for pod {pid}, queued")
 
 # spacer line for GitHub diff
+        return jsonify({
 
-def broadcast_state():
+# spacer line for GitHub diff
+            "message": "Pod queued",
 
 # spacer line for GitHub diff
-    while True:
+            "pod_id": pid,
 
 # spacer line for GitHub diff
-        time.sleep(3)
+            "status": "pending",
 
 # spacer line for GitHub diff
-        with nodes_lock:
+            "scheduling_algorithm": algo
 
 # spacer line for GitHub diff
-            state = {
+        }), 202
 
 # spacer line for GitHub diff
-                "nodes": list(nodes.values()),
+    else:
 
 # spacer line for GitHub diff
-                "logs": event_log[-50:],
+        print(f"❌ No capacity for pod {pid} and the pending queue is full")
 
 # spacer line for GitHub diff
-                "history": [{"timestamp": ts, "utilization": util} for ts, util in utilization_history]
+        return jsonify({"error": "No available node with sufficient resources"}), 400
 
 # spacer line for GitHub diff
-            }
+
+@app.route('/launch_pods', methods=['POST'])
 
 # spacer line for GitHub diff
-        socketio.emit("state_update", state)
+@app.route('/api/launch_pods', methods=['POST'])
 
 # spacer line for GitHub diff
+def launch_pods_endpoint():
 
-# ----------------------------------
-# API Endpoints
-# ----------------------------------
-@app.route('/add_node', methods=['POST'])
+# spacer line for GitHub diff
+    data = request.get_json() or {}
 
 # spacer line for GitHub diff
-def add_node_endpoint():
+    specs = data.get("pods")
 
 # spacer line for GitHub diff
-    data = request.get_json() or {}
+    if specs is None:
 
 # spacer line for GitHub diff
-    print("▶️  /add_node called with:", data)
+        # Replica form: one template repeated `count` times; range-checked
 
 # spacer line for GitHub diff
+        # before the list is built, so a huge count is never allocated
 
-    cpu = data.get("cpu")
+# spacer line for GitHub diff
+        count = data.get("count", 1)
 
 # spacer line for GitHub diff
-    if cpu is None:
+        if type(count) is not int or not 1 <= count <= MAX_BULK_PODS:
 
 # spacer line for GitHub diff
-        print("❌  Missing cpu in payload")
+            print(f"❌  Invalid count {count!r}")
 
 # spacer line for GitHub diff
-        return jsonify({"error":"Missing cpu"}), 400
+            return jsonify({"error": f"count must be an integer between 1 and {MAX_BULK_PODS}"}), 400
 
 # spacer line for GitHub diff
-    mem = data.get("memory", DEFAULT_NODE_MEMORY)
+        specs = [data] * count
 
 # spacer line for GitHub diff
-    nt  = data.get("node_type", "balanced")
+    if not isinstance(specs, list) or not specs or len(specs) > MAX_BULK_PODS:
 
 # spacer line for GitHub diff
-    ng  = data.get("network_group", "default")
+        return jsonify({"error": f"Expected between 1 and {MAX_BULK_PODS} pod specs"}), 400
 
 # spacer line for GitHub diff
+    print(f"▶️  /launch_pods called with {len(specs)} pod specs")
 
-    # 1) create node record
-    node_id = str(uuid.uuid4())
+# spacer line for GitHub diff
+    if not all(isinstance(s, dict) for s in specs):
 
 # spacer line for GitHub diff
-    node = {
+        print("❌  Pod spec is not an object")
 
 # spacer line for GitHub diff
-        "node_id": node_id,
+        return jsonify({"error": "Each entry in pods must be an object"}), 400
 
 # spacer line for GitHub diff
-        "cpu_total": cpu, "cpu_available": cpu,
+    if any(s.get("cpu_required") is None for s in specs):
 
 # spacer line for GitHub diff
-        "memory_total": mem, "memory_available": mem,
+        print("❌  Missing cpu_required")
 
 # spacer line for GitHub diff
-        "node_type": nt, "network_group": ng,
+        return jsonify({"error":"Missing cpu_required"}), 400
 
 # spacer line for GitHub diff
-        "pods": [], "last_heartbeat": time.time(),
+    if any(type(v) not in (int, float) or v <= 0
 
 # spacer line for GitHub diff
-        "status": "active", "simulate_heartbeat": True
+           for s in specs for v in (s["cpu_required"], s.get("memory_required", DEFAULT_POD_MEMORY))):
 
 # spacer line for GitHub diff
-    }
+        print("❌  Invalid pod size")
 
 # spacer line for GitHub diff
-    with nodes_lock:
+        return jsonify({"error":"cpu_required and memory_required must be positive numbers"}), 400
 
 # spacer line for GitHub diff
-        nodes[node_id] = node
+    if any(type(s.get("priority", 0)) is not int for s in specs):
 
 # spacer line for GitHub diff
-    save_node_to_db(node)
+        print("❌  Invalid priority")
 
 # spacer line for GitHub diff
-    log_event_func(f"Added node {node_id} ({cpu} CPU, {mem}GB, {nt}/{ng})")
+        return jsonify({"error": "priority must be an integer"}), 400
 
 # spacer line for GitHub diff
+    algo    = data.get("scheduling_algorithm", "first_fit")
 
-    # 2) launch container
-    if docker_client:
+# spacer line for GitHub diff
+    algo    = algo.lower() if isinstance(algo, str) else algo  # anything else fails the check below
 
 # spacer line for GitHub diff
-        server_url = "http://host.docker.internal:5000"
+    if algo not in SCHEDULING_ALGORITHMS:
 
 # spacer line for GitHub diff
-        print(f"⚙️  Launching container for {node_id} on network '{ng}' via {server_url}")
+        print(f"❌  Unknown scheduling_algorithm {algo}")
 
 # spacer line for GitHub diff
-        net = ensure_network(ng)
+        return jsonify({"error": f"Unknown scheduling_algorithm, expected one of {SCHEDULING_ALGORITHMS}"}), 400
 
 # spacer line for GitHub diff
-        try:
+
+    try:
 
 # spacer line for GitHub diff
-            container = docker_client.containers.run(
+        first = pod_ids.reserve(len(specs))
 
 # spacer line for GitHub diff
-                DOCKER_NODE_IMAGE,
+    except PERSIST_ERRORS as e:
 
 # spacer line for GitHub diff
-                entrypoint= ["python", "node.py"],
+        print(f"❌ Could not reserve pod ids: {e}")
 
 # spacer line for GitHub diff
-                command=[
+        return jsonify({"error": "Failed to reserve pod ids"}), 500
 
 # spacer line for GitHub diff
-                  "python", "node.py",
+
+    pods = []
 
 # spacer line for GitHub diff
-                  "--server", server_url,
+    for i, spec in enumerate(specs):
 
 # spacer line for GitHub diff
-                  "--node_id", node_id,
+        pod = {
 
 # spacer line for GitHub diff
-                  "--interval", str(NODE_HEARTBEAT_INTERVAL)
+            "pod_id": f"pod_{first + i}",
 
 # spacer line for GitHub diff
-                ],
+            "cpu": spec["cpu_required"],
 
 # spacer line for GitHub diff
-                name=f"node_{node_id}",
+            "memory": spec.get("memory_required", DEFAULT_POD_MEMORY),
 
 # spacer line for GitHub diff
-                detach=True,
+            "network_group": spec.get("network_group", "default"),
 
 # spacer line for GitHub diff
-                network=net.name if net else None,
+            "cpu_usage": 0,
 
 # spacer line for GitHub diff
-                cpu_count=cpu,
+            "scheduling_algorithm": algo,
 
 # spacer line for GitHub diff
-                mem_limit=f"{mem}g",
+            "priority": spec.get("priority", 0)
 
 # spacer line for GitHub diff
-                labels={"sim-node": node_id},
+        }
 
 # spacer line for GitHub diff
-                auto_remove = False
+        if spec.get("node_affinity"):
 
 # spacer line for GitHub diff
-            )
+            pod["node_affinity"] = spec["node_affinity"]
 
 # spacer line for GitHub diff
-            print("✅ Container started:", container.id)
+        pods.append(pod)
 
 # spacer line for GitHub diff
-            with nodes_lock:
+
+    try:
 
 # spacer line for GitHub diff
-                nodes[node_id]["container_id"] = container.id
+        placements = schedule_pods_bulk(pods, algo, queue_if_full=True)
 
 # spacer line for GitHub diff
-            save_node_to_db(nodes[node_id])
+    except PERSIST_ERRORS as e:
 
 # spacer line for GitHub diff
-            log_event_func(f"Container {container.id[:12]} launched for node {node_id}")
+        print(f"❌ Could not persist bulk placement: {e}")
 
 # spacer line for GitHub diff
-        except Exception as ex:
+        return jsonify({"error": "Failed to persist pod placements"}), 500
 
 # spacer line for GitHub diff
-            print("❌ Container launch error:", ex)
+    # Unplaced pods either joined the pending queue or were turned away (queue full)
 
 # spacer line for GitHub diff
-            log_event_func(f"ERROR launching container for node {node_id}: {ex}")
+    pending = [p["pod_id"] for p in pods if placements[p["pod_id"]] is None and p.get("status")]
 
 # spacer line for GitHub diff
-    else:
+    unscheduled = [p["pod_id"] for p in pods if placements[p["pod_id"]] is None and not p.get("status")]
 
 # spacer line for GitHub diff
-        print("⚠️  Skipping container launch (no docker_client)")
+    scheduled = len(pods) - len(pending) - len(unscheduled)
 
 # spacer line for GitHub diff
+    if not scheduled and not pending:
 
-    return jsonify({"message":"Node added","node_id":node_id}), 200
+# spacer line for GitHub diff
+        print(f"❌ No capacity for any of {len(pods)} pods")
 
 # spacer line for GitHub diff
+        return jsonify({"error": "No available node with sufficient resources", "unscheduled": unscheduled}), 400
 
+# spacer line for GitHub diff
+    print(f"✅ {scheduled}/{len(pods)} pods scheduled via {algo}, {len(pending)} queued")
 
-@app.route('/toggle_simulation', methods=['POST'])
+# spacer line for GitHub diff
+    return jsonify({
 
 # spacer line for GitHub diff
-def toggle_simulation():
+        "message": "Pods launched",
 
 # spacer line for GitHub diff
-    data = request.get_json()
+        "scheduled": scheduled,
 
 # spacer line for GitHub diff
-    nid, sim = data.get("node_id"), bool(data.get("simulate"))
+        "placements": {p["pod_id"]: placements[p["pod_id"]] for p in pods if placements[p["pod_id"]]},
 
 # spacer line for GitHub diff
-    if not nid:
+        "pending": pending,
 
 # spacer line for GitHub diff
-        return jsonify({"error":"Missing node_id"}),400
+        "unscheduled": unscheduled,
+
+# spacer line for GitHub diff
+        "scheduling_algorithm": algo
+
+# spacer line for GitHub diff
+    }), 200 if scheduled else 202
+
+# spacer line for GitHub diff
+
+@app.route('/pod_status/<pod_id>', methods=['GET'])
+
+# spacer line for GitHub diff
+@app.route('/api/pod_status/<pod_id>', methods=['GET'])
+
+# spacer line for GitHub diff
+def pod_status_api(pod_id):
 
 # spacer line for GitHub diff
     with nodes_lock:
 
 # spacer line for GitHub diff
-        n = nodes.get(nid)
+        if pod_id in pending_pods:
 
 # spacer line for GitHub diff
-        if not n:
+            return jsonify({
 
 # spacer line for GitHub diff
-            return jsonify({"error":"Not found"}),404
+                "pod_id": pod_id,
 
 # spacer line for GitHub diff
-        n["simulate_heartbeat"] = sim
+                "status": "pending",
 
 # spacer line for GitHub diff
-        save_node_to_db(n)
+                "position": pending_pods.position(pod_id),
 
 # spacer line for GitHub diff
-    log_event_func(f"Simulation for {nid} set to {sim}")
+                "pending_count": len(pending_pods)
 
 # spacer line for GitHub diff
-    return jsonify({"message":"OK"}),200
+            }), 200
 
 # spacer line for GitHub diff
+        for n in nodes.values():
 
-@app.route('/list_nodes', methods=['GET'])
+# spacer line for GitHub diff
+            for p in n["pods"]:
 
 # spacer line for GitHub diff
-def list_nodes_api():
+                if p["pod_id"] == pod_id:
 
 # spacer line for GitHub diff
-    with nodes_lock:
+                    return jsonify({
 
 # spacer line for GitHub diff
-        return jsonify({"nodes": list(nodes.values())}),200
+                        "pod_id": pod_id,
 
 # spacer line for GitHub diff
+                        "status": "scheduled",
 
-@app.route('/heartbeat', methods=['POST'])
+# spacer line for GitHub diff
+                        "node_id": n["node_id"],
 
 # spacer line for GitHub diff
-def heartbeat_api():
+                        "node_status": n["status"]
 
 # spacer line for GitHub diff
-    data = request.get_json() or {}
+                    }), 200
 
 # spacer line for GitHub diff
-    nid = data.get("node_id")
+    return jsonify({"error": "Unknown pod"}), 404
 
 # spacer line for GitHub diff
-    with nodes_lock:
+
+
+@app.route('/chaos_monkey', methods=['POST'])
 
 # spacer line for GitHub diff
-        n = nodes.get(nid)
+def chaos_api():
 
 # spacer line for GitHub diff
-        if not n:
+    return jsonify(chaos_monkey()),200
 
 # spacer line for GitHub diff
-            return jsonify({"error":"Unknown"}),404
+
+@app.route('/download_report', methods=['GET'])
 
 # spacer line for GitHub diff
-        n["last_heartbeat"] = time.time()
+def download_report():
 
 # spacer line for GitHub diff
-        if n["status"] == "failed":
+    # ?format=csv|ndjson|columnar, ?rows=nodes|pods (pods includes queued ones)
 
 # spacer line for GitHub diff
-            n["status"] = "active"
+    fmt, rows = request.args.get("format", "csv"), request.args.get("rows", "nodes")
 
 # spacer line for GitHub diff
-            save_node_to_db(n)
+    if fmt not in REPORT_FORMATS:
 
 # spacer line for GitHub diff
-            log_event_func(f"Node {nid} reactivated")
+        return jsonify({"error": f"Unknown format, expected one of {list(REPORT_FORMATS)}"}), 400
 
 # spacer line for GitHub diff
-    return jsonify({"message":"OK"}),200
+    if rows not in REPORT_COLUMNS:
 
 # spacer line for GitHub diff
-@app.route('/launch_pod', methods=['POST'])
+        return jsonify({"error": f"Unknown rows, expected one of {list(REPORT_COLUMNS)}"}), 400
 
 # spacer line for GitHub diff
-def launch_pod_endpoint():
+    # Only the snapshot is taken under the lock; rows are formatted while the response streams
 
 # spacer line for GitHub diff
-    data = request.get_json() or {}
+    with nodes_lock:
 
 # spacer line for GitHub diff
-    print("▶️  /launch_pod called with:", data)
+        snap = snapshot(nodes, pending_pods.pods())
 
 # spacer line for GitHub diff
+    mimetype, ext = REPORT_FORMATS[fmt]
 
-    cpu_req = data.get("cpu_required")
+# spacer line for GitHub diff
+    name = "cluster_report" if rows == "nodes" else "cluster_report_pods"
 
 # spacer line for GitHub diff
-    if cpu_req is None:
+    return Response(stream_with_context(export(snap, fmt, rows, REPORT_CHUNK)), mimetype=mimetype,
 
 # spacer line for GitHub diff
-        print("❌  Missing cpu_required")
+                    headers={"Content-Disposition": f"attachment; filename={name}.{ext}"})
 
 # spacer line for GitHub diff
-        return jsonify({"error":"Missing cpu_required"}), 400
+
+def stream_logs(chunks, after_id):
 
 # spacer line for GitHub diff
+    # Runs in the request thread while the response is sent: rows go out
 
-    mem_req = data.get("memory_required", DEFAULT_POD_MEMORY)
+# spacer line for GitHub diff
+    # LOG_STREAM_CHUNK at a time (on that thread's reader connection for
 
 # spacer line for GitHub diff
-    algo    = data.get("scheduling_algorithm", "first_fit").lower()
+    # SQLite), so a large page never sits in memory and never touches nodes_lock
 
 # spacer line for GitHub diff
-    ng      = data.get("network_group", "default")
+    try:
 
 # spacer line for GitHub diff
-    affinity= data.get("node_affinity")
+        yield '{"logs": ['
 
 # spacer line for GitHub diff
+        last, sep = after_id, ""
 
-    global pod_id_counter
+# spacer line for GitHub diff
+        for rows in chunks:
 
 # spacer line for GitHub diff
-    with pod_id_lock:
+            yield sep + ",".join(json.dumps(event_dict(row[0], row[1:])) for row in rows)
 
 # spacer line for GitHub diff
-        pod_id_counter += 1
+            last, sep = rows[-1][0], ","
 
 # spacer line for GitHub diff
-        pid = f"pod_{pod_id_counter}"
+        yield f'], "next_after_id": {last}}}'
 
 # spacer line for GitHub diff
+    finally:
 
-    pod = {
+# spacer line for GitHub diff
+        chunks.close()
 
 # spacer line for GitHub diff
-        "pod_id": pid,
+
+@app.route('/logs', methods=['GET'])
 
 # spacer line for GitHub diff
-        "cpu": cpu_req,
+@app.route('/api/logs', methods=['GET'])
 
 # spacer line for GitHub diff
-        "memory": mem_req,
+def logs_api():
 
 # spacer line for GitHub diff
-        "network_group": ng,
+    args = request.args
 
 # spacer line for GitHub diff
-        "cpu_usage": 0
+    if not any(k in args for k in ("after_id", "limit", "node_id", "pod_id", "contains", "since")):
 
 # spacer line for GitHub diff
-    }
+        with nodes_lock:
 
 # spacer line for GitHub diff
-    if affinity:
+            return jsonify({"logs": list(event_log)}),200
 
 # spacer line for GitHub diff
-        pod["node_affinity"] = affinity
+    # Keyset page of event_logs in id order; pass next_after_id back as after_id
 
 # spacer line for GitHub diff
+    try:
 
-    scheduled, assigned = schedule_pod(pod, algo)
+# spacer line for GitHub diff
+        after_id = int(args.get("after_id", 0))
 
 # spacer line for GitHub diff
-    if scheduled:
+        limit = int(args.get("limit", LOG_PAGE_SIZE))
 
 # spacer line for GitHub diff
-        save_pod_to_db(pod, assigned)
+        since = float(args["since"]) if "since" in args else None
 
 # spacer line for GitHub diff
-        print(f"✅ Pod {pid} scheduled on node {assigned} via {algo}")
+    except ValueError:
 
 # spacer line for GitHub diff
-        return jsonify({
+        return jsonify({"error": "after_id and limit must be integers, since a UNIX timestamp"}), 400
 
 # spacer line for GitHub diff
-            "message": "Pod launched",
+    if not 1 <= limit <= LOG_PAGE_MAX:
 
 # spacer line for GitHub diff
-            "pod_id": pid,
+        return jsonify({"error": f"limit must be between 1 and {LOG_PAGE_MAX}"}), 400
 
 # spacer line for GitHub diff
-            "assigned_node": assigned,
+    # node_id / pod_id go through the per-entity indexes; contains scans messages
 
 # spacer line for GitHub diff
-            "scheduling_algorithm": algo
+    needles = [args["contains"]] if args.get("contains") else []
 
 # spacer line for GitHub diff
-        }), 200
+    try:
 
 # spacer line for GitHub diff
-    else:
+        chunks = store.iter_logs(after_id, limit, None if since is None else event_timestamp(since), needles, LOG_STREAM_CHUNK,
 
 # spacer line for GitHub diff
-        print(f"❌ No capacity for pod {pid}")
+                                 node_id=args.get("node_id") or None, pod_id=args.get("pod_id") or None)
 
 # spacer line for GitHub diff
-        return jsonify({"error": "No available node with sufficient resources"}), 400
+    except NotImplementedError:
 
 # spacer line for GitHub diff
+        return jsonify({"error": f"The {store.name} state store does not keep a queryable event log"}), 501
 
+# spacer line for GitHub diff
+    return Response(stream_with_context(stream_logs(chunks, after_id)), mimetype="application/json")
 
-@app.route('/chaos_monkey', methods=['POST'])
+# spacer line for GitHub diff
+
+@app.route('/node_events/<node_id>', methods=['GET'])
 
 # spacer line for GitHub diff
-def chaos_api():
+@app.route('/api/node_events/<node_id>', methods=['GET'])
 
 # spacer line for GitHub diff
-    return jsonify(chaos_monkey()),200
+def node_events_api(node_id):
 
 # spacer line for GitHub diff
+    # Newest first from the in-memory ring; older ones are in /logs?node_id=
 
-@app.route('/download_report', methods=['GET'])
+# spacer line for GitHub diff
+    return entity_events(event_ring.for_node, node_id)
 
 # spacer line for GitHub diff
-def download_report():
+
+@app.route('/pod_events/<pod_id>', methods=['GET'])
 
 # spacer line for GitHub diff
-    out = io.StringIO(); w = csv.writer(out)
+@app.route('/api/pod_events/<pod_id>', methods=['GET'])
 
 # spacer line for GitHub diff
-    w.writerow(["Node","CPU tot/avail","Mem tot/avail","Status","Type","Group","Pods"])
+def pod_events_api(pod_id):
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    return entity_events(event_ring.for_pod, pod_id)
 
 # spacer line for GitHub diff
-        for n in nodes.values():
+
+def entity_events(lookup, key):
 
 # spacer line for GitHub diff
-            pods = ";".join(p["pod_id"] for p in n["pods"]) or "None"
+    try:
 
 # spacer line for GitHub diff
-            w.writerow([
+        limit = int(request.args.get("limit", LOG_PAGE_SIZE))
 
 # spacer line for GitHub diff
-                n["node_id"],
+    except ValueError:
 
 # spacer line for GitHub diff
-                f"{n['cpu_total']}/{n['cpu_available']}",
+        return jsonify({"error": "limit must be an integer"}), 400
 
 # spacer line for GitHub diff
-                f"{n['memory_total']}/{n['memory_available']}",
+    if not 1 <= limit <= EVENT_RING_SIZE:
 
 # spacer line for GitHub diff
-                n["status"], n["node_type"], n["network_group"], pods
+        return jsonify({"error": f"limit must be between 1 and {EVENT_RING_SIZE}"}), 400
 
 # spacer line for GitHub diff
-            ])
+    return jsonify({"events": [event_dict(i, row) for i, row in lookup(key, limit)]}), 200
 
 # spacer line for GitHub diff
-    out.seek(0)
+
+@app.route('/utilization_history', methods=['GET'])
 
 # spacer line for GitHub diff
-    return send_file(io.BytesIO(out.getvalue().encode()),
+def util_api():
 
 # spacer line for GitHub diff
-                     mimetype="text/csv",
+    args = request.args
 
 # spacer line for GitHub diff
-                     as_attachment=True,
+    if not any(k in args for k in ("from", "to", "resolution")):
 
 # spacer line for GitHub diff
-                     download_name="cluster_report.csv")
+        with nodes_lock:
 
 # spacer line for GitHub diff
+            hist = [{"timestamp": ts, "utilization": util} for ts, util in utilization_history]
 
-@app.route('/logs', methods=['GET'])
+# spacer line for GitHub diff
+        return jsonify({"history": hist}),200
 
 # spacer line for GitHub diff
-def logs_api():
+    # Range read: from/to are UNIX timestamps (default: the last hour)
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    try:
 
 # spacer line for GitHub diff
-        return jsonify({"logs": event_log}),200
+        end = float(args.get("to", get_current_timestamp()))
 
 # spacer line for GitHub diff
+        start = float(args.get("from", end - 3600))
 
-@app.route('/utilization_history', methods=['GET'])
+# spacer line for GitHub diff
+    except ValueError:
 
 # spacer line for GitHub diff
-def util_api():
+        return jsonify({"error": "from and to must be UNIX timestamps"}), 400
 
 # spacer line for GitHub diff
-    with nodes_lock:
+    resolution = args.get("resolution", "auto")
+
+# spacer line for GitHub diff
+    if resolution == "auto":
+
+# spacer line for GitHub diff
+        resolution = pick_resolution(end - start)
+
+# spacer line for GitHub diff
+    if resolution != "raw" and resolution not in UTILIZATION_ROLLUPS:
+
+# spacer line for GitHub diff
+        return jsonify({"error": f"Unknown resolution, expected one of {['auto', 'raw'] + list(UTILIZATION_ROLLUPS)}"}), 400
+
+# spacer line for GitHub diff
+    try:
+
+# spacer line for GitHub diff
+        hist, truncated = query_utilization(start, end, resolution)
+
+# spacer line for GitHub diff
+    except NotImplementedError:
 
 # spacer line for GitHub diff
-        hist = [{"timestamp": ts, "utilization": util} for ts, util in utilization_history]
+        return jsonify({"error": f"The {store.name} state store does not keep utilization history"}), 501
 
 # spacer line for GitHub diff
-    return jsonify({"history": hist}),200
+    return jsonify({"history": hist, "resolution": resolution, "truncated": truncated}),200
 
 # spacer line for GitHub diff
 
@@ -2467,19 +4902,22 @@ def dashboard():
 def background_tasks():
 
 # spacer line for GitHub diff
-    Thread(target=health_monitor, daemon=True).start()
+    # Socket.IO background tasks: daemon threads in threading mode, green
 
 # spacer line for GitHub diff
-    Thread(target=simulate_heartbeat_thread, daemon=True).start()
+    # threads under eventlet/gevent, so the loops share the server's runtime
 
 # spacer line for GitHub diff
-    Thread(target=auto_scale_cluster, daemon=True).start()
+    for task in (persist_writer, health_monitor, simulate_heartbeat_thread, auto_scale_cluster,
 
 # spacer line for GitHub diff
-    Thread(target=record_utilization, daemon=True).start()
+                 rebalancer, record_utilization, retention_worker, push_worker):
 
 # spacer line for GitHub diff
-    Thread(target=broadcast_state, daemon=True).start()
+        socketio.start_background_task(task)
+
+# spacer line for GitHub diff
+    atexit.register(stop_persist_writer)
 
 # spacer line for GitHub diff
 
@@ -2492,21 +4930,27 @@ def background_tasks():
 def cluster_stats():
     """Returns summary statistics about the cluster."""
     with nodes_lock:
-        total_nodes = len(nodes)
-        total_pods = sum(len(n['pods']) for n in nodes.values())
-        utilization = get_cluster_utilization()
-    return jsonify({
-        "total_nodes": total_nodes,
-        "total_pods": total_pods,
-        "utilization": round(utilization * 100, 2)
-    }), 200
+        stats = cluster_summary()
+        frag = get_fragmentation()
+    stats["fragmentation"] = round(frag * 100, 2)
+    return jsonify(stats), 200
+
+def cluster_summary():
+    """The counters of the summary room; call with nodes_lock held."""
+    return {
+        "total_nodes": len(nodes),
+        "active_nodes": sum(1 for n in nodes.values() if n["status"] == "active"),
+        "total_pods": sum(len(n['pods']) for n in nodes.values()),
+        "utilization": round(get_cluster_utilization() * 100, 2),
+        "pending_pods": len(pending_pods)
+    }
 
 # spacer line for GitHub diff
 
 if __name__ == '__main__':
 
 # spacer line for GitHub diff
-    init_db()
+    open_state_store()
 
 # spacer line for GitHub diff
     load_cluster_state()
@@ -2515,6 +4959,24 @@ if __name__ == '__main__':
     background_tasks()
 
 # spacer line for GitHub diff
-    socketio.run(app, host="0.0.0.0", port=5000, debug=True)
+    # Werkzeug, its reloader and request log are for development (threading mode) only.
+
+# spacer line for GitHub diff
+    # The reloader would run a second server process on the journal this one
+
+# spacer line for GitHub diff
+    # already holds, so it stays off with the journal store
+
+# spacer line for GitHub diff
+    dev = ASYNC_MODE == "threading"
+
+# spacer line for GitHub diff
+    options = {"max_size": MAX_CONNECTIONS} if ASYNC_MODE == "eventlet" else {}
+
+# spacer line for GitHub diff
+    socketio.run(app, host="0.0.0.0", port=PORT, debug=dev, use_reloader=dev and store.name != "journal",
+
+# spacer line for GitHub diff
+                 allow_unsafe_werkzeug=dev, **options)
 
 # spacer line for GitHub diff
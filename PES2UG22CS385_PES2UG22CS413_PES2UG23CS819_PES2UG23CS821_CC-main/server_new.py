@@ -1,18 +1,34 @@
+# ASYNC_MODE: "threading" (default), or "eventlet" / "gevent" for many
+# concurrent agents and dashboards; those patch the standard library first
+import os
+import sys
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "threading")
+if ASYNC_MODE not in ("threading", "eventlet", "gevent"):
+    sys.exit(f"Unknown ASYNC_MODE {ASYNC_MODE!r}, expected threading, eventlet or gevent")
+try:
+    if ASYNC_MODE == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif ASYNC_MODE == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+except ImportError:
+    sys.exit(f"ASYNC_MODE={ASYNC_MODE} needs the {ASYNC_MODE} package: pip install {ASYNC_MODE}")
+
 import time
 import uuid
 import random
-import csv
-import io
-import os
-from flask import Flask, request, jsonify, render_template, send_file, send_from_directory
+import sqlite3
+import atexit
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
-from threading import Thread, RLock
-from supabase_init import (
-    init_supabase_tables, get_nodes, get_pods, get_logs, 
-    get_utilization_history, save_node, delete_node, save_pod, 
-    update_pod_node, log_event, record_utilization
-)
+from threading import RLock, Condition
+from scheduling import STRATEGIES, choose_node
+from events import event_dict, event_row
+from reports import REPORT_COLUMNS, REPORT_FORMATS, export, snapshot
+from state_feed import PacketJSON, StateFeed
+from state_store import IdAllocator, StoreError, node_db_row, open_store, pod_db_row
 
 # ---- Docker SDK & Network-Policy Setup ----
 import docker
@@ -44,8 +60,17 @@ nodes = {}  # In-memory cache of nodes
 event_log = []  # In-memory cache of recent events
 utilization_history = []  # In-memory cache of utilization history
 nodes_lock = RLock()
-pod_id_lock = RLock()
-pod_id_counter = 0
+state_feed = StateFeed()  # versioned dashboard deltas, see state_feed.py
+publish_lock = RLock()  # keeps deltas in version order on the wire
+PUSH_INTERVAL = 0.05  # seconds; at most one dashboard push per interval
+push_cond = Condition()  # guards view_changed and dashboard_clients
+view_changed = False
+dashboard_clients = 0
+POD_ID_BLOCK = 1000  # pod ids leased at a time from the store's high-water mark
+pod_ids = None  # IdAllocator, set by open_state_store()
+# What a failed store call can raise: SQLite errors, I/O errors from the
+# journal, or StoreError from Supabase
+PERSIST_ERRORS = (sqlite3.Error, OSError, StoreError)
 
 DEFAULT_NODE_CPU = 8
 DEFAULT_NODE_MEMORY = 16
@@ -57,11 +82,17 @@ AUTO_SCALE_COOLDOWN = 60
 HEARTBEAT_THRESHOLD = 15
 HEALTH_CHECK_INTERVAL = 5
 
-SCHEDULING_ALGORITHMS = ['first_fit', 'best_fit', 'worst_fit']
+SCHEDULING_ALGORITHMS = list(STRATEGIES)
+
+# State store backend (see state_store.py): supabase, sqlite, journal or memory
+STATE_STORE = os.environ.get("STATE_STORE", "supabase")
+store = None  # set by open_state_store()
+PORT = int(os.environ.get("PORT", 5000))
+MAX_CONNECTIONS = 20000  # connections served at once under eventlet (its own default is 1024)
 
 app = Flask(__name__, static_folder="./static")
 CORS(app)  # Enable CORS for all routes
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, json=PacketJSON)
 
 # ----------------------------------
 # Utility Functions
@@ -69,53 +100,74 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 def get_current_timestamp():
     return time.time()
 
-def log_event_func(event):
+def log_event_func(event, type="event", severity="info", node_id=None, pod_id=None):
     ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(get_current_timestamp()))
     entry = f"[{ts}] {event}"
     with nodes_lock:
         event_log.append(entry)
         if len(event_log) > 50:
             event_log.pop(0)
-    # Log to Supabase
-    log_event(event)
+    state_changed()
+    # Log to the state store
+    store.write(events=[event_row(ts, event, type, severity, node_id, pod_id)])
+
+# ----------------------------------
+# State Store
+# ----------------------------------
+def open_state_store():
+    global store, pod_ids
+    store = open_store(STATE_STORE)
+    atexit.register(store.close)
+    pod_ids = IdAllocator(store, "pod", POD_ID_BLOCK)
+    return store
+
+def save_node(node):
+    store.write(node_rows=[node_db_row(node)])
+    state_changed()
+
+def delete_node(node_id):
+    store.write(deleted_node_ids=[node_id])
+    state_changed()
+
+def save_pod(pod):
+    store.write(pod_rows=[pod_db_row(pod, pod.get("node_id"))])
+    state_changed()
+
+def update_pod_node(pod_id, new_node_id):
+    store.write(moved_pods=[(pod_id, new_node_id)])
+    state_changed()
 
 def load_cluster_state():
-    """Load cluster state from Supabase."""
-    global nodes, pod_id_counter
+    """Load cluster state from the state store."""
+    global nodes
     
-    # Get nodes from Supabase
-    supabase_nodes = get_nodes()
-    
-    # Get pods from Supabase
-    supabase_pods = get_pods()
+    node_rows, pod_rows = store.load()
     
     # Process nodes
     with nodes_lock:
         nodes.clear()
-        for node_data in supabase_nodes:
-            node_id = node_data["node_id"]
+        for (node_id, cpu_tot, cpu_av, mem_tot, mem_av, ntype, ngroup,
+             lh, status, sim, cont_id) in node_rows:
             nodes[node_id] = {
                 "node_id": node_id,
-                "cpu_total": node_data["cpu_total"],
-                "cpu_available": node_data["cpu_available"],
-                "memory_total": node_data["memory_total"],
-                "memory_available": node_data["memory_available"],
-                "node_type": node_data["node_type"],
-                "network_group": node_data["network_group"],
-                "last_heartbeat": node_data["last_heartbeat"],
-                "status": node_data["status"],
-                "simulate_heartbeat": bool(node_data["simulate_heartbeat"]),
+                "cpu_total": cpu_tot,
+                "cpu_available": cpu_av,
+                "memory_total": mem_tot,
+                "memory_available": mem_av,
+                "node_type": ntype,
+                "network_group": ngroup,
+                "last_heartbeat": lh,
+                "status": status,
+                "simulate_heartbeat": bool(sim),
                 "pods": [],
-                "container_id": node_data.get("container_id")
+                "container_id": cont_id
             }
         
         # Process pods
         max_pod_id = 0
-        for pod_data in supabase_pods:
-            pod_id = pod_data["pod_id"]
-            node_id = pod_data["node_id"]
+        for (pod_id, node_id, cpu, mem, ng, affinity, algo, prio) in pod_rows:
             
-            # Extract numeric part of pod_id to update pod_id_counter
+            # Extract numeric part of pod_id to seed the pod id allocator
             if pod_id.startswith("pod_"):
                 try:
                     pod_num = int(pod_id.split("_")[1])
@@ -125,30 +177,58 @@ def load_cluster_state():
                 
             pod = {
                 "pod_id": pod_id,
-                "cpu": pod_data["cpu"],
-                "memory": pod_data["memory"],
-                "network_group": pod_data["network_group"],
-                "cpu_usage": 0
+                "cpu": cpu,
+                "memory": mem,
+                "network_group": ng,
+                "cpu_usage": 0,
+                "priority": prio or 0
             }
-            if pod_data.get("node_affinity"):
-                pod["node_affinity"] = pod_data["node_affinity"]
+            if affinity:
+                pod["node_affinity"] = affinity
+            if algo:
+                pod["scheduling_algorithm"] = algo
                 
             if node_id in nodes:
                 nodes[node_id]["pods"].append(pod)
         
-        # Update pod_id_counter
-        pod_id_counter = max_pod_id
+        # Never reissue a stored pod id
+        pod_ids.seed(max_pod_id)
+
+        # Dashboards start from the stored utilization tail
+        try:
+            utilization_history.extend(store.recent_utilization(50)[::-1])
+        except NotImplementedError:
+            pass
 
 @socketio.on('connect')
 def on_connect():
-    with nodes_lock:
-        state = {
-            "nodes": list(nodes.values()),
-            "logs": event_log[-50:],
-            "history": [{"timestamp": record["timestamp"], "utilization": record["utilization"]} 
-                        for record in get_utilization_history()]
-        }
-    emit('state_update', state)
+    global dashboard_clients
+    with push_cond:
+        dashboard_clients += 1
+    with publish_lock:
+        publish_state()
+        emit('state_update', state_feed.snapshot())
+
+@socketio.on('disconnect')
+def on_disconnect(*args):
+    global dashboard_clients
+    with push_cond:
+        dashboard_clients -= 1
+
+@socketio.on('resync')
+def on_resync(data):
+    # Replay the deltas a client missed, or send a snapshot if they are gone
+    try:
+        version = int((data or {}).get("version"))
+    except (AttributeError, TypeError, ValueError):
+        version = -1
+    with publish_lock:
+        missed = state_feed.since(version) if version >= 0 else None
+        if missed is None:
+            emit('state_update', state_feed.snapshot())
+        else:
+            for delta in missed:
+                emit('state_delta', delta)
 
 def record_utilization_thread():
     while True:
@@ -159,8 +239,9 @@ def record_utilization_thread():
             utilization_history.append((ts, util))
             if len(utilization_history) > 50:
                 utilization_history.pop(0)
-        # Save to Supabase
-        record_utilization(util)
+        state_changed()
+        # Save to the state store
+        store.record_utilization(ts, util)
 
 def get_cluster_utilization():
     total = used = 0
@@ -187,12 +268,7 @@ def schedule_pod(pod, algo):
             eligible = [n for n in eligible if n["node_type"] == pod["node_affinity"]]
         if not eligible:
             return False, None
-        if algo == "first_fit":
-            cand = eligible[0]
-        elif algo == "best_fit":
-            cand = min(eligible, key=lambda n: (n["cpu_available"] - pod["cpu"]) + (n["memory_available"] - pod["memory"]))
-        else:  # worst_fit
-            cand = max(eligible, key=lambda n: n["cpu_available"] + n["memory_available"])
+        cand = choose_node(eligible, pod, algo)
         cand["pods"].append(pod)
         cand["cpu_available"] -= pod["cpu"]
         cand["memory_available"] -= pod["memory"]
@@ -314,16 +390,33 @@ def chaos_monkey():
     reschedule_pods_from_failed_node(target["node_id"])
     return {"message": f"Killed node {target['node_id']}"}
 
-def broadcast_state():
-    while True:
-        time.sleep(3)
+def state_changed():
+    global view_changed
+    with push_cond:
+        view_changed = True
+        push_cond.notify()
+
+def publish_state():
+    global view_changed
+    with publish_lock:
+        with push_cond:
+            view_changed = False
         with nodes_lock:
-            state = {
-                "nodes": list(nodes.values()),
-                "logs": event_log[-50:],
-                "history": [{"timestamp": ts, "utilization": util} for ts, util in utilization_history]
-            }
-        socketio.emit("state_update", state)
+            delta = state_feed.tick(nodes, event_log, utilization_history)
+        if delta is not None:
+            socketio.emit("state_delta", delta)
+        return delta
+
+def push_worker():
+    # Wakes on a change while a dashboard is connected, then publishes at
+    # most once per PUSH_INTERVAL
+    last = 0.0
+    while True:
+        with push_cond:
+            push_cond.wait_for(lambda: view_changed and dashboard_clients > 0)
+        time.sleep(max(0.0, last + PUSH_INTERVAL - time.monotonic()))
+        publish_state()
+        last = time.monotonic()
 
 # ----------------------------------
 # API Endpoints
@@ -338,6 +431,10 @@ def add_node_endpoint():
         print("❌  Missing cpu in payload")
         return jsonify({"error": "Missing cpu"}), 400
     mem = data.get("memory", DEFAULT_NODE_MEMORY)
+    # Strategies score nodes by their share of cpu_total / memory_total
+    if any(type(v) not in (int, float) or v <= 0 for v in (cpu, mem)):
+        print(f"❌  Invalid capacity cpu={cpu!r} memory={mem!r}")
+        return jsonify({"error": "cpu and memory must be positive numbers"}), 400
     nt = data.get("node_type", "balanced")
     ng = data.get("network_group", "default")
 
@@ -462,14 +559,26 @@ def launch_pod_endpoint():
         return jsonify({"error": "Missing cpu_required"}), 400
 
     mem_req = data.get("memory_required", DEFAULT_POD_MEMORY)
-    algo = data.get("scheduling_algorithm", "first_fit").lower()
+    if any(type(v) not in (int, float) or v <= 0 for v in (cpu_req, mem_req)):
+        print(f"❌  Invalid pod size cpu={cpu_req!r} memory={mem_req!r}")
+        return jsonify({"error": "cpu_required and memory_required must be positive numbers"}), 400
+    algo = data.get("scheduling_algorithm", "first_fit")
+    algo = algo.lower() if isinstance(algo, str) else algo  # anything else fails the check below
     ng = data.get("network_group", "default")
     affinity = data.get("node_affinity")
+    priority = data.get("priority", 0)
+    if algo not in SCHEDULING_ALGORITHMS:
+        print(f"❌  Unknown scheduling_algorithm {algo}")
+        return jsonify({"error": f"Unknown scheduling_algorithm, expected one of {SCHEDULING_ALGORITHMS}"}), 400
+    if type(priority) is not int:
+        print(f"❌  Invalid priority {priority}")
+        return jsonify({"error": "priority must be an integer"}), 400
 
-    global pod_id_counter
-    with pod_id_lock:
-        pod_id_counter += 1
-        pid = f"pod_{pod_id_counter}"
+    try:
+        pid = f"pod_{pod_ids.next_id()}"
+    except PERSIST_ERRORS as e:
+        print(f"❌ Could not lease pod ids: {e}")
+        return jsonify({"error": "Failed to reserve a pod id"}), 500
 
     pod = {
         "pod_id": pid,
@@ -477,6 +586,8 @@ def launch_pod_endpoint():
         "memory": mem_req,
         "network_group": ng,
         "cpu_usage": 0,
+        "scheduling_algorithm": algo,
+        "priority": priority,
         "node_id": None  # Will be assigned during scheduling
     }
     if affinity:
@@ -491,7 +602,8 @@ def launch_pod_endpoint():
             "message": "Pod launched",
             "pod_id": pid,
             "assigned_node": assigned,
-            "scheduling_algorithm": algo
+            "scheduling_algorithm": algo,
+            "priority": priority
         }), 200
     else:
         print(f"❌ No capacity for pod {pid}")
@@ -503,31 +615,24 @@ def chaos_api():
 
 @app.route('/api/download_report', methods=['GET'])
 def download_report():
-    out = io.StringIO(); w = csv.writer(out)
-    w.writerow(["Node", "CPU tot/avail", "Mem tot/avail", "Status", "Type", "Group", "Pods"])
+    fmt, rows = request.args.get("format", "csv"), request.args.get("rows", "nodes")
+    if fmt not in REPORT_FORMATS or rows not in REPORT_COLUMNS:
+        return jsonify({"error": f"format must be one of {list(REPORT_FORMATS)}, rows one of {list(REPORT_COLUMNS)}"}), 400
     with nodes_lock:
-        for n in nodes.values():
-            pods = ";".join(p["pod_id"] for p in n["pods"]) or "None"
-            w.writerow([
-                n["node_id"],
-                f"{n['cpu_total']}/{n['cpu_available']}",
-                f"{n['memory_total']}/{n['memory_available']}",
-                n["status"], n["node_type"], n["network_group"], pods
-            ])
-    out.seek(0)
-    return send_file(io.BytesIO(out.getvalue().encode()),
-                     mimetype="text/csv",
-                     as_attachment=True,
-                     download_name="cluster_report.csv")
+        snap = snapshot(nodes, [])
+    mimetype, ext = REPORT_FORMATS[fmt]
+    name = "cluster_report" if rows == "nodes" else "cluster_report_pods"
+    return Response(stream_with_context(export(snap, fmt, rows)), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={name}.{ext}"})
 
 @app.route('/api/logs', methods=['GET'])
 def logs_api():
-    logs = get_logs()
+    logs = [event_dict(r[0], r[1:]) for r in store.recent_events(50)]
     return jsonify({"logs": logs}), 200
 
 @app.route('/api/utilization_history', methods=['GET'])
 def util_api():
-    history = get_utilization_history()
+    history = [{"timestamp": ts, "utilization": util} for ts, util in store.recent_utilization(50)]
     return jsonify({"history": history}), 200
 
 # Serve the React app
@@ -543,21 +648,24 @@ def serve(path):
 # Background Tasks & Startup
 # ----------------------------------
 def background_tasks():
-    Thread(target=health_monitor, daemon=True).start()
-    Thread(target=simulate_heartbeat_thread, daemon=True).start()
-    Thread(target=auto_scale_cluster, daemon=True).start()
-    Thread(target=record_utilization_thread, daemon=True).start()
-    Thread(target=broadcast_state, daemon=True).start()
+    # Daemon threads in threading mode, green threads under eventlet/gevent
+    for task in (health_monitor, simulate_heartbeat_thread, auto_scale_cluster,
+                 record_utilization_thread, push_worker):
+        socketio.start_background_task(task)
 
 if __name__ == '__main__':
-    # Initialize Supabase tables
-    init_supabase_tables()
+    # Open the state store
+    open_state_store()
     
-    # Load state from Supabase
+    # Load state from the state store
     load_cluster_state()
     
     # Start background tasks
     background_tasks()
     
-    # Start server
-    socketio.run(app, host="0.0.0.0", port=5000, debug=True) 
\ No newline at end of file
+    # Start server (Werkzeug, its reloader and request log in threading mode only;
+    # no reloader with the journal store, whose directory this process holds)
+    dev = ASYNC_MODE == "threading"
+    options = {"max_size": MAX_CONNECTIONS} if ASYNC_MODE == "eventlet" else {}
+    socketio.run(app, host="0.0.0.0", port=PORT, debug=dev, use_reloader=dev and store.name != "journal",
+                 allow_unsafe_werkzeug=dev, **options) 
\ No newline at end of file
@@ -0,0 +1,216 @@
+import json
+import threading
+from collections import deque
+
+# ----------------------------------
+# Dashboard state feed
+# ----------------------------------
+# A dashboard gets the whole state once (``snapshot``), then one delta per
+# ``tick`` that changed anything. Every delta carries the next version; a
+# client that sees a gap asks for the deltas it missed (``since``), or for
+# a new snapshot once they have left the backlog.
+#
+# A delta holds only what changed since the previous version:
+#   nodes         {node_id: {field: value}}   changed fields; every field for a new node
+#   removed_nodes [node_id]
+#   pods_added    {node_id: [pod]}            pods are never modified in place, only moved
+#   pods_removed  {node_id: [pod_id]}
+#   logs, history                             entries appended since the previous version
+#   pending, pending_count                    the queue preview, when it changed
+#   summary                                   cluster counters, when they changed (summary room)
+#
+# last_heartbeat is left out: it changes on every heartbeat and no dashboard shows it.
+#
+# Payloads leave the feed already JSON-encoded (``Encoded``): each delta is
+# encoded once however many clients receive it or ask for it again, and a
+# snapshot is spliced together from per-node fragments that are only
+# re-encoded after their node changes.
+# Dashboards subscribe to rooms, each with a feed of its own slice:
+#   cluster              every node, the log, history and pending queue
+#   summary              the log, history and cluster counters; no nodes
+#   group:<group>        the nodes and pending pods of one network group
+#   node:<node_id>       one node and its pods
+# Deltas and snapshots of a room's feed carry its name as ``room``.
+ROOM_KINDS = ("cluster", "summary", "group", "node")
+
+NODE_VIEW_FIELDS = ("node_id", "node_type", "network_group", "cpu_total", "cpu_available",
+                    "memory_total", "memory_available", "status", "simulate_heartbeat", "container_id")
+
+
+class Encoded(str):
+    """A payload that is already JSON; PacketJSON splices it into packets as is."""
+
+
+class PacketJSON:
+    """JSON module for ``SocketIO(json=PacketJSON)``: Encoded event arguments are not encoded again."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        # Socket.IO encodes an event as the list [name, *args]
+        if isinstance(obj, list) and any(isinstance(item, Encoded) for item in obj):
+            return "[" + ",".join(item if isinstance(item, Encoded) else json.dumps(item, *args, **kwargs)
+                                  for item in obj) + "]"
+        return json.dumps(obj, *args, **kwargs)
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return json.loads(s, *args, **kwargs)
+
+
+def room_scope(room):
+    """(kind, key) for a room name, key None for cluster and summary; ValueError if it is not a room."""
+    if room in ("cluster", "summary"):
+        return room, None
+    kind, sep, key = str(room).partition(":")
+    if not sep or not key or kind not in ROOM_KINDS:
+        raise ValueError(f"Unknown room {room!r}")
+    return kind, key
+
+
+def _encode(obj):
+    return Encoded(json.dumps(obj, separators=(",", ":")))
+
+
+def _fields(node):
+    return tuple(node.get(f) for f in NODE_VIEW_FIELDS)
+
+
+def _appended(items, last):
+    """Entries of ``items`` after the object ``last``; all of them once ``last`` has rotated out."""
+    items = list(items)
+    for i in range(len(items) - 1, -1, -1):
+        if items[i] is last:
+            return items[i + 1:]
+    return items
+
+
+def _sample(entry):
+    ts, util = entry
+    return {"timestamp": ts, "utilization": util}
+
+
+class StateFeed:
+    """Versioned deltas of the dashboard state.
+
+    The feed keeps its own copy of the state as of ``version`` (node fields,
+    pod references, the log and history tails), so snapshots always match
+    the version they are stamped with and ``tick`` diffs against what was
+    last published. Call ``tick`` with the lock that guards ``nodes`` held.
+    """
+
+    def __init__(self, log_limit=50, history_limit=50, backlog=100, room=None):
+        self.version = 0
+        self.room = room
+        self._nodes = {}                      # node_id -> (field values, pod ids, pods)
+        self._fragments = {}                  # node_id -> encoded node view, until the node changes
+        self._logs = deque(maxlen=log_limit)
+        self._history = deque(maxlen=history_limit)
+        self._pending = ([], 0)
+        self._summary = None
+        self._backlog = deque(maxlen=backlog)  # (version, encoded delta), oldest first
+        self._snapshot = None                 # (version, encoded snapshot)
+        self._lock = threading.Lock()
+
+    def tick(self, nodes, logs=(), history=(), pending=(), pending_count=0, changed=None, select=None, summary=None):
+        """Publish whatever changed since the last tick; returns the encoded delta, or None if nothing did.
+
+        ``changed`` limits the node diff to those node ids (added, modified or
+        removed since the last tick); None diffs every node. Nodes for which
+        ``select`` is false are left out of the feed, as if removed.
+        """
+        with self._lock:
+            delta = {}
+            patched, pods_added, pods_removed, removed_nodes = {}, {}, {}, []
+            if changed is None:
+                changed = list(nodes) + [nid for nid in self._nodes if nid not in nodes]
+            for nid in changed:
+                node = nodes.get(nid)
+                if node is None or (select is not None and not select(node)):
+                    if self._nodes.pop(nid, None) is not None:
+                        self._fragments.pop(nid, None)
+                        removed_nodes.append(nid)
+                    continue
+                fields, pod_ids = _fields(node), tuple(p["pod_id"] for p in node["pods"])
+                old = self._nodes.get(nid)
+                pods = old[2] if old is not None and old[1] == pod_ids else list(node["pods"])
+                if old is None:
+                    patched[nid] = dict(zip(NODE_VIEW_FIELDS, fields))
+                    if pods:
+                        pods_added[nid] = pods
+                else:
+                    old_fields, old_ids, _ = old
+                    if fields != old_fields:
+                        patched[nid] = {f: v for f, v, o in zip(NODE_VIEW_FIELDS, fields, old_fields) if v != o}
+                    if fields != old_fields or pod_ids != old_ids:
+                        self._fragments.pop(nid, None)
+                    if pod_ids != old_ids:
+                        now, before = set(pod_ids), set(old_ids)
+                        added = [p for p in pods if p["pod_id"] not in before]
+                        removed = [pid for pid in old_ids if pid not in now]
+                        if added:
+                            pods_added[nid] = added
+                        if removed:
+                            pods_removed[nid] = removed
+                self._nodes[nid] = (fields, pod_ids, pods)
+            new_logs = _appended(logs, self._logs[-1] if self._logs else None)
+            new_history = _appended(history, self._history[-1] if self._history else None)
+            self._logs.extend(new_logs)
+            self._history.extend(new_history)
+            pending = list(pending)
+            if ([p["pod_id"] for p in pending], pending_count) != ([p["pod_id"] for p in self._pending[0]], self._pending[1]):
+                self._pending = (pending, pending_count)
+                delta["pending"], delta["pending_count"] = pending, pending_count
+            if summary is not None and summary != self._summary:
+                self._summary = delta["summary"] = summary
+            for key, value in (("nodes", patched), ("removed_nodes", removed_nodes), ("pods_added", pods_added),
+                               ("pods_removed", pods_removed), ("logs", new_logs),
+                               ("history", [_sample(h) for h in new_history])):
+                if value:
+                    delta[key] = value
+            if not delta:
+                return None
+            self.version += 1
+            delta["version"] = self.version
+            if self.room is not None:
+                delta["room"] = self.room
+            encoded = _encode(delta)
+            self._backlog.append((self.version, encoded))
+            return encoded
+
+    def _nodes_json(self):
+        parts = []
+        for nid, (fields, _, pods) in self._nodes.items():
+            fragment = self._fragments.get(nid)
+            if fragment is None:
+                fragment = self._fragments[nid] = _encode(dict(zip(NODE_VIEW_FIELDS, fields), pods=pods))
+            parts.append(fragment)
+        return "[" + ",".join(parts) + "]"
+
+    def snapshot(self):
+        """The published state as of ``version``, encoded, in the shape of a full state_update."""
+        with self._lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                rest = {
+                    "logs": list(self._logs),
+                    "history": [_sample(h) for h in self._history],
+                    "pending": self._pending[0],
+                    "pending_count": self._pending[1],
+                }
+                if self._summary is not None:
+                    rest["summary"] = self._summary
+                if self.room is not None:
+                    rest["room"] = self.room
+                rest = _encode(rest)
+                self._snapshot = (self.version, Encoded(
+                    '{"version":%d,"nodes":%s,%s' % (self.version, self._nodes_json(), rest[1:])))
+            return self._snapshot[1]
+
+    def since(self, version):
+        """Encoded deltas after ``version``, oldest first, or None if some have left the backlog."""
+        with self._lock:
+            if version > self.version:
+                return None
+            missed = [d for v, d in self._backlog if v > version]
+            if len(missed) != self.version - version:
+                return None
+            return missed
@@ -0,0 +1,615 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from events import EVENT_COLUMNS, EventRing
+from journal import ClusterRows, StateJournal
+
+# ----------------------------------
+# Rows
+# ----------------------------------
+# Every backend stores the same rows: node and pod tuples in these column
+# orders (pod node_id None: pending), event rows in EVENT_COLUMNS order
+# (see events.py; stored with an id) and utilization samples (timestamp,
+# utilization). Event timestamps are "%Y-%m-%d %H:%M:%S" strings,
+# utilization timestamps UNIX seconds.
+NODE_COLUMNS = ("node_id", "cpu_total", "cpu_available", "memory_total", "memory_available",
+                "node_type", "network_group", "last_heartbeat", "status", "simulate_heartbeat",
+                "container_id")
+POD_COLUMNS = ("pod_id", "node_id", "cpu", "memory", "network_group", "node_affinity",
+               "scheduling_algorithm", "priority")
+EVENT_INSERT = f"INSERT INTO event_logs ({','.join(EVENT_COLUMNS)}) VALUES ({','.join('?' * len(EVENT_COLUMNS))})"
+EVENT_SELECT = f"SELECT id,{','.join(EVENT_COLUMNS)} FROM event_logs"
+# Utilization rollups: name -> (table, bucket width in seconds)
+DEFAULT_ROLLUPS = {"1m": ("utilization_1m", 60), "1h": ("utilization_1h", 3600)}
+
+
+def node_db_row(node):
+    return (
+      node["node_id"],
+      node["cpu_total"], node["cpu_available"],
+      node["memory_total"], node["memory_available"],
+      node["node_type"], node["network_group"],
+      node["last_heartbeat"], node["status"],
+      int(node["simulate_heartbeat"]),
+      node.get("container_id")
+    )
+
+
+def pod_db_row(pod, node_id):
+    return (
+      pod["pod_id"], node_id,
+      pod["cpu"], pod["memory"],
+      pod["network_group"],
+      pod.get("node_affinity"),
+      pod.get("scheduling_algorithm"),
+      pod.get("priority", 0)
+    )
+
+
+def _mutations(deleted_node_ids, node_rows, pod_rows, moved_pods):
+    # Deletes go first so a failover can re-home a deleted node's pods
+    return ([("drop_node", nid) for nid in deleted_node_ids]
+            + [("node", row) for row in node_rows]
+            + [("pod", row) for row in pod_rows]
+            + [("move_pod", pid, nid) for pid, nid in moved_pods])
+
+
+class StoreError(Exception):
+    """A backend call failed for a reason of its own (e.g. Supabase unreachable); the cause is chained."""
+
+
+class StateStore:
+    """Where a server keeps its node/pod rows, event log and utilization samples.
+
+    ``load`` is called once at startup, before the first ``write``. One
+    ``write`` is one batch: atomic on the SQLite and journal backends, sent
+    in order (but not atomically) by Supabase. The range reads behind
+    /logs and /utilization_history raise NotImplementedError on backends
+    that cannot serve them.
+    """
+
+    name = None
+
+    def load(self):
+        """Every (node_rows, pod_rows), as lists of tuples."""
+        raise NotImplementedError
+
+    def write(self, deleted_node_ids=(), node_rows=(), pod_rows=(), moved_pods=(), events=()):
+        """Apply one batch: drop nodes (and their pods), upsert rows, move pods, append event rows."""
+        raise NotImplementedError
+
+    def record_utilization(self, ts, util):
+        raise NotImplementedError
+
+    def recent_events(self, limit):
+        """The newest events as (id, *event row), newest first."""
+        raise NotImplementedError
+
+    def recent_utilization(self, limit):
+        """The newest (timestamp, utilization) samples, newest first."""
+        raise NotImplementedError
+
+    def iter_logs(self, after_id, limit, since=None, needles=(), chunk=500, node_id=None, pod_id=None):
+        """Lists of up to ``chunk`` (id, *event row) with id > after_id, in id order.
+
+        ``since`` is an event timestamp string; every needle must occur in the
+        message. node_id / pod_id select one entity's events through its index.
+        """
+        raise NotImplementedError
+
+    def utilization_range(self, start, end, resolution, limit):
+        """Raw samples as (timestamp, utilization), or rollup buckets as (bucket, avg, min, max), in [start, end)."""
+        raise NotImplementedError
+
+    def reserve_ids(self, name, count, floor=0):
+        """Raise the ``name`` high-water mark by ``count`` (starting above ``floor``); returns the first id reserved."""
+        raise NotImplementedError
+
+    def prune(self, cutoffs, batch_size):
+        """Delete rows older than ``cutoffs`` (table -> (column, cutoff)); returns rows deleted.
+
+        Backends that manage their own retention keep everything.
+        """
+        return 0
+
+    def close(self):
+        pass
+
+
+# ----------------------------------
+# In-memory
+# ----------------------------------
+class MemoryStore(StateStore):
+    """Rows in process memory only, for load tests of the scheduler and heartbeat paths.
+
+    Nothing survives a restart; the event log and raw samples keep their
+    newest ``max_events`` / ``max_samples`` entries.
+    """
+
+    name = "memory"
+
+    def __init__(self, rollups=DEFAULT_ROLLUPS, max_events=100000, max_samples=100000):
+        self.rollups = rollups
+        self.rows = ClusterRows()
+        self.events = EventRing(max_events)
+        self.samples = deque(maxlen=max_samples)
+        self.buckets = {table: {} for table, _ in rollups.values()}  # bucket -> [samples, min, max, sum]
+        self.id_marks = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            return list(self.rows.nodes.values()), list(self.rows.pods.values())
+
+    def write(self, deleted_node_ids=(), node_rows=(), pod_rows=(), moved_pods=(), events=()):
+        with self._lock:
+            self.rows.apply(_mutations(deleted_node_ids, node_rows, pod_rows, moved_pods))
+            self.events.extend(events)
+
+    def record_utilization(self, ts, util):
+        with self._lock:
+            self.samples.append((ts, util))
+            for table, width in self.rollups.values():
+                b = self.buckets[table].setdefault(int(ts // width) * width, [0, util, util, 0.0])
+                b[0] += 1
+                b[1], b[2] = min(b[1], util), max(b[2], util)
+                b[3] += util
+
+    def recent_events(self, limit):
+        return [(i,) + row for i, row in self.events.recent(limit)]
+
+    def recent_utilization(self, limit):
+        with self._lock:
+            return list(self.samples)[::-1][:limit]
+
+    def iter_logs(self, after_id, limit, since=None, needles=(), chunk=500, node_id=None, pod_id=None):
+        page = []
+        for i, (ts, message, *rest) in self.events.after(after_id, node_id, pod_id):
+            if since is not None and ts < since:
+                continue
+            if node_id is not None and rest[2] != node_id:
+                continue
+            if all(n in message for n in needles):
+                page.append((i, ts, message, *rest))
+                if len(page) == limit:
+                    break
+        for i in range(0, len(page), chunk):
+            yield page[i:i + chunk]
+
+    def utilization_range(self, start, end, resolution, limit):
+        with self._lock:
+            if resolution == "raw":
+                rows = sorted(s for s in self.samples if start <= s[0] < end)
+            else:
+                table, width = self.rollups[resolution]
+                first = int(start // width) * width
+                rows = sorted((b, v[3] / v[0], v[1], v[2]) for b, v in self.buckets[table].items() if first <= b < end)
+        return rows[:limit]
+
+    def reserve_ids(self, name, count, floor=0):
+        with self._lock:
+            first = max(self.id_marks.get(name, 0), floor) + 1
+            self.id_marks[name] = first + count - 1
+        return first
+
+    def prune(self, cutoffs, batch_size):
+        deleted = 0
+        with self._lock:
+            for table, (_, cutoff) in cutoffs.items():
+                if table == "event_logs":
+                    deleted += self.events.drop_older(cutoff)
+                elif table == "utilization_history":
+                    kept = deque((s for s in self.samples if s[0] >= cutoff), maxlen=self.samples.maxlen)
+                    deleted += len(self.samples) - len(kept)
+                    self.samples = kept
+                elif table in self.buckets:
+                    kept = {b: v for b, v in self.buckets[table].items() if b >= cutoff}
+                    deleted += len(self.buckets[table]) - len(kept)
+                    self.buckets[table] = kept
+        return deleted
+
+
+# ----------------------------------
+# SQLite
+# ----------------------------------
+class SQLiteStore(StateStore):
+    """Everything in one SQLite file, written through a shared WAL connection.
+
+    ``transaction()`` serializes writers in-process on one long-lived
+    connection; a read borrows a connection from a small pool for its
+    length, so readers never wait for the writer and a thread (or greenlet)
+    per request leaves no connection behind.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path="cluster.db", rollups=DEFAULT_ROLLUPS, max_idle_readers=4):
+        self.path = path
+        self.rollups = rollups
+        self.lock = threading.RLock()  # queues writers in-process instead of busy-waiting on the file lock
+        self.max_idle_readers = max_idle_readers
+        self._idle_readers = deque()
+        self._writer = None
+        self._create_schema()
+
+    def connect(self):
+        # WAL lets readers run beside the writer and, with synchronous=NORMAL,
+        # commits only fsync at checkpoints; statements are cached per connection
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """A read connection for the block: an idle one from the pool, else a new one.
+
+        Afterwards it goes back to the pool, or is closed when
+        ``max_idle_readers`` are already idle, so open read connections
+        never outnumber the reads in flight plus the pool.
+        """
+        try:
+            conn = self._idle_readers.pop()
+        except IndexError:
+            conn = self.connect()
+        try:
+            yield conn
+        finally:
+            with self.lock:
+                if len(self._idle_readers) < self.max_idle_readers:
+                    self._idle_readers.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """The shared write connection; commits when the block exits, rolls back if it raises."""
+        with self.lock:
+            if self._writer is None:
+                self._writer = self.connect()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def _create_schema(self):
+        conn = self.connect()
+        c = conn.cursor()
+        c.execute("""
+          CREATE TABLE IF NOT EXISTS event_logs (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            message TEXT
+          )
+        """)
+        c.execute("""
+          CREATE TABLE IF NOT EXISTS utilization_history (
+            id INTEGER PRIMARY KEY,
+            timestamp REAL,
+            utilization REAL
+          )
+        """)
+        c.execute("""
+          CREATE TABLE IF NOT EXISTS nodes (
+            node_id TEXT PRIMARY KEY,
+            cpu_total INTEGER, cpu_available INTEGER,
+            memory_total INTEGER, memory_available INTEGER,
+            node_type TEXT, network_group TEXT,
+            last_heartbeat REAL, status TEXT,
+            simulate_heartbeat INTEGER,
+            container_id TEXT
+          )
+        """)
+        c.execute("""
+          CREATE TABLE IF NOT EXISTS pods (
+            pod_id TEXT PRIMARY KEY,
+            node_id TEXT,
+            cpu INTEGER, memory INTEGER,
+            network_group TEXT,
+            node_affinity TEXT,
+            FOREIGN KEY(node_id) REFERENCES nodes(node_id)
+          )
+        """)
+        c.execute("CREATE TABLE IF NOT EXISTS id_counters (name TEXT PRIMARY KEY, high INTEGER)")
+        # Structured event columns, added after the first release
+        event_cols = [col[1] for col in c.execute("PRAGMA table_info(event_logs)")]
+        for col in EVENT_COLUMNS:
+            if col not in event_cols:
+                c.execute(f"ALTER TABLE event_logs ADD COLUMN {col} TEXT")
+        # pods columns added after the first release, in table order
+        pod_cols = [col[1] for col in c.execute("PRAGMA table_info(pods)")]
+        for col, decl in (("scheduling_algorithm", "TEXT"), ("priority", "INTEGER DEFAULT 0")):
+            if col not in pod_cols:
+                c.execute(f"ALTER TABLE pods ADD COLUMN {col} {decl}")
+        # Time indexes for range reads and retention, plus the utilization rollups;
+        # a new rollup table is backfilled from the raw samples still on disk
+        c.execute("CREATE INDEX IF NOT EXISTS idx_utilization_history_ts ON utilization_history (timestamp)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_event_logs_ts ON event_logs (timestamp)")
+        # Per-node and per-pod event lookups walk only that entity's rows
+        c.execute("CREATE INDEX IF NOT EXISTS idx_event_logs_node ON event_logs (node_id, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_event_logs_pod ON event_logs (pod_id, id)")
+        for table, width in self.rollups.values():
+            c.execute(f"CREATE TABLE IF NOT EXISTS {table} (bucket INTEGER PRIMARY KEY, samples INTEGER, min_util REAL, max_util REAL, sum_util REAL)")
+            if c.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None:
+                c.execute(f"INSERT INTO {table} SELECT CAST(timestamp / {width} AS INTEGER) * {width}, COUNT(*), MIN(utilization), MAX(utilization), SUM(utilization) FROM utilization_history GROUP BY 1")
+        conn.commit()
+        conn.close()
+
+    def load(self):
+        with self.reader() as conn:
+            node_rows = conn.execute(f"SELECT {','.join(NODE_COLUMNS)} FROM nodes").fetchall()
+            pod_rows = conn.execute(f"SELECT {','.join(POD_COLUMNS)} FROM pods").fetchall()
+        return node_rows, pod_rows
+
+    def write(self, deleted_node_ids=(), node_rows=(), pod_rows=(), moved_pods=(), events=()):
+        with self.transaction() as conn:
+            conn.executemany(EVENT_INSERT, events)
+            self._write_rows(conn, deleted_node_ids, node_rows, pod_rows, moved_pods)
+
+    def _write_rows(self, conn, deleted_node_ids, node_rows, pod_rows, moved_pods):
+        gone = [(nid,) for nid in deleted_node_ids]
+        conn.executemany("DELETE FROM pods WHERE node_id=?", gone)
+        conn.executemany("DELETE FROM nodes WHERE node_id=?", gone)
+        conn.executemany("INSERT OR REPLACE INTO nodes VALUES (?,?,?,?,?,?,?,?,?,?,?)", node_rows)
+        conn.executemany("INSERT OR REPLACE INTO pods VALUES (?,?,?,?,?,?,?,?)", pod_rows)
+        conn.executemany("UPDATE pods SET node_id=? WHERE pod_id=?", [(nid, pid) for pid, nid in moved_pods])
+
+    def record_utilization(self, ts, util):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO utilization_history (timestamp, utilization) VALUES (?,?)", (ts, util))
+            # Fold the sample into its rollup buckets
+            for table, width in self.rollups.values():
+                conn.execute(f"INSERT INTO {table} (bucket, samples, min_util, max_util, sum_util) VALUES (?,1,?,?,?) ON CONFLICT(bucket) DO UPDATE SET samples = samples + 1, min_util = MIN(min_util, excluded.min_util), max_util = MAX(max_util, excluded.max_util), sum_util = sum_util + excluded.sum_util",
+                             (int(ts // width) * width, util, util, util))
+
+    def recent_events(self, limit):
+        with self.reader() as conn:
+            return conn.execute(f"{EVENT_SELECT} ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def recent_utilization(self, limit):
+        with self.reader() as conn:
+            return conn.execute("SELECT timestamp, utilization FROM utilization_history ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def iter_logs(self, after_id, limit, since=None, needles=(), chunk=500, node_id=None, pod_id=None):
+        # Streams chunk rows at a time on a pooled connection, held until the generator finishes or is closed
+        with self.reader() as conn:
+            c = conn.cursor()
+            try:
+                sql, params = f"{EVENT_SELECT} WHERE id > ?", [after_id]
+                # Equality on node_id / pod_id walks idx_event_logs_node / _pod in id order
+                for column, value in (("node_id", node_id), ("pod_id", pod_id)):
+                    if value is not None:
+                        sql += f" AND {column} = ?"
+                        params.append(value)
+                if since is not None:
+                    # Jump to the first id at or after since through the timestamp index;
+                    # the unary + keeps the planner walking the primary key from there
+                    first = c.execute("SELECT MIN(id) FROM event_logs WHERE timestamp >= ?", (since,)).fetchone()[0]
+                    if first is None:  # nothing that recent: skip straight to an empty page
+                        first = 2 ** 63 - 1
+                    params[0] = max(after_id, first - 1)
+                    sql += " AND +timestamp >= ?"
+                    params.append(since)
+                for needle in needles:
+                    sql += " AND instr(message, ?) > 0"
+                    params.append(needle)
+                sql += " ORDER BY id LIMIT ?"
+                params.append(limit)
+                c.execute(sql, params)
+                while True:
+                    rows = c.fetchmany(chunk)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                c.close()
+
+    def utilization_range(self, start, end, resolution, limit):
+        with self.reader() as conn:
+            if resolution == "raw":
+                return conn.execute("SELECT timestamp, utilization FROM utilization_history WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp LIMIT ?",
+                                    (start, end, limit)).fetchall()
+            table, width = self.rollups[resolution]
+            return conn.execute(f"SELECT bucket, sum_util / samples, min_util, max_util FROM {table} WHERE bucket >= ? AND bucket < ? ORDER BY bucket LIMIT ?",
+                                (int(start // width) * width, end, limit)).fetchall()
+
+    def reserve_ids(self, name, count, floor=0):
+        with self.transaction() as conn:
+            row = conn.execute("SELECT high FROM id_counters WHERE name=?", (name,)).fetchone()
+            first = max(row[0] if row else 0, floor) + 1
+            conn.execute("INSERT OR REPLACE INTO id_counters VALUES (?,?)", (name, first + count - 1))
+        return first
+
+    def prune(self, cutoffs, batch_size):
+        # A batch per transaction, so writers are never held up for long
+        deleted = 0
+        for table, (column, cutoff) in cutoffs.items():
+            while True:
+                with self.transaction() as conn:
+                    n = conn.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {column} < ? LIMIT ?)",
+                                     (cutoff, batch_size)).rowcount
+                deleted += n
+                if n < batch_size:
+                    break
+        return deleted
+
+    def close(self):
+        with self.lock:
+            for conn in list(self._idle_readers) + [self._writer]:
+                if conn is not None:
+                    conn.close()
+            self._idle_readers.clear()
+            self._writer = None
+
+
+class JournalStore(SQLiteStore):
+    """Node/pod rows in a snapshot + append-only journal (see journal.py), the rest in SQLite.
+
+    The first start imports whatever the SQLite nodes/pods tables hold.
+    """
+
+    name = "journal"
+
+    def __init__(self, path="cluster.db", directory="cluster_state", sync=False,
+                 compact_bytes=64 * 1024 * 1024, rollups=DEFAULT_ROLLUPS):
+        super().__init__(path, rollups)
+        self.journal = StateJournal(directory, sync=sync)
+        self.compact_bytes = compact_bytes  # journal size that triggers a new snapshot
+
+    def load(self):
+        if self.journal.exists():
+            rows = self.journal.load()
+        else:
+            rows = ClusterRows(*super().load())
+            self.journal.start(rows)
+        return list(rows.nodes.values()), list(rows.pods.values())
+
+    def write(self, deleted_node_ids=(), node_rows=(), pod_rows=(), moved_pods=(), events=()):
+        # Events commit only once their batch is in the journal
+        with self.transaction() as conn:
+            conn.executemany(EVENT_INSERT, events)
+            self.journal.append(_mutations(deleted_node_ids, node_rows, pod_rows, moved_pods))
+        if self.journal.journal_bytes >= self.compact_bytes:
+            self.journal.compact_in_background()
+
+    def close(self):
+        self.journal.close()
+        super().close()
+
+
+# ----------------------------------
+# Supabase
+# ----------------------------------
+class SupabaseStore(StateStore):
+    """Rows in the Supabase tables of the same names, batched by a SupabaseWriter.
+
+    Writes are queued and sent from the writer's thread; ``load`` sends the
+    queue first. Recent events and samples come from the writer's read cache.
+    """
+
+    name = "supabase"
+
+    def __init__(self, client=None, **writer_options):
+        import supabase_init
+        if client is None:
+            self.client, self.writer = supabase_init.supabase, supabase_init.writer
+        else:
+            self.client, self.writer = client, supabase_init.SupabaseWriter(client, **writer_options)
+
+    def load(self):
+        self.writer.flush()
+        try:
+            node_rows = self.client.table("nodes").select("*").execute().data
+            pod_rows = self.client.table("pods").select("*").execute().data
+        except Exception as e:
+            raise StoreError(f"Could not load rows from Supabase: {e}") from e
+        return ([tuple(r.get(c) for c in NODE_COLUMNS) for r in node_rows],
+                [tuple(r.get(c) for c in POD_COLUMNS) for r in pod_rows])
+
+    def write(self, deleted_node_ids=(), node_rows=(), pod_rows=(), moved_pods=(), events=()):
+        for nid in deleted_node_ids:
+            self.writer.delete("pods", "node_id", nid)
+            self.writer.delete("nodes", "node_id", nid)
+        for row in node_rows:
+            self.writer.upsert("nodes", dict(zip(NODE_COLUMNS, row)), "node_id")
+        for row in pod_rows:
+            self.writer.upsert("pods", dict(zip(POD_COLUMNS, row)), "pod_id")
+        for pid, nid in moved_pods:
+            self.writer.update("pods", "pod_id", pid, {"node_id": nid})
+        for row in events:
+            self.writer.insert("event_logs", dict(zip(EVENT_COLUMNS, row)))
+
+    def record_utilization(self, ts, util):
+        self.writer.insert("utilization_history", {"timestamp": ts, "utilization": util})
+
+    def _newest(self, table):
+        def load():
+            try:
+                return self.client.table(table).select("*").order("timestamp", desc=True).limit(self.writer.cache_size).execute().data
+            except Exception as e:
+                print(f"Error retrieving {table}: {e}")
+                return []
+        return self.writer.cached(table, load)
+
+    def recent_events(self, limit):
+        return [(r.get("id"),) + tuple(r.get(c) for c in EVENT_COLUMNS) for r in self._newest("event_logs")[:limit]]
+
+    def recent_utilization(self, limit):
+        return [(r["timestamp"], r["utilization"]) for r in self._newest("utilization_history")[:limit]]
+
+    def reserve_ids(self, name, count, floor=0):
+        # Read-modify-write, sent straight away: one server owns the counter
+        try:
+            rows = self.client.table("id_counters").select("*").eq("name", name).execute().data
+            first = max(rows[0]["high"] if rows else 0, floor) + 1
+            self.client.table("id_counters").upsert({"name": name, "high": first + count - 1}, on_conflict="name").execute()
+        except Exception as e:
+            raise StoreError(f"Could not reserve {name} ids in Supabase: {e}") from e
+        return first
+
+    def close(self):
+        self.writer.close()
+
+
+STORES = {
+    "memory": MemoryStore,
+    "sqlite": SQLiteStore,
+    "journal": JournalStore,
+    "supabase": SupabaseStore,
+}
+
+
+def open_store(name, **options):
+    """The ``name`` backend from STORES; options go to its constructor."""
+    if name not in STORES:
+        raise ValueError(f"Unknown state store {name!r}, expected one of {sorted(STORES)}")
+    return STORES[name](**options)
+
+
+class IdAllocator:
+    """Sequential ids leased from a store's persisted high-water mark, ``block_size`` at a time.
+
+    ``next_id`` takes from the current block without a lock (the block is
+    a range iterator, advanced atomically under the GIL); only the thread
+    that exhausts it leases the next one. ``reserve`` leases a contiguous
+    range in one store call. Each lease is persisted before its ids are
+    handed out, so a restart never reissues an id; ids leased but unused
+    when the server stops are skipped.
+    """
+
+    def __init__(self, store, name, block_size=1000):
+        self.store = store
+        self.name = name
+        self.block_size = block_size
+        self.floor = 0
+        self._block = iter(())
+        self._lease_lock = threading.Lock()
+
+    def seed(self, floor):
+        """Never hand out ids at or below ``floor``, e.g. the largest one already stored."""
+        with self._lease_lock:
+            if floor > self.floor:
+                self.floor = floor
+                self._block = iter(())
+
+    def next_id(self):
+        while True:
+            block = self._block
+            n = next(block, None)
+            if n is not None:
+                return n
+            with self._lease_lock:
+                if self._block is block:
+                    first = self.store.reserve_ids(self.name, self.block_size, self.floor)
+                    self._block = iter(range(first, first + self.block_size))
+
+    def reserve(self, count):
+        """The first of ``count`` consecutive ids, reserved in one step."""
+        with self._lease_lock:
+            return self.store.reserve_ids(self.name, count, self.floor)
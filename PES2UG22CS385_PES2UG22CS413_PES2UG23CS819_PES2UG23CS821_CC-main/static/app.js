@@ -10,10 +10,28 @@ const {
 // Socket.io client connection
 const socket = io();
 
+// Version of the last state_update / state_delta applied (null until the first state_update)
+const feed = { version: null, resyncing: false };
+
+// Apply one state_delta's node and pod patches to the node list
+const applyNodeDelta = (nodes, delta) => {
+  const removed = new Set(delta.removed_nodes || []);
+  const byId = new Map(nodes.filter(n => !removed.has(n.node_id)).map(n => [n.node_id, n]));
+  const changed = delta.nodes || {}, added = delta.pods_added || {}, gone = delta.pods_removed || {};
+  new Set([...Object.keys(changed), ...Object.keys(added), ...Object.keys(gone)]).forEach(id => {
+    const old = byId.get(id) || { pods: [] };
+    const dropped = new Set(gone[id] || []);
+    const pods = old.pods.filter(p => !dropped.has(p.pod_id)).concat(added[id] || []);
+    byId.set(id, { ...old, ...(changed[id] || {}), pods });
+  });
+  return Array.from(byId.values());
+};
+
 // Main App Component
 const App = () => {
   const [nodes, setNodes] = React.useState([]);
   const [logs, setLogs] = React.useState([]);
+  const [pendingPods, setPendingPods] = React.useState([]);
   const [darkMode, setDarkMode] = React.useState(false);
   const [openNodeDialog, setOpenNodeDialog] = React.useState(false);
   const [openPodDialog, setOpenPodDialog] = React.useState(false);
@@ -35,10 +53,30 @@ const App = () => {
   });
 
   React.useEffect(() => {
-    // Listen for state updates from socket
+    // Full state on connect (or after a resync), then versioned deltas
     socket.on("state_update", (state) => {
+      feed.version = state.version;
+      feed.resyncing = false;
       setNodes(state.nodes || []);
       setLogs(state.logs || []);
+      setPendingPods(state.pending || []);
+    });
+
+    socket.on("state_delta", (delta) => {
+      if (feed.version === null || delta.version <= feed.version) return;
+      if (delta.version !== feed.version + 1) {
+        // Missed one: the server replays the gap, or sends a new state_update
+        if (!feed.resyncing) {
+          feed.resyncing = true;
+          socket.emit("resync", { version: feed.version });
+        }
+        return;
+      }
+      feed.version = delta.version;
+      feed.resyncing = false;
+      setNodes(prev => applyNodeDelta(prev, delta));
+      if (delta.logs) setLogs(prev => prev.concat(delta.logs).slice(-50));
+      if ("pending" in delta) setPendingPods(delta.pending || []);
     });
     
     // Listen for alerts
@@ -55,6 +93,7 @@ const App = () => {
     
     return () => {
       socket.off("state_update");
+      socket.off("state_delta");
       socket.off("alert");
     };
   }, [darkMode]);
@@ -91,7 +130,9 @@ const App = () => {
       }
       
       const data = await response.json();
-      showNotification(`Pod ${data.pod_id} launched on node ${data.assigned_node}`);
+      showNotification(data.status === 'pending'
+        ? `Pod ${data.pod_id} queued until a node has capacity`
+        : `Pod ${data.pod_id} launched on node ${data.assigned_node}`);
       setOpenPodDialog(false);
     } catch (error) {
       showNotification(`Error: ${error.message}`);
@@ -581,7 +622,40 @@ const App = () => {
                   </Grid>
                 ))
               )}
-              {nodes.reduce((acc, node) => acc + node.pods.length, 0) === 0 && (
+              {pendingPods.map(pod => (
+                <Grid item xs={12} sm={6} md={4} key={pod.pod_id}>
+                  <Paper className="card">
+                    <Typography variant="h6" className="card-title">
+                      <span className="material-icons">hourglass_empty</span> {pod.pod_id}
+                    </Typography>
+                    <div style={{ marginBottom: 16 }}>
+                      <Chip 
+                        label="Pending"
+                        color="secondary"
+                        size="small"
+                        style={{ marginRight: 8, marginBottom: 8 }}
+                      />
+                      <Chip 
+                        label={`Network: ${pod.network_group}`}
+                        variant="outlined"
+                        size="small"
+                        style={{ marginBottom: 8 }}
+                      />
+                    </div>
+                    <div className="node-details">
+                      <div className="node-stat">
+                        <span className="node-stat-label">CPU</span>
+                        <span className="node-stat-value">{pod.cpu} cores</span>
+                      </div>
+                      <div className="node-stat">
+                        <span className="node-stat-label">Memory</span>
+                        <span className="node-stat-value">{pod.memory} GB</span>
+                      </div>
+                    </div>
+                  </Paper>
+                </Grid>
+              ))}
+              {nodes.reduce((acc, node) => acc + node.pods.length, 0) + pendingPods.length === 0 && (
                 <Grid item xs={12}>
                   <div style={{ textAlign: 'center', padding: 40 }}>
                     <span className="material-icons" style={{ fontSize: 48, opacity: 0.3 }}>inbox</span>
@@ -720,6 +794,9 @@ const App = () => {
             <MenuItem value="first_fit">First Fit</MenuItem>
             <MenuItem value="best_fit">Best Fit</MenuItem>
             <MenuItem value="worst_fit">Worst Fit</MenuItem>
+            <MenuItem value="dominant_best_fit">Dominant-Resource Best Fit</MenuItem>
+            <MenuItem value="dot_product">Dot-Product Alignment</MenuItem>
+            <MenuItem value="least_stranded">Least Stranded</MenuItem>
           </TextField>
           <TextField
             label="Network Group"
@@ -1,4 +1,9 @@
 import os
+import time
+import atexit
+import copy
+import threading
+from collections import deque
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
@@ -8,13 +13,240 @@ load_dotenv()
 # Initialize Supabase client
 supabase_url = os.environ.get("SUPABASE_URL")
 supabase_key = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+supabase: Client = create_client(supabase_url, supabase_key) if supabase_url and supabase_key else None
+if supabase is None:
+    print("⚠️ SUPABASE_URL / SUPABASE_KEY not set—Supabase calls will fail.")
+
+# ----------------------------------
+# Buffered writer
+# ----------------------------------
+class SupabaseWriter:
+    """Batches Supabase writes per table and sends them from one background thread.
+
+    Callers only touch memory: upserts coalesce by primary key, inserts queue
+    in order, deletes drop any pending write they would undo. Every
+    ``flush_interval`` seconds (or once ``batch_size`` rows are waiting) the
+    thread sends deletes, then updates, then upserts, then inserts, each as
+    one request per table and chunk. A failed request puts everything not yet
+    sent back behind newer writes and the thread backs off exponentially.
+    The newest ``cache_size`` rows of each insert-only table are kept
+    locally, so reads like get_utilization_history never leave the process.
+    """
+
+    def __init__(self, client, flush_interval=1.0, batch_size=500, cache_size=50,
+                 max_backoff=30.0, max_queued_inserts=100000):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.max_queued_inserts = max_queued_inserts
+        self.dropped_inserts = 0     # oldest inserts discarded while Supabase was unreachable
+        self.failures = 0            # consecutive failed flushes
+        self._cond = threading.Condition()
+        self._upserts = {}           # table -> {key: row}, plus _keys[table] = key column
+        self._keys = {}
+        self._updates = {}           # (table, key column) -> {key: changed columns}
+        self._deletes = {}           # (table, column) -> {values}, in call order
+        self._inserts = {}           # table -> deque of rows
+        self._cache = {}             # table -> deque of newest rows, newest first
+        self._cache_size = cache_size
+        self._sending = threading.Lock()   # one flush at a time keeps batches in order
+        self._thread = None
+        self._closed = False
+
+    @property
+    def cache_size(self):
+        """Rows kept locally per insert-only table."""
+        return self._cache_size
+
+    # ---- enqueue (caller threads) ----
+    def _pending(self):
+        return (sum(len(rows) for rows in self._upserts.values())
+                + sum(len(rows) for rows in self._inserts.values())
+                + sum(len(rows) for rows in self._updates.values()))
+
+    def _enqueued(self):
+        # Caller holds _cond
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        if self._pending() >= self.batch_size:
+            self._cond.notify()
+
+    def upsert(self, table, row, key):
+        row = copy.deepcopy(row)     # the caller keeps mutating its dict
+        with self._cond:
+            self._keys[table] = key
+            self._upserts.setdefault(table, {})[row[key]] = row
+            self._enqueued()
+
+    def update(self, table, key_column, key, values):
+        with self._cond:
+            pending = self._upserts.get(table, {}).get(key)
+            if pending is not None:
+                pending.update(values)
+            else:
+                self._updates.setdefault((table, key_column), {}).setdefault(key, {}).update(values)
+            self._enqueued()
+
+    def delete(self, table, column, value):
+        with self._cond:
+            rows = self._upserts.get(table, {})
+            for key in [k for k, row in rows.items() if row.get(column) == value]:
+                del rows[key]
+            for (t, key_column), changes in self._updates.items():
+                if t == table:
+                    for key in [k for k, vals in changes.items()
+                                if vals.get(column) == value or (key_column == column and k == value)]:
+                        del changes[key]
+            self._deletes.setdefault((table, column), set()).add(value)
+            self._enqueued()
+
+    def insert(self, table, row):
+        with self._cond:
+            queue = self._inserts.setdefault(table, deque())
+            queue.append(row)
+            if len(queue) > self.max_queued_inserts:
+                queue.popleft()
+                self.dropped_inserts += 1
+            cache = self._cache.get(table)
+            if cache is not None:
+                cache.appendleft(row)
+            self._enqueued()
+
+    # ---- reads ----
+    def cached(self, table, load):
+        """Newest rows of ``table`` (newest first); ``load()`` seeds the cache once."""
+        with self._cond:
+            cache = self._cache.get(table)
+            if cache is not None:
+                return list(cache)
+        rows = load()
+        with self._cond:
+            if table not in self._cache:
+                # Rows inserted while loading are newer than anything loaded
+                local = list(self._inserts.get(table, ()))[::-1]
+                self._cache[table] = deque(local + rows, maxlen=self._cache_size)
+            return list(self._cache[table])
+
+    # ---- sending (writer thread) ----
+    def _take(self):
+        with self._cond:
+            batch = (self._deletes, self._updates, self._upserts, dict(self._keys), self._inserts)
+            self._deletes, self._updates, self._upserts, self._inserts = {}, {}, {}, {}
+            return batch
+
+    def _deleted_since(self, table, row):
+        # Caller holds _cond: would a delete queued meanwhile remove this row?
+        return any(t == table and row.get(column) in values
+                   for (t, column), values in self._deletes.items())
+
+    def _restore(self, deletes, updates, upserts, inserts):
+        # Unsent work goes back underneath whatever was queued meanwhile;
+        # writes that a newer delete undoes are dropped, not resurrected
+        with self._cond:
+            for (table, key_column), changes in updates.items():
+                newer = self._updates.setdefault((table, key_column), {})
+                for key, values in changes.items():
+                    if not self._deleted_since(table, {**values, key_column: key}):
+                        newer[key] = {**values, **newer.get(key, {})}
+            for table, rows in upserts.items():
+                newer = self._upserts.setdefault(table, {})
+                for key, row in rows.items():
+                    if not self._deleted_since(table, row):
+                        newer.setdefault(key, row)
+            for target, values in deletes.items():
+                self._deletes.setdefault(target, set()).update(values)
+            for table, rows in inserts.items():
+                queue = self._inserts.setdefault(table, deque())
+                queue.extendleft(reversed(rows))
+                while len(queue) > self.max_queued_inserts:
+                    queue.popleft()
+                    self.dropped_inserts += 1
+
+    def _chunks(self, rows):
+        rows = list(rows)
+        for i in range(0, len(rows), self.batch_size):
+            yield rows[i:i + self.batch_size]
+
+    def flush(self):
+        """Send everything queued so far; returns False (work re-queued) if a request failed."""
+        with self._sending:
+            return self._send(*self._take())
+
+    def _send(self, deletes, updates, upserts, keys, inserts):
+        try:
+            while deletes:
+                (table, column), values = next(iter(deletes.items()))
+                self.client.table(table).delete().in_(column, list(values)).execute()
+                del deletes[(table, column)]
+            while updates:
+                (table, key_column), changes = next(iter(updates.items()))
+                groups = {}
+                for key, values in changes.items():
+                    groups.setdefault(tuple(sorted(values.items())), []).append(key)
+                for values, group_keys in groups.items():
+                    self.client.table(table).update(dict(values)).in_(key_column, group_keys).execute()
+                    for key in group_keys:
+                        del changes[key]
+                del updates[(table, key_column)]
+            while upserts:
+                table, rows = next(iter(upserts.items()))
+                for chunk in self._chunks(rows.values()):
+                    self.client.table(table).upsert(chunk, on_conflict=keys[table]).execute()
+                    for row in chunk:
+                        del rows[row[keys[table]]]
+                del upserts[table]
+            while inserts:
+                table, rows = next(iter(inserts.items()))
+                while rows:
+                    chunk = [rows.popleft() for _ in range(min(self.batch_size, len(rows)))]
+                    try:
+                        self.client.table(table).insert(chunk).execute()
+                    except Exception:
+                        rows.extendleft(reversed(chunk))
+                        raise
+                del inserts[table]
+        except Exception as e:
+            self._restore(deletes, updates, upserts, inserts)
+            self.failures += 1
+            print(f"Error flushing Supabase writes (attempt {self.failures}): {e}")
+            return False
+        self.failures = 0
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._pending() >= self.batch_size,
+                                    timeout=self.flush_interval)
+                closed = self._closed
+            if closed:
+                return
+            if not self.flush():
+                time.sleep(min(self.max_backoff, self.flush_interval * 2 ** self.failures))
+
+    def close(self, attempts=3):
+        """Stop the thread and send what is left, trying up to ``attempts`` times."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.max_backoff + 5)
+        for _ in range(attempts):
+            if self.flush():
+                return True
+        return False
+
+
+writer = SupabaseWriter(supabase)
+atexit.register(writer.close)
 
 def init_supabase_tables():
     """Create Supabase tables if they don't exist."""
     # This function would typically use SQL to set up tables via the Supabase UI or API
     # For this project, we'll create tables through the Supabase interface directly
-    
+
     # We'll just check if we can connect to Supabase
     try:
         response = supabase.table('nodes').select('*').limit(1).execute()
@@ -25,7 +257,8 @@ def init_supabase_tables():
         return False
 
 def get_nodes():
-    """Retrieve all nodes from Supabase."""
+    """Retrieve all nodes from Supabase (after sending any queued writes)."""
+    writer.flush()
     try:
         response = supabase.table('nodes').select('*').execute()
         return response.data
@@ -34,7 +267,8 @@ def get_nodes():
         return []
 
 def get_pods():
-    """Retrieve all pods from Supabase."""
+    """Retrieve all pods from Supabase (after sending any queued writes)."""
+    writer.flush()
     try:
         response = supabase.table('pods').select('*').execute()
         return response.data
@@ -42,91 +276,55 @@ def get_pods():
         print(f"Error retrieving pods: {e}")
         return []
 
+def _newest(table):
+    def load():
+        try:
+            response = supabase.table(table).select('*').order('timestamp', desc=True).limit(writer.cache_size).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error retrieving {table}: {e}")
+            return []
+    return load
+
 def get_logs():
-    """Retrieve event logs from Supabase."""
-    try:
-        response = supabase.table('event_logs').select('*').order('timestamp.desc').limit(50).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error retrieving logs: {e}")
-        return []
+    """Retrieve the newest event logs (served from the local cache after the first call)."""
+    return writer.cached('event_logs', _newest('event_logs'))
 
 def get_utilization_history():
-    """Retrieve utilization history from Supabase."""
-    try:
-        response = supabase.table('utilization_history').select('*').order('timestamp.desc').limit(50).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error retrieving utilization history: {e}")
-        return []
+    """Retrieve the newest utilization samples (served from the local cache after the first call)."""
+    return writer.cached('utilization_history', _newest('utilization_history'))
 
 def save_node(node):
-    """Save or update a node in Supabase."""
-    try:
-        response = supabase.table('nodes').upsert(node).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error saving node: {e}")
-        return None
+    """Queue an upsert of a node."""
+    writer.upsert('nodes', node, 'node_id')
 
 def delete_node(node_id):
-    """Delete a node and its associated pods from Supabase."""
-    try:
-        # Delete pods associated with this node
-        supabase.table('pods').delete().eq('node_id', node_id).execute()
-        # Delete the node
-        response = supabase.table('nodes').delete().eq('node_id', node_id).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error deleting node: {e}")
-        return None
+    """Queue the deletion of a node and its associated pods."""
+    writer.delete('pods', 'node_id', node_id)
+    writer.delete('nodes', 'node_id', node_id)
 
 def save_pod(pod):
-    """Save or update a pod in Supabase."""
-    try:
-        response = supabase.table('pods').upsert(pod).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error saving pod: {e}")
-        return None
+    """Queue an upsert of a pod."""
+    writer.upsert('pods', pod, 'pod_id')
 
 def update_pod_node(pod_id, new_node_id):
-    """Update the node assignment for a pod."""
-    try:
-        response = supabase.table('pods').update({'node_id': new_node_id}).eq('pod_id', pod_id).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error updating pod node: {e}")
-        return None
+    """Queue a change of the node assignment for a pod."""
+    writer.update('pods', 'pod_id', pod_id, {'node_id': new_node_id})
 
 def log_event(message):
-    """Log an event to Supabase."""
-    import time
-    try:
-        event = {
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
-            'message': message
-        }
-        response = supabase.table('event_logs').insert(event).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error logging event: {e}")
-        return None
+    """Queue an event log row."""
+    writer.insert('event_logs', {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        'message': message
+    })
 
 def record_utilization(utilization_value):
-    """Record cluster utilization to Supabase."""
-    import time
-    try:
-        record = {
-            'timestamp': time.time(),
-            'utilization': utilization_value
-        }
-        response = supabase.table('utilization_history').insert(record).execute()
-        return response.data
-    except Exception as e:
-        print(f"Error recording utilization: {e}")
-        return None
+    """Queue a cluster utilization sample."""
+    writer.insert('utilization_history', {
+        'timestamp': time.time(),
+        'utilization': utilization_value
+    })
 
 if __name__ == "__main__":
     # Test connection
-    init_supabase_tables() 
\ No newline at end of file
+    init_supabase_tables()
@@ -0,0 +1,147 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# ----------------------------------
+# Local stand-in for the Supabase REST API
+# ----------------------------------
+# Just enough of PostgREST for supabase_init: select with eq/in filters,
+# order and limit; insert and upsert (Prefer: resolution=merge-duplicates);
+# update and delete with filters. Rows live in memory, keyed by each
+# table's primary key. ``fail_next`` makes the next N requests answer 503,
+# for exercising retries.
+PRIMARY_KEYS = {"nodes": "node_id", "pods": "pod_id", "event_logs": "id", "utilization_history": "id",
+                "id_counters": "name"}
+
+
+def _parse_value(raw):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _matches(row, filters):
+    for col, op, value in filters:
+        if op == "eq" and str(row.get(col)) != value:
+            return False
+        if op == "in" and str(row.get(col)) not in value:
+            return False
+    return True
+
+
+class StandIn:
+    """A PostgREST-shaped HTTP server on localhost; ``url`` goes to create_client."""
+
+    def __init__(self):
+        self.tables = {table: {} for table in PRIMARY_KEYS}
+        self.requests = []          # (method, table) of every request served
+        self.fail_next = 0
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def rows(self, table):
+        with self._lock:
+            return list(self.tables[table].values())
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=None):
+                data = json.dumps(body if body is not None else []).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                parts = urlsplit(self.path)
+                table = parts.path.rsplit("/", 1)[-1]
+                filters, order, limit = [], None, None
+                for key, raw in parse_qsl(parts.query):
+                    if key == "select":
+                        continue
+                    if key == "order":
+                        col, _, direction = raw.partition(".")
+                        order = (col, direction == "desc")
+                    elif key == "limit":
+                        limit = int(raw)
+                    else:
+                        op, _, value = raw.partition(".")
+                        if op == "in":
+                            value = {v.strip('"') for v in value.strip("()").split(",")}
+                        filters.append((key, op, value))
+                return table, filters, order, limit
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _handle(self, method):
+                table, filters, order, limit = self._route()
+                with standin._lock:
+                    standin.requests.append((method, table))
+                    if standin.fail_next:
+                        standin.fail_next -= 1
+                        return self._reply(503, {"message": "stand-in failure"})
+                    if table not in standin.tables:
+                        return self._reply(404, {"message": f"relation {table} does not exist"})
+                    rows = standin.tables[table]
+                    key = PRIMARY_KEYS[table]
+                    if method == "GET":
+                        found = [r for r in rows.values() if _matches(r, filters)]
+                        if order:
+                            found.sort(key=lambda r: r.get(order[0]), reverse=order[1])
+                        return self._reply(200, found[:limit] if limit is not None else found)
+                    if method == "POST":
+                        body = self._body()
+                        merge = "merge-duplicates" in (self.headers.get("Prefer") or "")
+                        written = []
+                        for row in body if isinstance(body, list) else [body]:
+                            if key == "id" and "id" not in row:
+                                standin._ids[table] = standin._ids.get(table, 0) + 1
+                                row = {"id": standin._ids[table], **row}
+                            if row[key] in rows and not merge:
+                                return self._reply(409, {"message": "duplicate key"})
+                            rows[row[key]] = {**rows.get(row[key], {}), **row}
+                            written.append(rows[row[key]])
+                        return self._reply(201, written)
+                    matched = [pk for pk, r in rows.items() if _matches(r, filters)]
+                    if method == "PATCH":
+                        body = self._body()
+                        for pk in matched:
+                            rows[pk].update(body)
+                        return self._reply(200, [rows[pk] for pk in matched])
+                    if method == "DELETE":
+                        return self._reply(200, [rows.pop(pk) for pk in matched])
+                return self._reply(405, {"message": "unsupported"})
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        return Handler
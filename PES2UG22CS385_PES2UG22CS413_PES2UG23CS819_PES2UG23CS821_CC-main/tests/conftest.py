@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules under test live at the project root, next to the servers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,147 @@
+"""Conformance tests every StateStore backend must pass (Supabase against a local stand-in)."""
+import os
+import threading
+
+import pytest
+
+from events import event_row
+from state_store import IdAllocator, JournalStore, MemoryStore, SQLiteStore, SupabaseStore
+
+
+def node(nid, cpu_av, hb):
+    return (nid, 8, cpu_av, 16, 16, "balanced", "default", hb, "active", 1, None)
+
+
+def pod(pid, nid, cpu):
+    return (pid, nid, cpu, 1, "default", None, "best_fit", 0)
+
+
+def state(store):
+    return tuple(sorted(rows) for rows in store.load())
+
+
+def open_files():
+    """Descriptors open in this process, or None where /proc/self/fd is missing."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+@pytest.fixture(params=["memory", "sqlite", "journal", "supabase"])
+def backend(request, tmp_path):
+    """(open_fresh, reopen): ``reopen`` gives the store as a restarted server would see it."""
+    if request.param == "memory":
+        memory = MemoryStore()
+        yield lambda: memory, lambda: memory
+    elif request.param == "sqlite":
+        connect = lambda: SQLiteStore(str(tmp_path / "cluster.db"))
+        yield connect, connect
+    elif request.param == "journal":
+        connect = lambda: JournalStore(str(tmp_path / "cluster.db"), str(tmp_path / "cluster_state"))
+        yield connect, connect
+    else:
+        supabase = pytest.importorskip("supabase")
+        from supabase_standin import StandIn
+        standin = StandIn().start()
+        connect = lambda: SupabaseStore(supabase.create_client(standin.url, "stand-in-key"), flush_interval=0.05)
+        try:
+            yield connect, connect
+        finally:
+            standin.stop()
+
+
+@pytest.fixture
+def store(backend):
+    """A fresh store holding two nodes, two pods (one pending) and three events, then a failover."""
+    open_fresh, _ = backend
+    store = open_fresh()
+    assert state(store) == ([], [])
+    store.write(node_rows=[node("n1", 6, 1.0), node("n2", 8, 1.0)],
+                pod_rows=[pod("p1", "n1", 2), pod("p2", None, 4)],
+                events=[event_row("2024-01-01 00:00:00", "Added node n1", "node_added", node_id="n1"),
+                        event_row("2024-01-01 00:00:01", "Added node n2", "node_added", node_id="n2"),
+                        event_row("2024-01-01 00:00:02", "Pod p1 scheduled on node n1", "pod_scheduled", node_id="n1", pod_id="p1")])
+    assert state(store) == ([node("n1", 6, 1.0), node("n2", 8, 1.0)], [pod("p1", "n1", 2), pod("p2", None, 4)])
+    store.write(node_rows=[node("n1", 6, 2.0), node("n2", 4, 2.0)], moved_pods=[("p2", "n2")])
+    store.write(deleted_node_ids=["n2"], node_rows=[node("n1", 2, 3.0)], pod_rows=[pod("p2", "n1", 4)],
+                events=[event_row("2024-01-02 00:00:00", "Node n2 failed", "node_failed", "warning", node_id="n2")])
+    for ts, util in ((0.0, 10.0), (30.0, 30.0), (70.0, 50.0)):
+        store.record_utilization(ts, util)
+    yield store
+    store.close()
+
+
+def test_drop_upsert_and_move(store):
+    assert state(store) == ([node("n1", 2, 3.0)], [pod("p1", "n1", 2), pod("p2", "n1", 4)])
+
+
+def test_recent_reads_newest_first(store):
+    assert [e[2] for e in store.recent_events(2)] == ["Node n2 failed", "Pod p1 scheduled on node n1"]
+    assert store.recent_events(1)[0][1:] == event_row("2024-01-02 00:00:00", "Node n2 failed", "node_failed", "warning", node_id="n2")
+    assert [s[1] for s in store.recent_utilization(3)] == [50.0, 30.0, 10.0]
+
+
+def test_range_reads(store):
+    try:
+        raw = store.utilization_range(0, 100, "raw", 10)
+    except NotImplementedError:
+        pytest.skip(f"{store.name} has no range reads")
+    assert [r[1] for r in raw] == [10.0, 30.0, 50.0]
+    assert store.utilization_range(0, 100, "1m", 10) == [(0, 20.0, 10.0, 30.0), (60, 50.0, 50.0, 50.0)]
+    pages = list(store.iter_logs(0, 10, chunk=2))
+    assert [len(p) for p in pages] == [2, 2]
+    first = pages[0][0][0]
+    assert [r[2] for r in sum(store.iter_logs(first, 10, needles=["n2"]), [])] == ["Added node n2", "Node n2 failed"]
+    assert [r[2] for r in sum(store.iter_logs(0, 10, since="2024-01-02 00:00:00"), [])] == ["Node n2 failed"]
+    assert [r[3] for r in sum(store.iter_logs(0, 10, node_id="n1"), [])] == ["node_added", "pod_scheduled"]
+    assert [r[2] for r in sum(store.iter_logs(0, 10, pod_id="p1"), [])] == ["Pod p1 scheduled on node n1"]
+    assert sum(store.iter_logs(0, 10, node_id="n2", since="2024-01-02 00:00:00"), []) == store.recent_events(1)
+
+
+def test_prune(store):
+    if store.name == "supabase":
+        pytest.skip("supabase manages its own retention")
+    assert store.prune({"event_logs": ("timestamp", "2024-01-02 00:00:00"), "utilization_1m": ("bucket", 60)}, 1) == 4
+    assert [e[2] for e in store.recent_events(10)] == ["Node n2 failed"]
+
+
+def test_leased_ids_handed_out_once(store):
+    assert store.reserve_ids("pod", 10) == 1 and store.reserve_ids("pod", 5, floor=100) == 101
+    ids = IdAllocator(store, "node", block_size=50)
+    ids.seed(7)
+    taken = [[] for _ in range(4)]
+    workers = [threading.Thread(target=lambda out: out.extend(ids.next_id() for _ in range(100)), args=(out,)) for out in taken]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert sorted(sum(taken, [])) == list(range(8, 408))
+    assert ids.reserve(1000) == 408
+
+
+def test_reads_from_short_lived_threads_stay_bounded(store):
+    # A thread per read, as Werkzeug and the green-thread servers run
+    # requests: the store's open files must not grow with the thread count
+    before = open_files()
+    if before is None:
+        pytest.skip("needs /proc/self/fd")
+    readers = [threading.Thread(target=lambda: (store.recent_events(5), store.recent_utilization(5))) for _ in range(64)]
+    for r in readers:
+        r.start()
+    for r in readers:
+        r.join()
+    assert open_files() - before <= 16
+
+
+def test_survives_restart(backend, store):
+    _, reopen = backend
+    store.reserve_ids("pod", 105)
+    store.reserve_ids("node", 1407)
+    store.close()
+    restarted = reopen()
+    try:
+        assert state(restarted) == ([node("n1", 2, 3.0)], [pod("p1", "n1", 2), pod("p2", "n1", 4)])
+        assert restarted.reserve_ids("pod", 1) == 106 and restarted.reserve_ids("node", 1) == 1408
+    finally:
+        restarted.close()
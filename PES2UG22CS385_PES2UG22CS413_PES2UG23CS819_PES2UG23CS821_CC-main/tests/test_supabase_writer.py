@@ -0,0 +1,88 @@
+"""SupabaseWriter batching and retry tests against a local stand-in of the REST API."""
+import time
+
+import pytest
+
+supabase = pytest.importorskip("supabase")
+
+from supabase_init import SupabaseWriter
+from supabase_standin import StandIn
+
+
+@pytest.fixture
+def standin():
+    server = StandIn().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def writer(standin):
+    w = SupabaseWriter(supabase.create_client(standin.url, "stand-in-key"),
+                       flush_interval=0.05, batch_size=100)
+    yield w
+    w.close()
+
+
+def node_ids(standin):
+    return {r['node_id'] for r in standin.rows('nodes')}
+
+
+def test_upserts_coalesce_into_one_request(writer, standin):
+    for beat in range(20):
+        for i in range(50):
+            writer.upsert('nodes', {'node_id': f"n{i}", 'last_heartbeat': beat, 'pods': []}, 'node_id')
+    assert writer.flush()
+    assert len(standin.rows('nodes')) == 50
+    assert all(r['last_heartbeat'] == 19 for r in standin.rows('nodes'))
+    assert standin.requests.count(('POST', 'nodes')) == 1
+
+
+def test_update_and_delete(writer, standin):
+    writer.upsert('pods', {'pod_id': 'p1', 'node_id': 'n1'}, 'pod_id')
+    writer.upsert('pods', {'pod_id': 'p2', 'node_id': 'n2'}, 'pod_id')
+    writer.upsert('nodes', {'node_id': 'n1', 'last_heartbeat': 1}, 'node_id')
+    writer.flush()
+    writer.update('pods', 'pod_id', 'p1', {'node_id': 'n3'})
+    writer.upsert('nodes', {'node_id': 'n2', 'last_heartbeat': 99}, 'node_id')
+    writer.delete('pods', 'node_id', 'n2')
+    writer.delete('nodes', 'node_id', 'n2')
+    assert writer.flush()
+    assert {r['pod_id']: r['node_id'] for r in standin.rows('pods')} == {'p1': 'n3'}
+    # The delete wins over the upsert queued before it
+    assert node_ids(standin) == {'n1'}
+
+
+def test_retries_in_order_after_failures(writer, standin):
+    assert writer.cached('event_logs', lambda: []) == []
+    standin.fail_next = 2
+    for i in range(5):
+        writer.insert('event_logs', {'timestamp': f"2024-01-01 00:00:0{i}", 'message': f"event {i}"})
+    writer.upsert('nodes', {'node_id': 'n0', 'last_heartbeat': 100}, 'node_id')
+    deadline = time.time() + 5
+    while time.time() < deadline and len(standin.rows('event_logs')) < 5:
+        time.sleep(0.05)
+    assert [r['message'] for r in standin.rows('event_logs')] == [f"event {i}" for i in range(5)]
+    assert writer.failures == 0
+    # Newest first, served from memory
+    assert [r['message'] for r in writer.cached('event_logs', None)][:2] == ['event 4', 'event 3']
+
+
+def test_cache_seeded_once(writer):
+    assert writer.cached('event_logs', lambda: [{'message': 'old'}]) == [{'message': 'old'}]
+    assert writer.cached('event_logs', lambda: pytest.fail("seeded twice")) == [{'message': 'old'}]
+
+
+def test_failed_flush_requeues_without_resurrecting_deletes(writer, standin):
+    standin.fail_next = 1
+    writer.upsert('nodes', {'node_id': 'n5', 'last_heartbeat': 101}, 'node_id')
+    assert not writer.flush()
+    writer.delete('nodes', 'node_id', 'n5')
+    assert writer.flush()
+    assert 'n5' not in node_ids(standin)
+
+
+def test_close_drains_queue(writer, standin):
+    writer.insert('utilization_history', {'timestamp': 1.0, 'utilization': 50.0})
+    assert writer.close()
+    assert len(standin.rows('utilization_history')) == 1